@@ -1,26 +1,66 @@
 import importlib.metadata
 import shutil
+from importlib import import_module
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from pint import UnitRegistry
+if TYPE_CHECKING:
+    from pint import UnitRegistry
 
-from enbios.generic.files import PathLike
+    from enbios.generic.files import PathLike
+    from enbios.base.experiment import Experiment
+    from enbios.base.scenario import Scenario
+    from enbios.generic.tree.basic_tree import BasicTreeNode
+    from enbios.bw2.util import report
+    from enbios.base.models import TechTreeNodeData, ResultValue, ScenarioResultNodeData
+
+__all__ = [
+    "version",
+    "PathLike",
+    "Experiment",
+    "Scenario",
+    "BasicTreeNode",
+    "report",
+    "TechTreeNodeData",
+    "ResultValue",
+    "ScenarioResultNodeData",
+    "get_enbios_ureg",
+    "copy_demos",
+]
 
 version = importlib.metadata.version('enbios')
 
-from enbios.base.experiment import Experiment
-from enbios.base.scenario import Scenario
-from enbios.generic.tree.basic_tree import BasicTreeNode
-from enbios.bw2.util import report
-from enbios.base.models import TechTreeNodeData, ResultValue, ScenarioResultNodeData
+# exports, that are imported on first access (so importing enbios stays fast)
+_LAZY_EXPORTS = {
+    "PathLike": "enbios.generic.files",
+    "Experiment": "enbios.base.experiment",
+    "Scenario": "enbios.base.scenario",
+    "BasicTreeNode": "enbios.generic.tree.basic_tree",
+    "report": "enbios.bw2.util",
+    "TechTreeNodeData": "enbios.base.models",
+    "ResultValue": "enbios.base.models",
+    "ScenarioResultNodeData": "enbios.base.models",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_EXPORTS:
+        value = getattr(import_module(_LAZY_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
 
 
-def get_enbios_ureg() -> UnitRegistry:
-    from enbios.base.unit_registry import ureg
-    return ureg
+def get_enbios_ureg() -> "UnitRegistry":
+    from enbios.base.unit_registry import get_ureg
+    return get_ureg()
 
 
-def copy_demos(destination: PathLike):
+def copy_demos(destination: "PathLike"):
     destination = Path(destination)
     demo_path = Path(__file__).parents[1] / "demos"
     if destination.exists():
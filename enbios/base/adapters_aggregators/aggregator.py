@@ -3,7 +3,12 @@ from typing import Optional
 
 from enbios.base.adapters_aggregators.node_module import EnbiosNodeModule
 from enbios.generic.tree.basic_tree import BasicTreeNode
-from enbios.base.models import AggregationModel, output_merge_type, ScenarioResultNodeData
+from enbios.base.models import (
+    AggregationModel,
+    output_merge_type,
+    ScenarioResultNodeData,
+    ResultValue,
+)
 
 
 class EnbiosAggregator(EnbiosNodeModule[AggregationModel]):
@@ -20,3 +25,33 @@ class EnbiosAggregator(EnbiosNodeModule[AggregationModel]):
         self, node: BasicTreeNode[ScenarioResultNodeData], scenario_name: str
     ):
         pass
+
+    def aggregate_level(
+        self, nodes: list[BasicTreeNode[ScenarioResultNodeData]], scenario_name: str
+    ) -> list[dict[str, ResultValue]]:
+        """
+        Aggregate the results of all nodes of one tree level (whose children are already
+        aggregated) at once. Aggregators can override this, to vectorize over the nodes.
+        By default, aggregate_node_result is called for each node.
+        :param nodes: nodes of one level, that use this aggregator
+        :param scenario_name: name of the scenario
+        :return: results for each node (in the order of the nodes)
+        """
+        return [self.aggregate_node_result(node, scenario_name) for node in nodes]
+
+    def aggregate_scenarios_level(
+        self, scenario_nodes: dict[str, list[BasicTreeNode[ScenarioResultNodeData]]]
+    ) -> dict[str, list[dict[str, ResultValue]]]:
+        """
+        Aggregate the nodes of one tree level for several scenarios at once.
+        By default, aggregate_level is called for each scenario. This is only used, when
+        an aggregator overrides it (and its subclasses do not override aggregate_level or
+        aggregate_node_result). The result extras are then read after all scenarios are
+        aggregated, otherwise after each scenario.
+        :param scenario_nodes: scenario name: nodes of one level, that use this aggregator
+        :return: scenario name: results for each node (in the order of the nodes)
+        """
+        return {
+            scenario_name: self.aggregate_level(nodes, scenario_name)
+            for scenario_name, nodes in scenario_nodes.items()
+        }
@@ -1,18 +1,61 @@
-from typing import Type
+from collections.abc import Iterator
+from importlib import import_module
+from typing import Type, TypeVar, Mapping, Any
 
 from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
 from enbios.base.adapters_aggregators.aggregator import EnbiosAggregator
-from enbios.base.adapters_aggregators.builtin.sum_aggregator import SumAggregator
-from enbios.base.adapters_aggregators.builtin.assignment_adapter import (
-    AssignmentAdapter,
-)
-from enbios.bw2.brightway_experiment_adapter import BrightwayAdapter
 
-BUILTIN_ADAPTERS: dict[str, Type[EnbiosAdapter]] = {
-    AssignmentAdapter.name(): AssignmentAdapter,
-    BrightwayAdapter.name(): BrightwayAdapter,
-}
+C = TypeVar("C")
+
+
+class LazyClassRegistry(Mapping[str, Type[C]]):
+    """
+    Mapping of names to classes, which are only imported when they are accessed
+    (like entry points). Classes are given as '<module>:<class name>'.
+    """
+
+    def __init__(self, class_paths: dict[str, str]):
+        self._class_paths = class_paths
+        self._classes: dict[str, Type[C]] = {}
+
+    def __getitem__(self, name: str) -> Type[C]:
+        if name not in self._classes:
+            module_name, class_name = self._class_paths[name].split(":")
+            self._classes[name] = getattr(import_module(module_name), class_name)
+        return self._classes[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._class_paths)
+
+    def __len__(self) -> int:
+        return len(self._class_paths)
 
-BUILTIN_AGGREGATORS: dict[str, Type[EnbiosAggregator]] = {
-    SumAggregator.name(): SumAggregator
+
+_BUILTIN_CLASSES = {
+    "AssignmentAdapter": (
+        "enbios.base.adapters_aggregators.builtin.assignment_adapter:AssignmentAdapter"
+    ),
+    "BrightwayAdapter": "enbios.bw2.brightway_experiment_adapter:BrightwayAdapter",
+    "MatrixAdapter": "enbios.base.adapters_aggregators.builtin.matrix_adapter:MatrixAdapter",
+    "SumAggregator": "enbios.base.adapters_aggregators.builtin.sum_aggregator:SumAggregator",
 }
+
+BUILTIN_ADAPTERS: LazyClassRegistry[EnbiosAdapter] = LazyClassRegistry(
+    {
+        "assignment-adapter": _BUILTIN_CLASSES["AssignmentAdapter"],
+        "brightway-adapter": _BUILTIN_CLASSES["BrightwayAdapter"],
+        "matrix-adapter": _BUILTIN_CLASSES["MatrixAdapter"],
+    }
+)
+
+BUILTIN_AGGREGATORS: LazyClassRegistry[EnbiosAggregator] = LazyClassRegistry(
+    {"sum-aggregator": _BUILTIN_CLASSES["SumAggregator"]}
+)
+
+
+def __getattr__(name: str) -> Any:
+    # builtin classes are imported on first access
+    if name in _BUILTIN_CLASSES:
+        module_name, class_name = _BUILTIN_CLASSES[name].split(":")
+        return getattr(import_module(module_name), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,5 @@
-import re
 from contextlib import contextmanager
 from contextvars import ContextVar
-from copy import deepcopy, copy
 from pathlib import Path
 from typing import Any, Optional, Literal, Iterator, Union
 
@@ -9,10 +7,21 @@ from pydantic import BaseModel, model_validator, Field, ConfigDict, field_valida
 from pydantic_core.core_schema import ValidationInfo
 
 from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
+from enbios.base.adapters_aggregators.builtin.assignment_impacts import (
+    AssignmentImpacts,
+)
+from enbios.base.adapters_aggregators.builtin.assignment_source import (
+    AssignmentStore,
+    open_assignment_source,
+)
+from enbios.base.adapters_aggregators.builtin.assignment_table import (
+    AssignmentTable,
+    parse_assignment_csv_headers,
+    read_assignment_table,
+)
 from enbios.base.scenario import Scenario
-from enbios.base.unit_registry import ureg
 from enbios.generic.files import ReadPath, PathLike
-from enbios.generic.unit_util import unit_match
+from enbios.generic.unit_util import unit_match, unit_conversion
 from enbios.base.models import (
     AdapterModel,
     NodeOutput,
@@ -123,8 +132,23 @@ class AssignmentNodeScenarioData(BaseModel):
         return value
 
 
+class AssignmentSourceConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    path: Union[str, Path]
+    # taken from the file suffix, if not given
+    format: Optional[Literal["sqlite", "parquet"]] = None
+    # table of a sqlite file
+    table: str = "assignments"
+    # number of scenarios, which are kept in memory
+    max_cached_scenarios: int = Field(4, gt=0)
+
+
 class AssignmentAdapterConfig(BaseModel):
     source_csv_file: Optional[Union[str, Path]] = Field(None)
+    # read the csv file column-wise, directly into arrays (no node objects are created)
+    columnar_csv: bool = False
+    # sqlite or parquet file (same columns as the csv files), read per scenario
+    source: Optional[AssignmentSourceConfig] = None
 
 
 class AssignmentAdapterDefinition(BaseModel):
@@ -157,6 +181,12 @@ class AssignmentAdapter(EnbiosAdapter):
             methods={}
         )  # placeholder
         self.from_csv_file: bool = False
+        # nodes read with 'columnar_csv'
+        self.table: Optional[AssignmentTable] = None
+        # nodes of a sqlite/parquet 'source'
+        self.store: Optional[AssignmentStore] = None
+        # dense impact arrays, created on the first run (after all nodes are validated)
+        self._impacts: Optional[AssignmentImpacts] = None
 
     def validate_definition(self, definition: AdapterModel):
         self.definition = AssignmentAdapterDefinition(**definition.model_dump())
@@ -164,8 +194,22 @@ class AssignmentAdapter(EnbiosAdapter):
     def validate_config(self, config: Optional[dict[str, Any]]):
         self.validate_methods(self.definition.methods)
         assert self.definition.config  # that's just for mypy
-        if self.definition.config.source_csv_file:
-            self.nodes = self.read_nodes_from_csv(self.definition.config.source_csv_file)
+        if source := self.definition.config.source:
+            self.store = AssignmentStore(
+                open_assignment_source(source.path, source.format, source.table),
+                self.methods,
+                source.max_cached_scenarios,
+            )
+            self.store.validate()
+        elif self.definition.config.source_csv_file:
+            if self.definition.config.columnar_csv:
+                self.table = read_assignment_table(
+                    self.definition.config.source_csv_file, self.methods
+                )
+            else:
+                self.nodes = self.read_nodes_from_csv(
+                    self.definition.config.source_csv_file
+                )
             self.from_csv_file = True
 
     def validate_methods(self, methods: Optional[dict[str, Any]]) -> list[str]:
@@ -182,6 +226,14 @@ class AssignmentAdapter(EnbiosAdapter):
         return method_name_valid, unit_valid
 
     def validate_node(self, node_name: str, node_config: Any):
+        if (table := self.table or self.store) is not None:
+            # units and methods are validated, when the table is read
+            if node_name not in table.node_index:
+                raise EnbiosValidationException(
+                    f"Node '{node_name}' is not defined in the source file"
+                )
+            return
+        self._impacts = None
         if self.from_csv_file:
             node = self.nodes[node_name]
             for method, result in node.default_impacts.items():
@@ -203,6 +255,9 @@ class AssignmentAdapter(EnbiosAdapter):
     def validate_scenario_node(
         self, node_name: str, scenario_name: str, scenario_node_data: Any
     ):
+        if self.table is not None or self.store is not None:
+            return
+        self._impacts = None
         if self.from_csv_file:
             # todo validate output...
             node_data = self.nodes[node_name]
@@ -228,6 +283,12 @@ class AssignmentAdapter(EnbiosAdapter):
                 )
 
     def get_node_output(self, node_name: str, scenario_name: str) -> list[NodeOutput]:
+        if self.table is not None:
+            return self.table.node_outputs(node_name, scenario_name)
+        if self.store is not None:
+            return self.store.scenario_table(scenario_name).node_outputs(
+                node_name, scenario_name
+            )
         outputs: list[NodeOutput] = []
         node = self.nodes[node_name]
         scenario_outputs: list[NodeOutput] = []
@@ -247,14 +308,30 @@ class AssignmentAdapter(EnbiosAdapter):
     def get_method_unit(self, method_name: str) -> str:
         return self.methods[method_name]
 
+    def get_impacts(self) -> AssignmentImpacts:
+        """
+        Default and scenario impacts of all nodes as dense arrays
+        (scenarios x nodes x methods)
+        """
+        if self.table is not None:
+            return self.table.impacts
+        if self.store is not None:
+            raise EnbiosValidationException(
+                "Impacts of a 'source' are read per scenario. "
+                "Use 'store.scenario_table(<scenario>).impacts'"
+            )
+        if self._impacts is None:
+            self._impacts = AssignmentImpacts.from_nodes(
+                self.nodes, list(self.methods.keys())
+            )
+        return self._impacts
+
     def run_scenario(self, scenario: Scenario) -> dict[str, dict[str, ResultValue]]:
-        result: dict[str, dict[str, ResultValue]] = {}
-        for node, node_data in self.nodes.items():
-            result[node] = deepcopy(node_data.default_impacts)
-            if scenario.name in node_data.scenario_data:
-                scenario_data = node_data.scenario_data[scenario.name]
-                result[node].update(scenario_data.impacts)
-        return result
+        if self.store is not None:
+            # only the rows of this scenario are read
+            table = self.store.scenario_table(scenario.name)
+            return table.impacts.results(scenario.name)
+        return self.get_impacts().results(scenario.name)
 
     @staticmethod
     def node_indicator() -> str:
@@ -273,106 +350,34 @@ class AssignmentAdapter(EnbiosAdapter):
 
         Format of headers:
 
+        With 'columnar_csv' in the config, the file is read column-wise instead
+        (see 'read_assignment_table').
+
         :param file_path:
         :return:
         """
 
-        __default = "default"
         __scenario = "scenario"
-        __outputs = "outputs"
-        __impacts = "impacts"
         __unit = unit_
         __magnitude = "magnitude"
         __label = "label"
 
-        id_re_str = r"\w+"
-        id_re_pat = re.compile(f"^{id_re_str}$")
-
         # TODO validate output and impacts units
         # one default output and multiple different scenario impacts would be weird...
         rows = ReadPath(file_path).read_data()
-        headers = list(h.strip() for h in rows[0].keys())
-        unknown_headers = copy(headers)
-        output_unit_re = re.compile(f"^{__outputs}_{id_re_str}_{__unit}$")
-        output_label_re = re.compile(f"^{__outputs}_{id_re_str}_{__label}$")
-        assert all(
-            any((k.match(h) for h in headers))
-            for k in [re.compile("node_name"), output_unit_re]
-        ), "'node_name' and 'node_{i}_output' must be defined"
-        unknown_headers.remove("node_name")
-
-        # rename to outputs_units_labels str: idx/name: dict. keys: unit, label, value: header
-        outputs_headers: dict[str, dict[str, str]] = {}
-
+        csv_headers = parse_assignment_csv_headers(
+            list(h.strip() for h in rows[0].keys())
+        )
         # dicts for headers. keys: ids [strings for outputs/impacts ids]
         # value:dict: [str:str] : "unit","magnitude" : <full-header> (e.g. default_output_1_unit)
-        default_output_headers: dict[str, dict[str, str]] = {}
-        scenario_output_headers: dict[str, dict[str, str]] = {}
-        default_impacts_headers: dict[str, dict[str, str]] = {}
-        scenario_impacts_headers: dict[str, dict[str, str]] = {}
-
-        struct_collections = {
-            __default: {
-                __outputs: default_output_headers,
-                __impacts: default_impacts_headers,
-            },
-            __scenario: {
-                __outputs: scenario_output_headers,
-                __impacts: scenario_impacts_headers,
-            },
-        }
-
-        for header in headers:
-            parts = header.split("_")
-            if len(parts) == 3:
-                if output_unit_re.match(header):
-                    outputs_headers.setdefault(parts[1], {})[__unit] = header
-                    unknown_headers.remove(header)
-                elif output_label_re.match(header):
-                    outputs_headers.setdefault(parts[1], {})[__label] = header
-                    unknown_headers.remove(header)
-                continue
-            if len(parts) != 4:
-                continue
-            def_o_sce, out_o_impact, id_, unit_o_mag = tuple(parts)
-            assert def_o_sce in [__default, __scenario]
-            assert out_o_impact in [__outputs, __impacts]
-            col = struct_collections[def_o_sce][out_o_impact]
-            assert id_re_pat.match(id_)  # todo required?
-            assert unit_o_mag in [__unit, __magnitude]
-            col.setdefault(id_, {})[unit_o_mag] = header
-            unknown_headers.remove(header)
-
-        for impact in [default_impacts_headers, scenario_impacts_headers]:
-            for method, value_headers in impact.items():
-                assert (
-                    __unit in value_headers
-                ), f"Header not complete. 'unit' missing for: {method}"
-                assert (
-                    __magnitude in value_headers
-                ), f"Header not complete. 'magnitude' missing for: {method}"
-
-        if scenario_impacts_headers:
-            assert "scenario" in headers, "header: 'scenario' is missing"
-            unknown_headers.remove("scenario")
-
-        if unknown_headers:
-            raise ValueError(f"Unknown headers: {unknown_headers}")
+        outputs_headers = csv_headers.outputs
+        default_output_headers = csv_headers.default_outputs
+        scenario_output_headers = csv_headers.scenario_outputs
+        default_impacts_headers = csv_headers.default_impacts
+        scenario_impacts_headers = csv_headers.scenario_impacts
 
         node_map: dict[str, AssignmentNode] = {}
 
-        # check if the keys for the default/scenario outputs match outputs and put them in the same order as
-        outputs_order = list(outputs_headers.keys())
-        for type_, type_values in struct_collections.items():
-            if set(type_values[__outputs].keys()):
-                assert set(type_values[__outputs].keys()) == set(
-                    outputs_order
-                ), f"{set(type_values[__outputs].keys())}, {set(type_values[__outputs].keys())}, {set(outputs_order)}"
-
-                type_values[__outputs] = {
-                    id_: type_values[__outputs][id_] for id_ in outputs_order
-                }
-
         def get_outputs(row_: dict) -> list[tuple[str, AssignmentNodeOutputConfig]]:
             return [
                 (
@@ -420,7 +425,7 @@ class AssignmentAdapter(EnbiosAdapter):
                     )
                     result.append(
                         NodeOutput(
-                            unit=str(ureg(unit).units),
+                            unit=unit_conversion(unit, unit).unit,
                             magnitude=float(row_[mag_header]),
                             label=node.outputs[idx].label,
                         )
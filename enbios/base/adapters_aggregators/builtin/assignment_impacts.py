@@ -0,0 +1,216 @@
+from copy import deepcopy
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from enbios.base.models import ResultValue
+
+if TYPE_CHECKING:
+    from enbios.base.adapters_aggregators.builtin.assignment_adapter import (
+        AssignmentNode,
+    )
+
+
+class AssignmentImpacts:
+    """
+    Impacts of the assignment adapter in dense arrays: a default row (nodes x methods) and
+    the scenario rows (scenarios x nodes x methods). A scenario cell with a unit index
+    >= 0 overrides the default (override mask), -1 means no impact.
+    Impacts with more than unit and magnitude (e.g. multi_magnitude) are kept as objects.
+    """
+
+    def __init__(
+        self,
+        node_names: Sequence[str],
+        method_names: Sequence[str],
+        scenario_names: Sequence[str],
+    ):
+        self.node_names = list(node_names)
+        self.method_names = list(method_names)
+        self.scenario_names = list(scenario_names)
+        self.node_index = {name: idx for idx, name in enumerate(self.node_names)}
+        self.method_index = {name: idx for idx, name in enumerate(self.method_names)}
+        self.scenario_index = {name: idx for idx, name in enumerate(self.scenario_names)}
+        shape = (len(self.node_names), len(self.method_names))
+        self.default_magnitudes = np.full(shape, np.nan)
+        self.default_units = np.full(shape, -1, dtype=np.int32)
+        self.scenario_magnitudes = np.full((len(self.scenario_names),) + shape, np.nan)
+        self.scenario_units = np.full(
+            (len(self.scenario_names),) + shape, -1, dtype=np.int32
+        )
+        self.units: list[str] = []
+        self._unit_index: dict[str, int] = {}
+        # (scenario index or -1 for default, node index, method index) -> impact
+        self.object_impacts: dict[tuple[int, int, int], ResultValue] = {}
+
+    @classmethod
+    def from_nodes(
+        cls, nodes: dict[str, "AssignmentNode"], method_names: Sequence[str]
+    ) -> "AssignmentImpacts":
+        """
+        Create the arrays from the default and scenario impacts of the nodes
+        :param nodes: assignment nodes
+        :param method_names: methods of the adapter. Other impacts are appended.
+        :return: impact arrays
+        """
+        method_names = list(method_names)
+        known_methods = set(method_names)
+        scenario_names: dict[str, None] = {}
+        for node in nodes.values():
+            impact_dicts = [node.default_impacts] + [
+                scenario_data.impacts for scenario_data in node.scenario_data.values()
+            ]
+            for impact_dict in impact_dicts:
+                for method_name in impact_dict:
+                    if method_name not in known_methods:
+                        known_methods.add(method_name)
+                        method_names.append(method_name)
+            scenario_names.update(dict.fromkeys(node.scenario_data))
+        impacts = cls(list(nodes), method_names, list(scenario_names))
+        for node_name, node in nodes.items():
+            for method_name, value in node.default_impacts.items():
+                impacts.set_impact(node_name, method_name, value)
+            for scenario_name, scenario_data in node.scenario_data.items():
+                for method_name, value in scenario_data.impacts.items():
+                    impacts.set_impact(node_name, method_name, value, scenario_name)
+        return impacts
+
+    def unit_index(self, unit: str) -> int:
+        if (idx := self._unit_index.get(unit)) is None:
+            idx = self._unit_index[unit] = len(self.units)
+            self.units.append(unit)
+        return idx
+
+    def set_impact(
+        self,
+        node_name: str,
+        method_name: str,
+        value: ResultValue,
+        scenario_name: Optional[str] = None,
+    ):
+        """
+        Set the default impact or the impact of a scenario
+        """
+        node_idx = self.node_index[node_name]
+        method_idx = self.method_index[method_name]
+        if scenario_name is None:
+            magnitudes, units = self.default_magnitudes, self.default_units
+            scenario_idx = -1
+        else:
+            scenario_idx = self.scenario_index[scenario_name]
+            magnitudes = self.scenario_magnitudes[scenario_idx]
+            units = self.scenario_units[scenario_idx]
+        units[node_idx, method_idx] = self.unit_index(value.unit)
+        key = (scenario_idx, node_idx, method_idx)
+        if (
+            value.magnitude is not None
+            and value.multi_magnitude == []
+            and value.statistics is None
+        ):
+            magnitudes[node_idx, method_idx] = value.magnitude
+            self.object_impacts.pop(key, None)
+        else:
+            self.object_impacts[key] = value
+
+    def set_impact_column(
+        self,
+        method_name: str,
+        node_indices: np.ndarray,
+        magnitudes: np.ndarray,
+        units: np.ndarray,
+        scenario_indices: Optional[np.ndarray] = None,
+    ):
+        """
+        Set the impacts of one method for many nodes at once (unit and magnitude only)
+        :param method_name: name of the method
+        :param node_indices: indices of the nodes
+        :param magnitudes: magnitudes (one per node index)
+        :param units: units (one per node index)
+        :param scenario_indices: indices of the scenarios (one per node index).
+        Without, the defaults are set
+        """
+        method_idx = self.method_index[method_name]
+        unique_units, unit_inverse = np.unique(units, return_inverse=True)
+        unit_indices = np.array(
+            [self.unit_index(unit) for unit in unique_units.tolist()], dtype=np.int32
+        )[unit_inverse]
+        if scenario_indices is None:
+            self.default_magnitudes[node_indices, method_idx] = magnitudes
+            self.default_units[node_indices, method_idx] = unit_indices
+        else:
+            self.scenario_magnitudes[
+                scenario_indices, node_indices, method_idx
+            ] = magnitudes
+            self.scenario_units[scenario_indices, node_indices, method_idx] = unit_indices
+
+    def scenario_arrays(
+        self, scenario_name: Optional[str] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Impacts of one scenario (defaults overridden by the scenario impacts). Without
+        a scenario (or for a scenario without impacts), the default row.
+        :param scenario_name: name of the scenario
+        :return: magnitudes and unit indices (nodes x methods)
+        """
+        scenario_idx = self.scenario_index.get(scenario_name)  # type: ignore
+        if scenario_idx is None:
+            return self.default_magnitudes, self.default_units
+        override = self.scenario_units[scenario_idx] >= 0
+        return (
+            np.where(
+                override, self.scenario_magnitudes[scenario_idx], self.default_magnitudes
+            ),
+            np.where(override, self.scenario_units[scenario_idx], self.default_units),
+        )
+
+    def all_scenario_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Impacts of all scenarios (in the order of scenario_names)
+        :return: magnitudes and unit indices (scenarios x nodes x methods)
+        """
+        override = self.scenario_units >= 0
+        return (
+            np.where(override, self.scenario_magnitudes, self.default_magnitudes),
+            np.where(override, self.scenario_units, self.default_units),
+        )
+
+    def results(self, scenario_name: str) -> dict[str, dict[str, ResultValue]]:
+        """
+        Results of all nodes for a scenario, like 'run_scenario' returns them
+        :param scenario_name: name of the scenario
+        :return: node name -> method name -> impact
+        """
+        magnitudes, units = self.scenario_arrays(scenario_name)
+        scenario_idx = self.scenario_index.get(scenario_name, -1)
+        result: dict[str, dict[str, ResultValue]] = {
+            node_name: {} for node_name in self.node_names
+        }
+        node_indices, method_indices = np.nonzero(units >= 0)
+        for node_idx, method_idx, unit_idx, magnitude in zip(
+            node_indices.tolist(),
+            method_indices.tolist(),
+            units[node_indices, method_indices].tolist(),
+            magnitudes[node_indices, method_indices].tolist(),
+        ):
+            node_result = result[self.node_names[node_idx]]
+            method_name = self.method_names[method_idx]
+            object_impact = self._object_impact(scenario_idx, node_idx, method_idx)
+            if object_impact is not None:
+                node_result[method_name] = deepcopy(object_impact)
+            else:
+                node_result[method_name] = ResultValue(
+                    unit=self.units[unit_idx], magnitude=magnitude
+                )
+        return result
+
+    def _object_impact(
+        self, scenario_idx: int, node_idx: int, method_idx: int
+    ) -> Optional[ResultValue]:
+        if not self.object_impacts:
+            return None
+        if (
+            scenario_idx >= 0
+            and self.scenario_units[scenario_idx, node_idx, method_idx] >= 0
+        ):
+            return self.object_impacts.get((scenario_idx, node_idx, method_idx))
+        return self.object_impacts.get((-1, node_idx, method_idx))
@@ -0,0 +1,355 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from enbios.base.adapters_aggregators.builtin.assignment_table import (
+    AssignmentColumns,
+    AssignmentTable,
+    build_assignment_table,
+    parse_assignment_csv_headers,
+)
+from enbios.base.models import EnbiosValidationException
+from enbios.generic.enbios2_logging import get_logger
+from enbios.generic.files import PathLike, ReadPath
+
+logger = get_logger(__name__)
+
+SQLITE_SUFFIXES = [".sqlite", ".sqlite3", ".db"]
+PARQUET_SUFFIXES = [".parquet", ".pq"]
+
+
+class AssignmentSource(ABC):
+    """
+    Assignment rows (same columns as the assignment csv files) in a file, that is not
+    loaded into memory. Rows are read per scenario. The first row of each node
+    defines its outputs and defaults.
+    """
+
+    def __init__(self, file_path: PathLike):
+        self.file_path = ReadPath(file_path)
+
+    @property
+    @abstractmethod
+    def headers(self) -> list[str]:
+        pass
+
+    @abstractmethod
+    def first_rows(self) -> AssignmentColumns:
+        """
+        The first row of each node (in the order of the nodes)
+        """
+        pass
+
+    @abstractmethod
+    def scenario_names(self) -> list[str]:
+        """
+        Names of all scenarios (in the order of their first row)
+        """
+        pass
+
+    @abstractmethod
+    def rows_without_scenario(self) -> list[str]:
+        """
+        Nodes with rows without scenario, which are not their first row
+        """
+        pass
+
+    @abstractmethod
+    def scenario_rows(self, scenario_name: str) -> AssignmentColumns:
+        """
+        Rows of a scenario, that are not the first row of their node
+        """
+        pass
+
+
+class SQLiteAssignmentSource(AssignmentSource):
+    """
+    Assignment rows in a table of a sqlite file. Scenarios and node names are compared
+    trimmed, like the cells of the csv files. An index on the trimmed
+    (scenario, node_name) is created, if it does not exist.
+    """
+
+    def __init__(self, file_path: PathLike, table: str = "assignments"):
+        super().__init__(file_path)
+        self.table = table
+        self._connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        table_columns = self._connection.execute(
+            f'PRAGMA table_info("{self.table}")'
+        ).fetchall()
+        if not table_columns:
+            raise EnbiosValidationException(
+                f"Table '{self.table}' does not exist in '{self.file_path}'"
+            )
+        self._headers = [column[1] for column in table_columns]
+        if "scenario" in self._headers:
+            try:
+                self._connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{self.table}_trim_scenario_node" '
+                    f'ON "{self.table}" (TRIM(scenario), TRIM(node_name))'
+                )
+                self._connection.commit()
+            except sqlite3.OperationalError as err:
+                logger.warning(f"Could not create index on '{self.file_path}': {err}")
+        self._first_rowids: set[int] = set()
+
+    @property
+    def headers(self) -> list[str]:
+        return self._headers
+
+    def _select(self, where: str, params: tuple = ()) -> Iterator[tuple]:
+        columns = ", ".join(f'"{header}"' for header in self._headers)
+        return self._connection.execute(
+            f'SELECT rowid, {columns} FROM "{self.table}" WHERE {where} ORDER BY rowid',
+            params,
+        )
+
+    def _first_rowids_query(self) -> str:
+        return f'SELECT MIN(rowid) FROM "{self.table}" GROUP BY TRIM(node_name)'
+
+    def first_rows(self) -> AssignmentColumns:
+        rows = list(self._select(f"rowid IN ({self._first_rowids_query()})"))
+        self._first_rowids = {row[0] for row in rows}
+        return AssignmentColumns.from_rows(self._headers, [row[1:] for row in rows])
+
+    def scenario_names(self) -> list[str]:
+        if "scenario" not in self._headers:
+            return []
+        return [
+            row[0]
+            for row in self._connection.execute(
+                f'SELECT TRIM(scenario) FROM "{self.table}" '
+                f"WHERE TRIM(COALESCE(scenario, '')) != '' "
+                f"GROUP BY TRIM(scenario) ORDER BY MIN(rowid)"
+            )
+        ]
+
+    def rows_without_scenario(self) -> list[str]:
+        where = f"rowid NOT IN ({self._first_rowids_query()})"
+        if "scenario" in self._headers:
+            where += " AND TRIM(COALESCE(scenario, '')) = ''"
+        return [
+            row[0]
+            for row in self._connection.execute(
+                f'SELECT DISTINCT TRIM(node_name) FROM "{self.table}" WHERE {where}'
+            )
+        ]
+
+    def scenario_rows(self, scenario_name: str) -> AssignmentColumns:
+        if "scenario" not in self._headers:
+            return AssignmentColumns.from_rows(self._headers, [])
+        rows = [
+            row[1:]
+            for row in self._select("TRIM(scenario) = ?", (scenario_name.strip(),))
+            if row[0] not in self._first_rowids
+        ]
+        return AssignmentColumns.from_rows(self._headers, rows)
+
+
+class ParquetAssignmentSource(AssignmentSource):
+    """
+    Assignment rows in a parquet file (requires pyarrow). Rows are read per row group.
+    Row groups are skipped, by the statistics of their scenario column, so files
+    sorted by (scenario, node_name) are read like with an index. Scenarios and node
+    names are compared stripped, like the cells of the csv files.
+    """
+
+    def __init__(self, file_path: PathLike):
+        super().__init__(file_path)
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow not installed")
+        self._file = pq.ParquetFile(self.file_path)
+        self._headers = list(self._file.schema_arrow.names)
+        self._scenario_column = (
+            self._headers.index("scenario") if "scenario" in self._headers else None
+        )
+        # global row numbers of the first rows of the nodes
+        self._first_row_numbers: set[int] = set()
+        self._first_rows: Optional[AssignmentColumns] = None
+        self._scenario_names: list[str] = []
+        self._rows_without_scenario: list[str] = []
+
+    @property
+    def headers(self) -> list[str]:
+        return self._headers
+
+    def _row_groups(
+        self, columns: Optional[list[str]] = None
+    ) -> Iterator[tuple[int, dict[str, list[Any]]]]:
+        # row offset and columns of each row group
+        offset = 0
+        for row_group_idx in range(self._file.num_row_groups):
+            row_group = self._file.read_row_group(row_group_idx, columns=columns)
+            yield offset, row_group.to_pydict()
+            offset += row_group.num_rows
+
+    def _scan(self):
+        # one pass over the node and scenario columns
+        columns = ["node_name"] + (
+            ["scenario"] if self._scenario_column is not None else []
+        )
+        seen_nodes: set[str] = set()
+        scenario_names: dict[str, None] = {}
+        rows_without_scenario: dict[str, None] = {}
+        for offset, row_group in self._row_groups(columns):
+            scenarios = row_group.get("scenario", [None] * len(row_group["node_name"]))
+            for row_idx, (node_name, scenario) in enumerate(
+                zip(row_group["node_name"], scenarios)
+            ):
+                node_name = (node_name or "").strip()
+                scenario = (scenario or "").strip()
+                if node_name not in seen_nodes:
+                    seen_nodes.add(node_name)
+                    self._first_row_numbers.add(offset + row_idx)
+                elif not scenario:
+                    rows_without_scenario[node_name] = None
+                if scenario:
+                    scenario_names[scenario] = None
+        self._scenario_names = list(scenario_names)
+        self._rows_without_scenario = list(rows_without_scenario)
+        rows: list[list[Any]] = []
+        for offset, row_group in self._row_groups():
+            raw_columns = [row_group[header] for header in self._headers]
+            rows.extend(
+                [column[row_idx] for column in raw_columns]
+                for row_idx in range(len(raw_columns[0]) if raw_columns else 0)
+                if offset + row_idx in self._first_row_numbers
+            )
+        self._first_rows = AssignmentColumns.from_rows(self._headers, rows)
+
+    def first_rows(self) -> AssignmentColumns:
+        if self._first_rows is None:
+            self._scan()
+        assert self._first_rows is not None
+        return self._first_rows
+
+    def scenario_names(self) -> list[str]:
+        self.first_rows()
+        return self._scenario_names
+
+    def rows_without_scenario(self) -> list[str]:
+        self.first_rows()
+        return self._rows_without_scenario
+
+    def _may_contain(self, row_group_idx: int, scenario_name: str) -> bool:
+        assert self._scenario_column is not None
+        statistics = (
+            self._file.metadata.row_group(row_group_idx)
+            .column(self._scenario_column)
+            .statistics
+        )
+        if statistics is None or not statistics.has_min_max:
+            return True
+        # cells are compared stripped, padded bounds do not bound the stripped cells
+        if any(bound != bound.strip() for bound in [statistics.min, statistics.max]):
+            return True
+        return statistics.min <= scenario_name <= statistics.max
+
+    def scenario_rows(self, scenario_name: str) -> AssignmentColumns:
+        self.first_rows()
+        rows: list[list[Any]] = []
+        if self._scenario_column is None:
+            return AssignmentColumns.from_rows(self._headers, rows)
+        offset = 0
+        for row_group_idx in range(self._file.num_row_groups):
+            num_rows = self._file.metadata.row_group(row_group_idx).num_rows
+            if self._may_contain(row_group_idx, scenario_name):
+                row_group = self._file.read_row_group(row_group_idx).to_pydict()
+                raw_columns = [row_group[header] for header in self._headers]
+                rows.extend(
+                    [column[row_idx] for column in raw_columns]
+                    for row_idx, scenario in enumerate(row_group["scenario"])
+                    if scenario is not None
+                    and scenario.strip() == scenario_name
+                    and offset + row_idx not in self._first_row_numbers
+                )
+            offset += num_rows
+        return AssignmentColumns.from_rows(self._headers, rows)
+
+
+def open_assignment_source(
+    file_path: PathLike, file_format: Optional[str] = None, table: str = "assignments"
+) -> AssignmentSource:
+    """
+    Open a sqlite or parquet file with assignment rows
+    :param file_path: path of the file
+    :param file_format: 'sqlite' or 'parquet'. Without, it is taken from the file suffix
+    :param table: table of the sqlite file
+    :return: assignment source
+    """
+    if not file_format:
+        suffix = Path(file_path).suffix.lower()
+        if suffix in SQLITE_SUFFIXES:
+            file_format = "sqlite"
+        elif suffix in PARQUET_SUFFIXES:
+            file_format = "parquet"
+        else:
+            raise ValueError(
+                f"Unknown format of assignment source: '{file_path}'. Use one of the "
+                f"suffixes: {SQLITE_SUFFIXES + PARQUET_SUFFIXES} or set the 'format'"
+            )
+    if file_format == "sqlite":
+        return SQLiteAssignmentSource(file_path, table)
+    elif file_format == "parquet":
+        return ParquetAssignmentSource(file_path)
+    raise ValueError(f"Unknown format of assignment source: '{file_format}'")
+
+
+class AssignmentStore:
+    """
+    Tables of the scenarios of an assignment source. Each table includes the first rows
+    of all nodes (outputs and defaults) and the rows of one scenario. The tables of the
+    most recently used scenarios are kept.
+    """
+
+    def __init__(
+        self, source: AssignmentSource, methods: dict[str, str], max_scenarios: int = 4
+    ):
+        self.source = source
+        self.methods = methods
+        self.max_scenarios = max_scenarios
+        self.node_names: list[str] = []
+        self.node_index: dict[str, int] = {}
+        self.scenario_names: list[str] = []
+        self._tables: OrderedDict[str, AssignmentTable] = OrderedDict()
+        self._first_rows: Optional[AssignmentColumns] = None
+
+    def validate(self):
+        """
+        Validate the source, one scenario at a time
+        """
+        parse_assignment_csv_headers(self.source.headers)
+        self._first_rows = self.source.first_rows()
+        defaults_table = build_assignment_table(self._first_rows, self.methods)
+        self.node_names = defaults_table.node_names
+        self.node_index = defaults_table.node_index
+        if nodes := self.source.rows_without_scenario():
+            raise ValueError(f"No scenario defined for a row of '{nodes[0]}'")
+        self.scenario_names = self.source.scenario_names()
+        for scenario_name in self.scenario_names:
+            logger.debug(f"Validating assignment rows of scenario: '{scenario_name}'")
+            self.scenario_table(scenario_name)
+
+    def scenario_table(self, scenario_name: str) -> AssignmentTable:
+        """
+        Table of the first rows of all nodes and the rows of a scenario
+        :param scenario_name: name of the scenario
+        :return: table
+        """
+        if (table := self._tables.get(scenario_name)) is not None:
+            self._tables.move_to_end(scenario_name)
+            return table
+        if self._first_rows is None:
+            self.validate()
+        assert self._first_rows is not None
+        table = build_assignment_table(
+            self._first_rows.concat(self.source.scenario_rows(scenario_name)),
+            self.methods,
+        )
+        self._tables[scenario_name] = table
+        while len(self._tables) > self.max_scenarios:
+            self._tables.popitem(last=False)
+        return table
@@ -0,0 +1,505 @@
+import csv
+import re
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from enbios.base.adapters_aggregators.builtin.assignment_impacts import (
+    AssignmentImpacts,
+)
+from enbios.base.models import EnbiosValidationException, NodeOutput
+from enbios.generic.files import PathLike, ReadPath
+from enbios.generic.unit_util import unit_conversion, unit_match
+
+_DEFAULT = "default"
+_SCENARIO = "scenario"
+_OUTPUTS = "outputs"
+_IMPACTS = "impacts"
+_UNIT = "unit"
+_MAGNITUDE = "magnitude"
+_LABEL = "label"
+
+_ID_RE_STR = r"\w+"
+
+
+@dataclass
+class AssignmentCSVHeaders:
+    """
+    Headers of an assignment csv file, by output/impact id. Each id maps
+    'unit', 'magnitude' (and 'label' for outputs) to its full header.
+    Default and scenario outputs are in the order of the outputs.
+    """
+
+    outputs: dict[str, dict[str, str]]
+    default_outputs: dict[str, dict[str, str]]
+    scenario_outputs: dict[str, dict[str, str]]
+    default_impacts: dict[str, dict[str, str]]
+    scenario_impacts: dict[str, dict[str, str]]
+
+
+def parse_assignment_csv_headers(headers: list[str]) -> AssignmentCSVHeaders:
+    """
+    Parse and validate the (stripped) headers of an assignment csv file
+    :param headers: headers of the file
+    :return: headers by output and impact ids
+    """
+    id_re_pat = re.compile(f"^{_ID_RE_STR}$")
+    unknown_headers = list(headers)
+    output_unit_re = re.compile(f"^{_OUTPUTS}_{_ID_RE_STR}_{_UNIT}$")
+    output_label_re = re.compile(f"^{_OUTPUTS}_{_ID_RE_STR}_{_LABEL}$")
+    assert all(
+        any((k.match(h) for h in headers))
+        for k in [re.compile("node_name"), output_unit_re]
+    ), "'node_name' and 'node_{i}_output' must be defined"
+    unknown_headers.remove("node_name")
+
+    csv_headers = AssignmentCSVHeaders({}, {}, {}, {}, {})
+    struct_collections = {
+        _DEFAULT: {
+            _OUTPUTS: csv_headers.default_outputs,
+            _IMPACTS: csv_headers.default_impacts,
+        },
+        _SCENARIO: {
+            _OUTPUTS: csv_headers.scenario_outputs,
+            _IMPACTS: csv_headers.scenario_impacts,
+        },
+    }
+
+    for header in headers:
+        parts = header.split("_")
+        if len(parts) == 3:
+            if output_unit_re.match(header):
+                csv_headers.outputs.setdefault(parts[1], {})[_UNIT] = header
+                unknown_headers.remove(header)
+            elif output_label_re.match(header):
+                csv_headers.outputs.setdefault(parts[1], {})[_LABEL] = header
+                unknown_headers.remove(header)
+            continue
+        if len(parts) != 4:
+            continue
+        def_o_sce, out_o_impact, id_, unit_o_mag = tuple(parts)
+        assert def_o_sce in [_DEFAULT, _SCENARIO]
+        assert out_o_impact in [_OUTPUTS, _IMPACTS]
+        col = struct_collections[def_o_sce][out_o_impact]
+        assert id_re_pat.match(id_)  # todo required?
+        assert unit_o_mag in [_UNIT, _MAGNITUDE]
+        col.setdefault(id_, {})[unit_o_mag] = header
+        unknown_headers.remove(header)
+
+    for impact in [csv_headers.default_impacts, csv_headers.scenario_impacts]:
+        for method, value_headers in impact.items():
+            assert (
+                _UNIT in value_headers
+            ), f"Header not complete. 'unit' missing for: {method}"
+            assert (
+                _MAGNITUDE in value_headers
+            ), f"Header not complete. 'magnitude' missing for: {method}"
+
+    if csv_headers.scenario_impacts:
+        assert "scenario" in headers, "header: 'scenario' is missing"
+        unknown_headers.remove("scenario")
+
+    if unknown_headers:
+        raise ValueError(f"Unknown headers: {unknown_headers}")
+
+    # check if the keys for the default/scenario outputs match outputs and put them in
+    # the same order
+    outputs_order = list(csv_headers.outputs.keys())
+    for type_output_headers in [
+        csv_headers.default_outputs,
+        csv_headers.scenario_outputs,
+    ]:
+        if type_output_headers:
+            assert set(type_output_headers.keys()) == set(
+                outputs_order
+            ), f"{set(type_output_headers.keys())}, {set(outputs_order)}"
+            ordered = {id_: type_output_headers[id_] for id_ in outputs_order}
+            type_output_headers.clear()
+            type_output_headers.update(ordered)
+    return csv_headers
+
+
+class AssignmentTable:
+    """
+    Nodes, outputs and impacts of an assignment csv file, read column-wise into arrays.
+    Outputs are kept like the impacts: a default row (nodes x outputs) and scenario rows
+    (scenarios x nodes x outputs), with a mask of the given cells.
+    """
+
+    def __init__(
+        self,
+        node_names: list[str],
+        output_ids: list[str],
+        node_output_labels: np.ndarray,
+        impacts: AssignmentImpacts,
+    ):
+        self.node_names = node_names
+        self.node_index = {name: idx for idx, name in enumerate(node_names)}
+        self.output_ids = output_ids
+        # labels of the outputs of each node (nodes x outputs)
+        self.node_output_labels = node_output_labels
+        self.impacts = impacts
+        shape = (len(node_names), len(output_ids))
+        scenarios_shape = (len(impacts.scenario_names),) + shape
+        self.default_outputs_set = np.zeros(shape, dtype=bool)
+        self.default_output_magnitudes = np.full(shape, np.nan)
+        self.default_output_units = np.full(shape, -1, dtype=np.int32)
+        self.scenario_outputs_set = np.zeros(scenarios_shape, dtype=bool)
+        self.scenario_output_magnitudes = np.full(scenarios_shape, np.nan)
+        self.scenario_output_units = np.full(scenarios_shape, -1, dtype=np.int32)
+        self.output_units: list[str] = []
+
+    def _outputs(
+        self,
+        outputs_set: np.ndarray,
+        magnitudes: np.ndarray,
+        units: np.ndarray,
+        node_idx: int,
+    ) -> list[NodeOutput]:
+        return [
+            NodeOutput(
+                unit=self.output_units[units[output_idx]],
+                magnitude=magnitudes[output_idx],
+                label=self.node_output_labels[node_idx, output_idx],
+            )
+            for output_idx in np.flatnonzero(outputs_set).tolist()
+        ]
+
+    def node_outputs(self, node_name: str, scenario_name: str) -> list[NodeOutput]:
+        """
+        Outputs of a node in a scenario (scenario outputs first, then defaults)
+        :param node_name: name of the node
+        :param scenario_name: name of the scenario
+        :return: outputs
+        """
+        node_idx = self.node_index[node_name]
+        scenario_outputs: list[NodeOutput] = []
+        if (scenario_idx := self.impacts.scenario_index.get(scenario_name)) is not None:
+            scenario_outputs = self._outputs(
+                self.scenario_outputs_set[scenario_idx, node_idx],
+                self.scenario_output_magnitudes[scenario_idx, node_idx],
+                self.scenario_output_units[scenario_idx, node_idx],
+                node_idx,
+            )
+        default_outputs = self._outputs(
+            self.default_outputs_set[node_idx],
+            self.default_output_magnitudes[node_idx],
+            self.default_output_units[node_idx],
+            node_idx,
+        )
+        outputs: list[NodeOutput] = []
+        for output_idx in range(len(self.output_ids)):
+            if len(scenario_outputs) > output_idx:
+                outputs.append(scenario_outputs[output_idx])
+            elif len(default_outputs) > output_idx:
+                outputs.append(default_outputs[output_idx])
+            else:
+                raise EnbiosValidationException(
+                    f"Node '{node_name}' has no default output for output index "
+                    f"{output_idx} (for '{scenario_name}')"
+                )
+        return outputs
+
+
+class AssignmentColumns:
+    """
+    Columns of assignment rows (stripped strings), accessed by header. Cells can be
+    strings, numbers or None (empty).
+    """
+
+    def __init__(self, headers: list[str], raw_columns: list[Sequence[Any]]):
+        self.headers = [h.strip() for h in headers]
+        self.num_rows = len(raw_columns[0]) if raw_columns else 0
+        self._raw_columns = raw_columns
+        self.column_index = {header: idx for idx, header in enumerate(self.headers)}
+        self._columns: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_rows(
+        cls, headers: list[str], rows: Sequence[Sequence[Any]]
+    ) -> "AssignmentColumns":
+        return cls(headers, list(zip(*rows)) if rows else [()] * len(headers))
+
+    @classmethod
+    def from_csv(cls, file_path: PathLike) -> "AssignmentColumns":
+        with ReadPath(file_path).open(encoding="utf-8", newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            headers = next(reader)
+            padding = [""] * len(headers)
+            rows = [
+                row if len(row) == len(headers) else (row + padding)[: len(headers)]
+                for row in reader
+                if row
+            ]
+        return cls.from_rows(headers, rows)
+
+    def concat(self, other: "AssignmentColumns") -> "AssignmentColumns":
+        """
+        Rows of this and another object (with the same headers)
+        """
+        assert self.headers == other.headers
+        return AssignmentColumns(
+            self.headers,
+            [
+                list(raw_column) + list(other_column)
+                for raw_column, other_column in zip(self._raw_columns, other._raw_columns)
+            ],
+        )
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column(self, header: Optional[str]) -> np.ndarray:
+        """
+        Column of a header (empty strings for missing headers)
+        """
+        if header is None or header not in self.column_index:
+            return np.full(len(self), "", dtype=str)
+        if (column := self._columns.get(header)) is None:
+            raw_column = self._raw_columns[self.column_index[header]]
+            column = self._columns[header] = np.array(
+                [
+                    cell.strip() if isinstance(cell, str) else _cell_str(cell)
+                    for cell in raw_column
+                ],
+                dtype=str,
+            )
+        return column
+
+
+def _cell_str(cell: Any) -> str:
+    if cell is None or (isinstance(cell, float) and np.isnan(cell)):
+        return ""
+    return str(cell)
+
+
+def _codes(values: np.ndarray) -> tuple[list[str], np.ndarray]:
+    # distinct values (in the order of their first occurrence) and their index per row
+    distinct, first_idx, inverse = np.unique(
+        values, return_index=True, return_inverse=True
+    )
+    order = np.argsort(first_idx)
+    rank = np.empty(len(order), dtype=int)
+    rank[order] = np.arange(len(order))
+    return distinct[order].tolist(), rank[inverse.ravel()]
+
+
+def _magnitudes(
+    column: np.ndarray, given: np.ndarray, node_names: np.ndarray
+) -> np.ndarray:
+    # magnitudes of the given cells must be numbers (not 0)
+    magnitudes = np.full(len(column), np.nan)
+    try:
+        magnitudes[given] = column[given].astype(float)
+    except ValueError:
+        raise ValueError(
+            f"Invalid magnitudes for nodes: {sorted(set(node_names[given].tolist()))}"
+        )
+    if (magnitudes[given] == 0).any():
+        raise ValueError(
+            f"Magnitude 0 for nodes: "
+            f"{sorted(set(node_names[given & (magnitudes == 0)].tolist()))}"
+        )
+    return magnitudes
+
+
+def read_assignment_table(
+    file_path: PathLike, methods: dict[str, str]
+) -> AssignmentTable:
+    """
+    Read an assignment csv file column-wise (same format as
+    'AssignmentAdapter.read_nodes_from_csv'). Magnitudes are read as arrays and each
+    distinct unit is validated once. The impact arrays are filled directly, without
+    creating objects for each row.
+    :param file_path: csv file
+    :param methods: methods of the adapter (name: unit)
+    :return: table of nodes, outputs and impacts
+    """
+    return build_assignment_table(AssignmentColumns.from_csv(file_path), methods)
+
+
+def build_assignment_table(
+    columns: AssignmentColumns, methods: dict[str, str]
+) -> AssignmentTable:
+    """
+    Validate assignment rows and create their table. The first row of each node
+    defines its outputs and defaults.
+    :param columns: assignment rows
+    :param methods: methods of the adapter (name: unit)
+    :return: table of nodes, outputs and impacts
+    """
+    csv_headers = parse_assignment_csv_headers(columns.headers)
+    row_node_names = columns.column("node_name")
+    if (row_node_names == "").any():
+        raise ValueError("All rows must include a 'node_name'")
+    node_names, row_nodes = _codes(row_node_names)
+    first_rows = np.zeros(len(columns), dtype=bool)
+    first_rows[np.unique(row_nodes, return_index=True)[1]] = True
+    row_scenarios = columns.column("scenario")
+    scenario_rows = row_scenarios != ""
+
+    # node outputs (from the first row of each node)
+    output_ids = list(csv_headers.outputs.keys())
+    node_output_units = np.full((len(node_names), len(output_ids)), "", dtype=object)
+    node_output_labels = np.full((len(node_names), len(output_ids)), None, dtype=object)
+    for output_idx, output_headers in enumerate(csv_headers.outputs.values()):
+        for key, values in [
+            (_UNIT, node_output_units),
+            (_LABEL, node_output_labels),
+        ]:
+            column = columns.column(output_headers.get(key))
+            if (column[~first_rows] != "").any():
+                redefined = row_node_names[~first_rows & (column != "")]
+                raise ValueError(f"Redefinition of output_unit for '{redefined[0]}'")
+            values[row_nodes[first_rows], output_idx] = [
+                cell if cell else None for cell in column[first_rows].tolist()
+            ]
+    if any(unit is None for unit in node_output_units.ravel().tolist()):
+        raise ValueError("First row defining a node must include all 'output' units")
+
+    if not first_rows.all():
+        assert csv_headers.scenario_outputs, (
+            "Multiple rows per node, means header scenario_output_<i>_magnitude"
+            "needs to be included"
+        )
+        if not scenario_rows[~first_rows].all():
+            raise ValueError(
+                f"No scenario defined for a row of "
+                f"'{row_node_names[~first_rows & ~scenario_rows][0]}'"
+            )
+
+    # scenarios
+    scenario_names, scenario_codes = _codes(row_scenarios[scenario_rows])
+    row_scenario_indices = np.full(len(columns), -1, dtype=int)
+    row_scenario_indices[scenario_rows] = scenario_codes
+    scenario_node_keys = row_scenario_indices[scenario_rows] * len(node_names) + (
+        row_nodes[scenario_rows]
+    )
+    unique_keys, key_counts = np.unique(scenario_node_keys, return_counts=True)
+    if (key_counts > 1).any():
+        duplicate_node = node_names[int(unique_keys[key_counts > 1][0] % len(node_names))]
+        raise ValueError(f"Redefinition of scenario impacts for '{duplicate_node}'")
+
+    impacts = AssignmentImpacts(node_names, list(methods.keys()), scenario_names)
+    table = AssignmentTable(node_names, output_ids, node_output_labels, impacts)
+    output_unit_index: dict[str, int] = {}
+
+    # outputs
+    def read_outputs(
+        output_headers: dict[str, dict[str, str]], rows: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        outputs_set = np.zeros((len(columns), len(output_ids)), dtype=bool)
+        magnitudes = np.full((len(columns), len(output_ids)), np.nan)
+        units = np.full((len(columns), len(output_ids)), -1, dtype=np.int32)
+        for output_idx, headers in enumerate(output_headers.values()):
+            unit_column = columns.column(headers.get(_UNIT))
+            magnitude_column = columns.column(headers[_MAGNITUDE])
+            given = rows & ((unit_column != "") | (magnitude_column != ""))
+            magnitudes[:, output_idx] = _magnitudes(
+                magnitude_column, given, row_node_names
+            )
+            outputs_set[:, output_idx] = given
+            row_units = np.where(
+                unit_column != "",
+                unit_column,
+                node_output_units[row_nodes, output_idx].astype(str),
+            )
+            # each distinct (unit, output unit) pair is validated once
+            for unit, node_output_unit in set(
+                zip(
+                    row_units[given].tolist(),
+                    node_output_units[row_nodes[given], output_idx].tolist(),
+                )
+            ):
+                if not unit_match(unit, node_output_unit):
+                    raise ValueError(
+                        f"Unit of output '{unit}' does not match output unit: "
+                        f"'{node_output_unit}'"
+                    )
+            for unit in set(row_units[given].tolist()):
+                pint_unit = unit_conversion(unit, unit).unit
+                if pint_unit not in output_unit_index:
+                    output_unit_index[pint_unit] = len(table.output_units)
+                    table.output_units.append(pint_unit)
+                units[given & (row_units == unit), output_idx] = output_unit_index[
+                    pint_unit
+                ]
+        return outputs_set, magnitudes, units
+
+    default_set, default_magnitudes, default_units = read_outputs(
+        csv_headers.default_outputs, first_rows
+    )
+    first_row_nodes = row_nodes[first_rows]
+    table.default_outputs_set[first_row_nodes] = default_set[first_rows]
+    table.default_output_magnitudes[first_row_nodes] = default_magnitudes[first_rows]
+    table.default_output_units[first_row_nodes] = default_units[first_rows]
+
+    scenario_set, scenario_magnitudes, scenario_units = read_outputs(
+        csv_headers.scenario_outputs, np.ones(len(columns), dtype=bool)
+    )
+    if (scenario_set.any(axis=1) & ~scenario_rows).any():
+        raise ValueError("Scenario name needs to be defined for a scenario row")
+    rows_scenario_nodes = (row_scenario_indices[scenario_rows], row_nodes[scenario_rows])
+    table.scenario_outputs_set[rows_scenario_nodes] = scenario_set[scenario_rows]
+    table.scenario_output_magnitudes[rows_scenario_nodes] = scenario_magnitudes[
+        scenario_rows
+    ]
+    table.scenario_output_units[rows_scenario_nodes] = scenario_units[scenario_rows]
+    # scenario rows need complete outputs (scenario or default)
+    num_outputs = len(output_ids)
+    num_scenario_outputs = scenario_set[scenario_rows].sum(axis=1)
+    num_default_outputs = table.default_outputs_set[row_nodes[scenario_rows]].sum(axis=1)
+    if (
+        (num_scenario_outputs != num_outputs) & (num_default_outputs != num_outputs)
+    ).any():
+        raise EnbiosValidationException(
+            f"Length of scenario output (or default output) must match ouputs: "
+            f"{num_outputs}"
+        )
+
+    # impacts
+    for type_, impact_headers, rows in [
+        (_DEFAULT, csv_headers.default_impacts, first_rows),
+        (_SCENARIO, csv_headers.scenario_impacts, np.ones(len(columns), dtype=bool)),
+    ]:
+        for method_name, headers in impact_headers.items():
+            unit_column = columns.column(headers[_UNIT])
+            magnitude_column = columns.column(headers[_MAGNITUDE])
+            given = rows & ((unit_column != "") | (magnitude_column != ""))
+            if not given.any():
+                continue
+            if (unit_column[given] == "").any():
+                raise ValueError(f"Impact '{method_name}' without unit")
+            if method_name not in methods:
+                raise EnbiosValidationException(
+                    f"Nodes specify undefined {type_}-impact method: '{method_name}'"
+                )
+            magnitudes = _magnitudes(magnitude_column, given, row_node_names)
+            for unit in set(unit_column[given].tolist()):
+                if not unit_match(methods[method_name], unit):
+                    raise EnbiosValidationException(
+                        f"Nodes specify a {type_}-impact '{method_name}' with unit: "
+                        f"'{unit}' that does not match unit specified in adapter "
+                        f"'{methods[method_name]}'"
+                    )
+            if type_ == _SCENARIO:
+                if (given & ~scenario_rows).any():
+                    raise ValueError(
+                        "Scenario name needs to be defined for a scenario row"
+                    )
+                impacts.set_impact_column(
+                    method_name,
+                    row_nodes[given],
+                    magnitudes[given],
+                    unit_column[given],
+                    row_scenario_indices[given],
+                )
+            else:
+                impacts.set_impact_column(
+                    method_name,
+                    row_nodes[given],
+                    magnitudes[given],
+                    unit_column[given],
+                )
+    return table
@@ -0,0 +1,260 @@
+import zipfile
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
+from enbios.base.models import (
+    AdapterModel,
+    EnbiosValidationException,
+    NodeOutput,
+    ResultValue,
+)
+from enbios.base.scenario import Scenario
+from enbios.generic.files import PathLike, ReadPath
+from enbios.generic.unit_util import convert_magnitude, unit_conversion
+
+
+class MatrixAdapterConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    matrix_file: Union[str, Path] = Field(
+        description="Impacts per unit output (nodes x methods) as .npy or .npz file"
+    )
+    matrix_key: str = Field(
+        "impacts", description="Name of the array in a .npz file (stored uncompressed)"
+    )
+    index_file: Union[str, Path] = Field(
+        description="csv file with the columns 'id' and 'unit' (one row per matrix row)"
+    )
+
+
+class MatrixMethodConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    column: int = Field(ge=0, description="Column of the method in the matrix")
+    unit: str
+
+
+class MatrixAdapterDefinition(BaseModel):
+    methods: dict[str, MatrixMethodConfig]
+    config: MatrixAdapterConfig
+
+
+class MatrixNodeConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    id: Optional[str] = Field(None, description="Id in the index file (node name)")
+    default_output: Optional[NodeOutput] = Field(
+        None, description="Default output of the node for all scenarios"
+    )
+
+
+def memmap_npz_array(file_path: PathLike, key: str) -> np.memmap:
+    """
+    Memory map an array of an uncompressed .npz file (np.savez)
+    :param file_path: path of the .npz file
+    :param key: name of the array
+    :return: read-only memory map of the array
+    """
+    with zipfile.ZipFile(file_path) as zip_file:
+        try:
+            info = zip_file.getinfo(f"{key}.npy")
+        except KeyError:
+            raise EnbiosValidationException(f"Array '{key}' not found in '{file_path}'")
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise EnbiosValidationException(
+                f"Array '{key}' in '{file_path}' is compressed and cannot be memory "
+                f"mapped. Store it with 'np.savez' or as .npy file"
+            )
+    with open(file_path, "rb") as file:
+        # skip the local file header of the zip entry
+        file.seek(info.header_offset + 26)
+        name_length = int.from_bytes(file.read(2), "little")
+        extra_length = int.from_bytes(file.read(2), "little")
+        file.seek(name_length + extra_length, 1)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(file)
+        elif version == (2, 0):
+            header = np.lib.format.read_array_header_2_0(file)
+        else:
+            raise EnbiosValidationException(
+                f"Unsupported npy format version {version} of '{key}' in '{file_path}'"
+            )
+        shape, fortran_order, dtype = header
+        offset = file.tell()
+    return np.memmap(
+        file_path,
+        dtype=dtype,
+        mode="r",
+        offset=offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+class MatrixAdapter(EnbiosAdapter):
+    """
+    Impacts from a matrix of precomputed impacts per unit output (nodes x methods).
+    The matrix is memory mapped, so it is only read when a scenario runs and shared
+    (page cache) between processes.
+    """
+
+    @staticmethod
+    def name():
+        return "matrix-adapter"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.definition: Optional[MatrixAdapterDefinition] = None
+        self.methods: dict[str, MatrixMethodConfig] = {}
+        # id: (matrix row, unit)
+        self.index: dict[str, tuple[int, str]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        # node name: matrix row
+        self.node_rows: dict[str, int] = {}
+        self.node_units: dict[str, str] = {}
+        self.default_outputs: dict[str, NodeOutput] = {}
+        # scenario name: node name: output (in the unit of the index)
+        self.scenario_outputs: dict[str, dict[str, NodeOutput]] = {}
+
+    def validate_definition(self, definition: AdapterModel):
+        self.definition = MatrixAdapterDefinition(**definition.model_dump())
+
+    def validate_config(self, config: Optional[dict[str, Any]]):
+        assert self.definition  # that's just for mypy
+        index_rows = ReadPath(self.definition.config.index_file).read_data()
+        self.index = {
+            row["id"].strip(): (idx, unit_conversion(row["unit"], row["unit"]).unit)
+            for idx, row in enumerate(index_rows)
+        }
+        if len(self.index) != len(index_rows):
+            raise EnbiosValidationException(
+                f"Ids in '{self.definition.config.index_file}' are not unique"
+            )
+        matrix = self.matrix
+        if matrix.ndim != 2 or matrix.shape[0] != len(self.index):
+            raise EnbiosValidationException(
+                f"Matrix must have the shape (nodes x methods), with one row per index "
+                f"entry ({len(self.index)}). Found shape: {matrix.shape}"
+            )
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Memory map of the impact matrix (nodes x methods)
+        """
+        if self._matrix is None:
+            assert self.definition
+            config = self.definition.config
+            matrix_file = ReadPath(config.matrix_file)
+            if matrix_file.suffix == ".npz":
+                self._matrix = memmap_npz_array(matrix_file, config.matrix_key)
+            else:
+                self._matrix = np.load(matrix_file, mmap_mode="r")
+        return self._matrix
+
+    def __getstate__(self) -> dict[str, Any]:
+        # processes open the memory map again, instead of copying the matrix
+        state = self.__dict__.copy()
+        state["_matrix"] = None
+        return state
+
+    def validate_methods(self, methods: Optional[dict[str, Any]]) -> list[str]:
+        assert self.definition
+        self.methods = self.definition.methods
+        for method_name, method in self.methods.items():
+            if method.column >= self.matrix.shape[1]:
+                raise EnbiosValidationException(
+                    f"Column of method '{method_name}' ({method.column}) is not in the "
+                    f"matrix (columns: {self.matrix.shape[1]})"
+                )
+            unit_conversion(method.unit, method.unit)
+        return list(self.methods.keys())
+
+    def validate_node(self, node_name: str, node_config: Any):
+        node_config = MatrixNodeConfig(**(node_config or {}))
+        node_id = node_config.id or node_name
+        if node_id not in self.index:
+            raise EnbiosValidationException(
+                f"Node '{node_name}' (id: '{node_id}') is not in the matrix index"
+            )
+        self.node_rows[node_name], self.node_units[node_name] = self.index[node_id]
+        unit = self.node_units[node_name]
+        self.default_outputs[node_name] = self._convert_output(
+            node_name, node_config.default_output or NodeOutput(unit=unit, magnitude=1)
+        )
+
+    def _convert_output(self, node_name: str, output: NodeOutput) -> NodeOutput:
+        # output in the unit of the index
+        unit = self.get_node_output_unit(node_name)
+        return NodeOutput(
+            unit=unit_conversion(output.unit, unit).unit,
+            magnitude=convert_magnitude(output.magnitude, output.unit, unit),
+        )
+
+    def validate_scenario_node(
+        self, node_name: str, scenario_name: str, scenario_node_data: Any
+    ):
+        self.scenario_outputs.setdefault(scenario_name, {})[
+            node_name
+        ] = self._convert_output(node_name, NodeOutput.model_validate(scenario_node_data))
+
+    def get_node_output_unit(self, node_name: str) -> str:
+        return self.node_units[node_name]
+
+    def get_node_output(self, node_name: str, scenario: str) -> list[NodeOutput]:
+        if node_name in (scenario_outputs := self.scenario_outputs.get(scenario, {})):
+            return [scenario_outputs[node_name]]
+        return [self.default_outputs[node_name]]
+
+    def get_method_unit(self, method_name: str) -> str:
+        return self.methods[method_name].unit
+
+    def run_scenario(self, scenario: Scenario) -> dict[str, dict[str, ResultValue]]:
+        scenario_outputs = self.scenario_outputs.get(scenario.name, {})
+        node_names: list[str] = []
+        rows: list[int] = []
+        outputs: list[float] = []
+        for node_name, row in self.node_rows.items():
+            if node_name in scenario_outputs:
+                output = scenario_outputs[node_name]
+            elif not scenario.config.exclude_defaults:
+                output = self.default_outputs[node_name]
+            else:
+                continue
+            node_names.append(node_name)
+            rows.append(row)
+            outputs.append(output.magnitude)
+        method_names = list(self.methods.keys())
+        columns = [self.methods[method_name].column for method_name in method_names]
+        method_units = [self.methods[method_name].unit for method_name in method_names]
+        # read the rows of the nodes and scale them by the outputs
+        impacts = (
+            np.asarray(self.matrix[np.array(rows, dtype=int)][:, columns], dtype=float)
+            * np.array(outputs)[:, None]
+        )
+        return {
+            node_name: {
+                method_name: ResultValue(unit=unit, magnitude=magnitude)
+                for method_name, unit, magnitude in zip(
+                    method_names, method_units, node_impacts
+                )
+            }
+            for node_name, node_impacts in zip(node_names, impacts.tolist())
+        }
+
+    @staticmethod
+    def node_indicator() -> str:
+        return "matrix"
+
+    @staticmethod
+    def get_config_schemas() -> dict:
+        return {
+            "adapter": MatrixAdapterConfig.model_json_schema(),
+            "node_name": MatrixNodeConfig.model_json_schema(),
+            "method": MatrixMethodConfig.model_json_schema(),
+        }
+
+    def __repr__(self):
+        return "Enbios builtin Matrix Adapter"
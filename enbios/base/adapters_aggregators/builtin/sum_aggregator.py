@@ -1,5 +1,7 @@
 from typing import Optional, Any
 
+import numpy as np
+
 from enbios.base.adapters_aggregators.aggregator import EnbiosAggregator
 from enbios.generic.enbios2_logging import get_logger
 from enbios.generic.output_merge import merge_outputs
@@ -9,7 +11,19 @@ from enbios.base.models import (
     output_merge_type,
     ResultValue,
     ScenarioResultNodeData,
+    ResultStatistics,
 )
+from enbios.generic.online_statistics import sample_statistics
+
+
+def _sum_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    Sum up the rows one after the other (like a python sum). For a single column,
+    np.sum uses pairwise summation, whose results can differ in the last digits.
+    """
+    if rows.shape[1] == 1:
+        return np.cumsum(rows[:, 0])[-1:]
+    return rows.sum(axis=0)
 
 
 class SumAggregator(EnbiosAggregator):
@@ -40,45 +54,227 @@ class SumAggregator(EnbiosAggregator):
     def aggregate_node_result(
         self, node: BasicTreeNode[ScenarioResultNodeData], scenario_name: str
     ) -> dict[str, ResultValue]:
+        """
+        Sum the results of the children. The magnitudes of all children (children x
+        methods) and the multi_magnitudes of each method (children x samples) are stacked
+        and summed up at once. Shorter multi_magnitudes count as padded with zeros
+        (children are not changed).
+        """
+        children = node.children
+        children_results = [child.data.results for child in children]
+        keys = list(dict.fromkeys(key for results in children_results for key in results))
+        if not keys:
+            return {}
+        magnitudes = np.zeros((len(children), len(keys)))
+        for child_idx, results in enumerate(children_results):
+            for key_idx, key in enumerate(keys):
+                if (value := results.get(key)) is not None and value.magnitude:
+                    magnitudes[child_idx, key_idx] = value.magnitude
+        summed_magnitudes = _sum_rows(magnitudes).tolist()
+
         result: dict[str, ResultValue] = {}
-        for child in node.children:
-            for key, value in child.data.results.items():
-                ignore_short_multi_mag = False
-                if result.get(key) is None:
-                    result[key] = ResultValue(
-                        magnitude=0, unit=value.unit, multi_magnitude=[]
-                    )
-                    ignore_short_multi_mag = True
-                node_agg_result = result[key]
-                if value.magnitude:
-                    node_agg_result.magnitude += value.magnitude
-                # multi_magnitude
-                max_len = max(
-                    len(node_agg_result.multi_magnitude), len(value.multi_magnitude)
+        for key, magnitude in zip(keys, summed_magnitudes):
+            key_children = [
+                (child, results[key])
+                for child, results in zip(children, children_results)
+                if key in results
+            ]
+            multi_magnitudes = [value.multi_magnitude for _, value in key_children]
+            self._warn_unequal_multi_magnitudes(node, key_children)
+            max_len = max(len(multi_magnitude) for multi_magnitude in multi_magnitudes)
+            summed_multi_magnitude: list[float] = []
+            if max_len:
+                stacked = np.zeros((len(multi_magnitudes), max_len))
+                for row, multi_magnitude in zip(stacked, multi_magnitudes):
+                    row[: len(multi_magnitude)] = multi_magnitude
+                summed_multi_magnitude = _sum_rows(stacked).tolist()
+            result[key] = ResultValue(
+                magnitude=magnitude,
+                unit=key_children[0][1].unit,
+                multi_magnitude=summed_multi_magnitude,
+            )
+        self.aggregate_statistics(node, result)
+        return result
+
+    def aggregate_level(
+        self, nodes: list[BasicTreeNode[ScenarioResultNodeData]], scenario_name: str
+    ) -> list[dict[str, ResultValue]]:
+        if not self._sums_nodes_only():
+            return super().aggregate_level(nodes, scenario_name)
+        return self._sum_level(nodes, [scenario_name] * len(nodes))
+
+    def aggregate_scenarios_level(
+        self, scenario_nodes: dict[str, list[BasicTreeNode[ScenarioResultNodeData]]]
+    ) -> dict[str, list[dict[str, ResultValue]]]:
+        """
+        The nodes of all scenarios are summed up together (see _sum_level).
+        """
+        if not self._sums_nodes_only():
+            return super().aggregate_scenarios_level(scenario_nodes)
+        level_results = iter(
+            self._sum_level(
+                [node for nodes in scenario_nodes.values() for node in nodes],
+                [
+                    scenario_name
+                    for scenario_name, nodes in scenario_nodes.items()
+                    for _ in nodes
+                ],
+            )
+        )
+        return {
+            scenario_name: [next(level_results) for _ in nodes]
+            for scenario_name, nodes in scenario_nodes.items()
+        }
+
+    def _sums_nodes_only(self) -> bool:
+        # subclasses, which change the aggregation of a level or node, aggregate with it
+        return (
+            type(self).aggregate_node_result is SumAggregator.aggregate_node_result
+            and type(self).aggregate_level is SumAggregator.aggregate_level
+        )
+
+    def _sum_level(
+        self,
+        nodes: list[BasicTreeNode[ScenarioResultNodeData]],
+        scenario_names: list[str],
+    ) -> list[dict[str, ResultValue]]:
+        """
+        Sum the results of the children of several nodes. The magnitudes of the children
+        of all nodes (children x methods) are stacked and summed up per node at once.
+        Nodes with children that have multi_magnitudes or statistics are aggregated by
+        aggregate_node_result.
+        :param nodes: nodes (of one or several scenarios)
+        :param scenario_names: scenario name of each node
+        """
+        level_results: list[dict[str, ResultValue]] = [{} for _ in nodes]
+        keys: dict[str, int] = {}
+        # node index, node keys (with their unit), children results
+        simple_nodes: list[tuple[int, dict[str, str], list[dict[str, ResultValue]]]] = []
+        for node_idx, (node, scenario_name) in enumerate(zip(nodes, scenario_names)):
+            children_results = [child.data.results for child in node.children]
+            if any(
+                value.multi_magnitude or value.statistics
+                for results in children_results
+                for value in results.values()
+            ):
+                level_results[node_idx] = self.aggregate_node_result(node, scenario_name)
+                continue
+            node_keys: dict[str, str] = {}
+            for results in children_results:
+                for key, value in results.items():
+                    node_keys.setdefault(key, value.unit)
+                    keys.setdefault(key, len(keys))
+            if node_keys:
+                simple_nodes.append((node_idx, node_keys, children_results))
+        if not simple_nodes:
+            return level_results
+
+        num_children = [len(children_results) for _, _, children_results in simple_nodes]
+        magnitudes = np.zeros((sum(num_children), len(keys)))
+        row = 0
+        for _, _, children_results in simple_nodes:
+            for results in children_results:
+                for key, value in results.items():
+                    if value.magnitude:
+                        magnitudes[row, keys[key]] = value.magnitude
+                row += 1
+        # rows are added one after the other (see _sum_rows)
+        summed_magnitudes = np.zeros((len(simple_nodes), len(keys)))
+        np.add.at(
+            summed_magnitudes,
+            np.repeat(np.arange(len(simple_nodes)), num_children),
+            magnitudes,
+        )
+        for (node_idx, node_keys, _), node_magnitudes in zip(
+            simple_nodes, summed_magnitudes.tolist()
+        ):
+            level_results[node_idx] = {
+                key: ResultValue(
+                    magnitude=node_magnitudes[keys[key]], unit=unit, multi_magnitude=[]
+                )
+                for key, unit in node_keys.items()
+            }
+        return level_results
+
+    def _warn_unequal_multi_magnitudes(
+        self,
+        node: BasicTreeNode[ScenarioResultNodeData],
+        key_children: list[tuple[BasicTreeNode[ScenarioResultNodeData], ResultValue]],
+    ):
+        # the sum (of the previous children) is compared to each following child
+        summed_len = len(key_children[0][1].multi_magnitude)
+        for child, value in key_children[1:]:
+            if len(value.multi_magnitude) > summed_len:
+                self.logger.warning(
+                    f"Multi magnitude of node {node.name} is shorter than child {child.name}."
+                )
+                summed_len = len(value.multi_magnitude)
+            elif len(value.multi_magnitude) < summed_len:
+                self.logger.warning(
+                    f"Multi magnitude of child {child.name} is shorter than node {node.name}."
                 )
-                if len(node_agg_result.multi_magnitude) < max_len:
-                    node_agg_result.multi_magnitude.extend(
-                        [0] * (max_len - len(node_agg_result.multi_magnitude))
-                    )
-                    if not ignore_short_multi_mag:
-                        self.get_logger().warning(
-                            f"Multi magnitude of node {node.name} is shorter than child {child.name}."
-                        )
-                if len(value.multi_magnitude) < max_len:
-                    value.multi_magnitude.extend(
-                        [0] * (max_len - len(value.multi_magnitude))
-                    )
-                    self.get_logger().warning(
-                        f"Multi magnitude of child {child.name} is shorter than node {node.name}."
-                    )
 
-                result[key].multi_magnitude = [
-                    a + b
-                    for a, b in zip(
-                        node_agg_result.multi_magnitude, value.multi_magnitude
+    @staticmethod
+    def aggregate_statistics(
+        node: BasicTreeNode[ScenarioResultNodeData], result: dict[str, ResultValue]
+    ):
+        """
+        Sum the samples of the children (stacked) and calculate the statistics of the
+        node. Children without statistics count as constant. When samples are missing,
+        only the mean is known.
+        :param node: node to aggregate
+        :param result: aggregated results of the node (statistics are added)
+        """
+        for key, node_result in result.items():
+            values = [
+                child.data.results[key]
+                for child in node.children
+                if key in child.data.results
+            ]
+            children_statistics = [v.statistics for v in values if v.statistics]
+            if not children_statistics:
+                continue
+            quantiles = sorted(
+                {float(q) for stats in children_statistics for q in stats.quantiles}
+            )
+            summed_samples: Optional[np.ndarray] = None
+            rows: list[Any] = []
+            for value in values:
+                if value._samples is not None:
+                    rows.append(np.asarray(value._samples))
+                elif value.statistics is None:
+                    rows.append(value.magnitude or 0.0)
+                else:
+                    rows = []
+                    break
+            sample_arrays = [row for row in rows if np.ndim(row)]
+            if sample_arrays and len({len(row) for row in sample_arrays}) == 1:
+                # constant children are broadcast to the samples
+                num_samples = len(sample_arrays[0])
+                dtype = np.result_type(*sample_arrays)
+                summed_samples = _sum_rows(
+                    np.stack(
+                        [
+                            np.full(num_samples, row, dtype=dtype)
+                            if not np.ndim(row)
+                            else row
+                            for row in rows
+                        ]
                     )
-                ]
-        return result
+                )
+            if summed_samples is not None:
+                node_result._samples = summed_samples
+                node_result.statistics = ResultStatistics.model_validate(
+                    sample_statistics(summed_samples[:, None], quantiles)[0]
+                )
+            else:
+                node_result.statistics = ResultStatistics(
+                    count=max(stats.count for stats in children_statistics),
+                    mean=sum(
+                        v.statistics.mean if v.statistics else (v.magnitude or 0.0)
+                        for v in values
+                    ),
+                )
 
     @staticmethod
     def node_indicator() -> str:
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
+from enbios.base.models import AdapterCacheConfig, AdapterModel, NodeOutput, ResultValue
+from enbios.base.scenario import Scenario
+from enbios.generic.enbios2_logging import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE_SUFFIX = ".pkl"
+
+
+class ResultCache:
+    """
+    Scenario results on disk, one file per input hash. When the files exceed the byte
+    budget, the least recently used ones are deleted.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_FILE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with path.open("rb") as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            logger.warning(f"Could not read cached results '{path}': {err}")
+            return None
+        self._mark_used(path)
+        return value
+
+    @staticmethod
+    def _mark_used(path: Path):
+        # the modification time marks the last use (file system timestamps can be coarse)
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with temp_path.open("wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self._mark_used(path)
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path):
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob(f"*{CACHE_FILE_SUFFIX}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total_bytes <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                logger.debug(f"Dropping cached results '{path.name}'")
+                path.unlink(missing_ok=True)
+                total_bytes -= size
+
+
+class CachedAdapter(EnbiosAdapter):
+    """
+    Wraps an adapter, whose results only depend on its definition, the node configs and
+    the node outputs (deterministic adapters). 'run_scenario' results are stored on disk
+    by a hash of these inputs, and are served from there, when they are unchanged.
+    The module file of adapters with a 'module_path' is hashed by its content, other
+    files in the config are only hashed by their path.
+    Other attributes are taken from the wrapped adapter.
+    """
+
+    def __init__(self, adapter: EnbiosAdapter, cache_config: AdapterCacheConfig):
+        super().__init__()
+        self.adapter = adapter
+        self.cache = ResultCache(Path(cache_config.dir), cache_config.max_bytes)
+        self._definition: Any = None
+        self._module_hash: Optional[str] = None
+        # node name: node config (as json)
+        self._node_configs: dict[str, str] = {}
+        # scenario name: node name: scenario node data (as json)
+        self._scenario_node_data: dict[str, dict[str, str]] = {}
+        # scenario name: node name: extras (of the last run)
+        self._extras: dict[str, dict[str, dict[str, Any]]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes, that are not defined in the wrapper
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    def name(self) -> str:  # type: ignore
+        return self.adapter.name()
+
+    def node_indicator(self) -> str:  # type: ignore
+        return self.adapter.node_indicator()
+
+    def get_config_schemas(self) -> dict:  # type: ignore
+        return self.adapter.get_config_schemas()
+
+    def validate_definition(self, definition: AdapterModel):
+        self._definition = definition.model_dump(exclude={"cache", "note"})
+        if definition.module_path:
+            self._module_hash = hashlib.sha256(
+                Path(definition.module_path).read_bytes()
+            ).hexdigest()
+        self.adapter.validate_definition(definition)
+
+    def validate_config(self, config: Optional[dict[str, Any]]):
+        self.adapter.validate_config(config)
+
+    def validate_methods(self, methods: Optional[dict[str, Any]]) -> list[str]:
+        return self.adapter.validate_methods(methods)
+
+    def validate_node(self, node_name: str, node_config: Any):
+        self._node_configs[node_name] = _json(node_config)
+        self.adapter.validate_node(node_name, node_config)
+
+    def validate_scenario_node(
+        self, node_name: str, scenario_name: str, scenario_node_data: Any
+    ):
+        self._scenario_node_data.setdefault(scenario_name, {})[node_name] = _json(
+            scenario_node_data
+        )
+        self.adapter.validate_scenario_node(node_name, scenario_name, scenario_node_data)
+
+    def get_node_output(self, node_name: str, scenario: str) -> list[NodeOutput]:
+        return self.adapter.get_node_output(node_name, scenario)
+
+    def get_method_unit(self, method_name: str) -> str:
+        return self.adapter.get_method_unit(method_name)
+
+    def input_hash(self, scenario: Scenario) -> str:
+        """
+        Hash of the inputs of a scenario run: the adapter definition (and the content
+        of its module file), scenario config, node configs, scenario node data and the
+        outputs of all nodes.
+        """
+        scenario_node_data = self._scenario_node_data.get(scenario.name, {})
+        node_inputs = [
+            [
+                node_name,
+                node_config,
+                scenario_node_data.get(node_name),
+                [
+                    output.model_dump()
+                    for output in self.adapter.get_node_output(node_name, scenario.name)
+                ],
+            ]
+            for node_name, node_config in self._node_configs.items()
+        ]
+        inputs = [
+            type(self.adapter).__module__,
+            type(self.adapter).__qualname__,
+            self._definition,
+            self._module_hash,
+            scenario.config.model_dump(),
+            node_inputs,
+        ]
+        return hashlib.sha256(_json(inputs).encode("utf-8")).hexdigest()
+
+    def run_scenario(self, scenario: Scenario) -> dict[str, dict[str, ResultValue]]:
+        key = self.input_hash(scenario)
+        if (cached := self.cache.get(key)) is not None:
+            logger.debug(f"Using cached results of '{self.name()}' for '{scenario.name}'")
+            results, self._extras[scenario.name] = cached
+            return results
+        results = self.adapter.run_scenario(scenario)
+        extras = {
+            node_name: self.adapter.result_extras(node_name, scenario.name)
+            for node_name in results
+        }
+        self._extras[scenario.name] = extras
+        self.cache.set(key, (results, extras))
+        return results
+
+    def result_extras(self, node_name: str, scenario_name: str) -> dict[str, Any]:
+        if (extras := self._extras.get(scenario_name)) is not None:
+            return extras.get(node_name, {})
+        return self.adapter.result_extras(node_name, scenario_name)
+
+    def __repr__(self):
+        return f"Cached {self.adapter!r}"
+
+
+def _json(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, default=str)
@@ -23,6 +23,17 @@ def get_module_classes(
 
 def create_module_object(
     model_data: Union[AdapterModel, AggregationModel], base_class: Type
+) -> Union[EnbiosAdapter, EnbiosAggregator]:
+    module_object = _instantiate_module_class(model_data, base_class)
+    if isinstance(model_data, AdapterModel) and model_data.cache:
+        from enbios.base.adapters_aggregators.cached_adapter import CachedAdapter
+
+        return CachedAdapter(cast(EnbiosAdapter, module_object), model_data.cache)
+    return module_object
+
+
+def _instantiate_module_class(
+    model_data: Union[AdapterModel, AggregationModel], base_class: Type
 ) -> Union[EnbiosAdapter, EnbiosAggregator]:
     if model_data.module_path:
         assert model_data.module_path
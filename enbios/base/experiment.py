@@ -5,7 +5,17 @@ import time
 from datetime import timedelta
 from pathlib import Path
 from tempfile import gettempdir
-from typing import Any, Optional, Union, Type, cast, TypeVar
+from types import MappingProxyType
+from typing import (
+    Any,
+    Optional,
+    Union,
+    Type,
+    cast,
+    TypeVar,
+    TYPE_CHECKING,
+    Mapping,
+)
 
 from python_mermaid.diagram import MermaidDiagram
 from python_mermaid.link import Link
@@ -36,11 +46,13 @@ from enbios.base.validation import (
     validate_adapters,
     validate_aggregators,
 )
-from enbios.bw2.MultiLCA_util import BaseStackedMultiLCA
 from enbios.generic.enbios2_logging import get_logger, EnbiosLogger
 from enbios.generic.files import PathLike, ReadPath
 from enbios.generic.tree.basic_tree import BasicTreeNode
 
+if TYPE_CHECKING:
+    from enbios.bw2.MultiLCA_util import BaseStackedMultiLCA
+
 logger = get_logger(__name__)
 
 T = TypeVar("T", bound=EnbiosNodeModule)
@@ -88,11 +100,22 @@ class Experiment:
             TechTreeNodeData
         ] = validate_experiment_hierarchy(self.resolved_raw_data.hierarchy)
         self._structural_nodes: dict[str, BasicTreeNode[TechTreeNodeData]] = {}
+        # node id: adapter/aggregator
+        node_modules: dict[bytes, EnbiosNodeModule] = {}
         # validate individual nodes based on their adapter/aggregator
         for node in self.hierarchy_root.iter_all_nodes():
-            self.get_node_module(node).validate_node(node.name, node.data.config)
+            node_modules[node.id] = self._resolve_node_module(node)
+            node_modules[node.id].validate_node(node.name, node.data.config)
             if node.is_leaf:
                 self._structural_nodes[node.name] = node
+        # node name: adapter/aggregator of the first node with the name, like get_node
+        # (see node_modules)
+        self._node_modules: dict[str, EnbiosNodeModule] = {}
+        nodes = [self.hierarchy_root]
+        while nodes:
+            node = nodes.pop()
+            self._node_modules.setdefault(node.name, node_modules[node.id])
+            nodes.extend(reversed(node.children))
 
         def recursive_convert(
             node_: BasicTreeNode[TechTreeNodeData],
@@ -138,10 +161,19 @@ class Experiment:
         module_type: Optional[T] = EnbiosNodeModule,
     ) -> T:
         """
-        Get the module of a node in the experiment hierarchy
+        Get the module of a node in the experiment hierarchy. Modules of nodes given by
+        name are taken from node_modules. Node objects (e.g. of alternative hierarchies)
+        are resolved by their adapter/aggregator.
         """
         if isinstance(node, str):
-            node = self.hierarchy_root.find_subnode_by_name(node)
+            if (node_module := self._node_modules.get(node)) is not None:
+                return cast(T, node_module)
+            node = self.get_node(node)
+        return cast(T, self._resolve_node_module(node))
+
+    def _resolve_node_module(
+        self, node: BasicTreeNode[TechTreeNodeData]
+    ) -> EnbiosNodeModule:
         try:
             if node.is_leaf:
                 return self.get_module_by_name_or_node_indicator(
@@ -222,7 +254,11 @@ class Experiment:
         results = {}
         start_time = time.time()
         for scenario in run_scenarios:
-            results[scenario.name] = scenario.run(results_as_dict)
+            scenario.run_adapters()
+        # aggregate all scenarios in one walk of the hierarchy
+        Scenario.propagate_results(run_scenarios)
+        for scenario in run_scenarios:
+            results[scenario.name] = scenario.get_results(results_as_dict)
         self._execution_time = time.time() - start_time
         return results
 
@@ -372,6 +408,15 @@ class Experiment:
             f"Scenarios: {len(self.scenarios)}\n"
         )
 
+    @property
+    def node_modules(self) -> Mapping[str, EnbiosNodeModule]:
+        """
+        Adapter/aggregator of each node in the hierarchy (by node name), which are
+        resolved once, when the experiment is created
+        :return: read-only mapping node name: module
+        """
+        return MappingProxyType(self._node_modules)
+
     @property
     def structural_nodes_names(self) -> list[str]:
         """
@@ -419,7 +464,6 @@ class Experiment:
             scenario_data.name = scenario_data.name + f" ({extra_index})"
             extra_index += 1
         scenario = validate_scenario(scenario_data, self)
-        scenario.prepare_tree()
         if append_scenario:
             self.scenarios.append(scenario)
         return scenario.run(result_as_dict)
@@ -526,14 +570,14 @@ class Experiment:
                 name: Experiment.get_module_definition(adapter, True)
                 for name, adapter in (
                     self._adapters
-                    | (BUILTIN_ADAPTERS if include_all_builtin_configs else {})
+                    | (dict(BUILTIN_ADAPTERS) if include_all_builtin_configs else {})
                 ).items()
             },
             "aggregators": {
                 name: Experiment.get_module_definition(aggregator, True)
                 for name, aggregator in (
                     self._aggregators
-                    | (BUILTIN_AGGREGATORS if include_all_builtin_configs else {})
+                    | (dict(BUILTIN_AGGREGATORS) if include_all_builtin_configs else {})
                 ).items()
             },
         }
@@ -102,4 +102,14 @@ def resolve_input_files(raw_input: ExperimentData) -> ExperimentDataResolved:
         else:
             raise Exception(f"Invalid scenario file: {raw_input.scenarios}")
 
-    return ExperimentDataResolved.model_validate(raw_input.model_dump())
+    # all parts are validated at this point (ExperimentData and the loaded files).
+    # They are shared with raw_input, except for the scenarios, which are changed
+    # during the validation (name_factory)
+    resolved_data = {
+        field: getattr(raw_input, field) for field in ExperimentDataResolved.model_fields
+    }
+    if resolved_data["scenarios"]:
+        resolved_data["scenarios"] = [
+            scenario.model_copy() for scenario in resolved_data["scenarios"]
+        ]
+    return ExperimentDataResolved.model_construct(**resolved_data)
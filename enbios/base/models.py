@@ -3,7 +3,16 @@ from typing import Optional, Union, Any, Type
 
 from pint import Quantity
 from pint.facets.plain import PlainQuantity
-from pydantic import ConfigDict, BaseModel, Field, model_validator, field_validator
+from pydantic import (
+    ConfigDict,
+    BaseModel,
+    Field,
+    model_validator,
+    field_validator,
+    PrivateAttr,
+    model_serializer,
+    SerializerFunctionWrapHandler,
+)
 from pydantic_settings import BaseSettings
 
 from enbios import PathLike
@@ -34,6 +43,14 @@ class ExperimentConfig(BaseModel):
     note: Optional[str] = None
 
 
+class AdapterCacheConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    dir: PathLike = Field(description="Directory of the cached results")
+    max_bytes: Optional[int] = Field(
+        None, gt=0, description="Byte budget of the cache (least recently used are dropped)"
+    )
+
+
 class AdapterModel(BaseModel):
     model_config = ConfigDict(extra="allow")
     module_path: Optional[PathLike] = None
@@ -44,6 +61,11 @@ class AdapterModel(BaseModel):
     config: dict = Field(default_factory=dict)
     methods: dict[str, Any] = Field(default_factory=dict)
     note: Optional[str] = Field(None, description="A note for this adapter")
+    cache: Optional[AdapterCacheConfig] = Field(
+        None,
+        description="Cache the scenario results on disk, by a hash of the node configs "
+        "and outputs (for deterministic adapters)",
+    )
 
     @model_validator(mode="before")  # type: ignore
     def module_specified(data: Any):
@@ -224,11 +246,34 @@ class TechTreeNodeData(BaseModel):
         return data
 
 
+class ResultStatistics(BaseModel):
+    model_config = StrictInputConfig
+    count: int
+    mean: float
+    variance: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: dict[str, float] = Field(
+        default_factory=dict, description="quantile (e.g. '0.05') to value"
+    )
+
+
 class ResultValue(BaseModel):
     model_config = StrictInputConfig
     unit: str
     magnitude: Optional[float] = None  # type: ignore
     multi_magnitude: Optional[list[float]] = field(default_factory=list)
+    statistics: Optional[ResultStatistics] = None
+    # samples as array (can be memory mapped), used for aggregating the statistics
+    _samples: Optional[Any] = PrivateAttr(None)
+
+    @model_serializer(mode="wrap")
+    def serialize(self, handler: SerializerFunctionWrapHandler) -> dict[str, Any]:
+        data = handler(self)
+        # only results of MonteCarlo statistics have the field
+        if self.statistics is None:
+            data.pop("statistics", None)
+        return data
 
 
 class ScenarioResultNodeData(BaseModel):
@@ -19,6 +19,7 @@ from enbios.generic.files import PathLike
 
 # for type hinting
 if TYPE_CHECKING:
+    from enbios.base.adapters_aggregators.aggregator import EnbiosAggregator
     from enbios.base.experiment import Experiment
 from enbios.generic.tree.basic_tree import BasicTreeNode
 
@@ -29,7 +30,8 @@ logger = get_logger(__name__)
 class Scenario:
     experiment: "Experiment"
     name: str
-    result_tree: BasicTreeNode[ScenarioResultNodeData]
+    # copy of the base result tree of the experiment, created on first use (result_tree)
+    _result_tree: Optional[BasicTreeNode[ScenarioResultNodeData]] = None
 
     _has_run: bool = False
     # this should be a simpler type - just str: float
@@ -38,6 +40,22 @@ class Scenario:
     _execution_time: float = float("NaN")
     config: ScenarioConfig = field(default_factory=ScenarioConfig)  # type: ignore
 
+    @property
+    def result_tree(self) -> BasicTreeNode[ScenarioResultNodeData]:
+        """
+        The result tree of the scenario. It is created and prepared (prepare_tree) on
+        first use (running or exporting the scenario), so scenarios, that are not used,
+        cost nothing.
+        """
+        if self._result_tree is None:
+            self.prepare_tree()
+        assert self._result_tree is not None
+        return self._result_tree
+
+    @result_tree.setter
+    def result_tree(self, result_tree: BasicTreeNode[ScenarioResultNodeData]):
+        self._result_tree = result_tree
+
     def prepare_tree(self):
         """Prepare the result tree for calculating scenario outputs.
         This populates the result tree with ScenarioResultNodeData objects
@@ -48,8 +66,15 @@ class Scenario:
         # structural_nodes_names = list(n.name for n in )
         from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
 
+        # the tree is only set, when it is prepared (errors are raised on each use)
+        result_tree = (
+            self._result_tree
+            if self._result_tree is not None
+            else self.experiment.base_result_tree.copy()
+        )
+
         structural_nodes_names: list[str] = []
-        for result_index, node in enumerate(self.result_tree.iter_leaves()):
+        for result_index, node in enumerate(result_tree.iter_leaves()):
             # try:
             #     structural_result_node = self.result_tree.find_subnode_by_name(node_name)
             # except StopIteration:
@@ -70,43 +95,161 @@ class Scenario:
                 if node.is_leaf and node.data.aggregator:
                     node.remove_self()
 
-            for leave in self.result_tree.iter_leaves():
+            for leave in result_tree.iter_leaves():
                 if leave.name not in structural_nodes_names:
                     leave.remove_self()
-            self.result_tree.recursive_apply(
+            result_tree.recursive_apply(
                 remove_empty_nodes, depth_first=True, cancel_parents_of=set()
             )
 
         from enbios.base.tree_operations import recursive_resolve_outputs
 
-        self.result_tree.recursive_apply(
+        result_tree.recursive_apply(
             recursive_resolve_outputs,
             experiment=self.experiment,
             depth_first=True,
             scenario_name=self.name,
             cancel_parents_of=set(),
         )
+        self._result_tree = result_tree
 
     @staticmethod
     def _propagate_results_upwards(
-        node: BasicTreeNode[ScenarioResultNodeData],
+        result_trees: dict[str, BasicTreeNode[ScenarioResultNodeData]],
         experiment: "Experiment",
-        scenario_name: str,
     ):
+        """
+        Aggregate the results level by level, from the deepest level up to the root.
+        The result trees (scenario name: result tree) must have the same structure. They
+        are walked at once and the nodes of one level are passed to their aggregators
+        together (EnbiosAggregator.aggregate_scenarios_level), if the aggregator
+        aggregates scenarios together (see _aggregates_scenarios_together). Otherwise,
+        each scenario is aggregated on its own and its result extras are read right
+        after.
+        """
         from enbios.base.adapters_aggregators.aggregator import EnbiosAggregator
 
-        if node.is_leaf:
+        scenario_names = list(result_trees.keys())
+        # each entry holds the same node of all result trees
+        levels: list[list[tuple[BasicTreeNode[ScenarioResultNodeData], ...]]] = []
+        current = [tuple(result_trees.values())]
+        while current:
+            levels.append([nodes for nodes in current if not nodes[0].is_leaf])
+            current = [
+                children
+                for nodes in current
+                for children in zip(*(node.children for node in nodes))
+            ]
+
+        for level_nodes in reversed(levels):
+            # aggregator (by id): (aggregator, nodes)
+            aggregator_nodes: dict[
+                int,
+                tuple[
+                    EnbiosAggregator,
+                    list[tuple[BasicTreeNode[ScenarioResultNodeData], ...]],
+                ],
+            ] = {}
+            for nodes in level_nodes:
+                aggregator: EnbiosAggregator = experiment.get_node_module(
+                    nodes[0].name, Type[EnbiosAggregator]
+                )
+                aggregator_nodes.setdefault(id(aggregator), (aggregator, []))[1].append(
+                    nodes
+                )
+            for aggregator, nodes_list in aggregator_nodes.values():
+                scenario_nodes = {
+                    scenario_name: [nodes[idx] for nodes in nodes_list]
+                    for idx, scenario_name in enumerate(scenario_names)
+                }
+                if Scenario._aggregates_scenarios_together(aggregator):
+                    scenario_results = aggregator.aggregate_scenarios_level(
+                        scenario_nodes
+                    )
+                    level_results = (
+                        (
+                            scenario_name,
+                            scenario_level_nodes,
+                            scenario_results[scenario_name],
+                        )
+                        for scenario_name, scenario_level_nodes in scenario_nodes.items()
+                    )
+                else:
+                    # lazy, so the extras of a scenario are read, before the next one is
+                    # aggregated (aggregators can keep them for the last scenario only)
+                    level_results = (
+                        (
+                            scenario_name,
+                            scenario_level_nodes,
+                            aggregator.aggregate_level(
+                                scenario_level_nodes, scenario_name
+                            ),
+                        )
+                        for scenario_name, scenario_level_nodes in scenario_nodes.items()
+                    )
+                for scenario_name, scenario_level_nodes, results in level_results:
+                    for node, node_results in zip(scenario_level_nodes, results):
+                        node.data.results = node_results
+                        node.data.extras = aggregator.result_extras(
+                            node.name, scenario_name
+                        )
+
+    @staticmethod
+    def _aggregates_scenarios_together(aggregator: "EnbiosAggregator") -> bool:
+        """
+        Check if the aggregator overrides aggregate_scenarios_level and if no subclass
+        of the overriding class changes the aggregation of a level or node
+        (aggregate_level, aggregate_node_result).
+        """
+        from enbios.base.adapters_aggregators.aggregator import EnbiosAggregator
+
+        mro = type(aggregator).__mro__
+        overriding_class = next(
+            cls for cls in mro if "aggregate_scenarios_level" in vars(cls)
+        )
+        if overriding_class is EnbiosAggregator:
+            return False
+        return not any(
+            method in vars(cls)
+            for cls in mro[: mro.index(overriding_class)]
+            for method in ["aggregate_level", "aggregate_node_result"]
+        )
+
+    @staticmethod
+    def propagate_results(scenarios: list["Scenario"]):
+        """
+        Aggregate the results of scenarios (of one experiment), whose adapters have run.
+        The result trees of all scenarios, which do not exclude defaults (and therefore
+        have the same structure), are aggregated in one walk of the hierarchy.
+        :param scenarios: scenarios to aggregate
+        """
+        if not scenarios:
             return
-        else:
-            aggregator: EnbiosAggregator = experiment.get_node_module(
-                node.name, Type[EnbiosAggregator]
-            )
-            node.data.results = aggregator.aggregate_node_result(node, scenario_name)
-            node.data.extras = aggregator.result_extras(node.name, scenario_name)
+        start_time = time.time()
+        experiment = scenarios[0].experiment
+        shared_trees = {
+            scenario.name: scenario.result_tree
+            for scenario in scenarios
+            if not scenario.config.exclude_defaults
+        }
+        if shared_trees:
+            Scenario._propagate_results_upwards(shared_trees, experiment)
+        for scenario in scenarios:
+            if scenario.config.exclude_defaults:
+                Scenario._propagate_results_upwards(
+                    {scenario.name: scenario.result_tree}, experiment
+                )
+        # the scenarios share the aggregation time
+        aggregation_time = (time.time() - start_time) / len(scenarios)
+        for scenario in scenarios:
+            scenario._has_run = True
+            scenario._execution_time += aggregation_time
 
-    def run(
-        self, results_as_dict: bool = True
-    ) -> Union[BasicTreeNode[ScenarioResultNodeData], dict]:
+    def run_adapters(self):
+        """
+        Run the adapters of the scenario and add their results to the result tree
+        (without aggregating them, see Scenario.propagate_results).
+        """
         # if not self._get_methods():
         #     raise ValueError(f"Scenario '{self.name}' has no methods")
         self.reset_execution_time()
@@ -114,6 +257,8 @@ class Scenario:
         # distributions_config = self.experiment.config.use_k_bw_distributions
         # distribution_results = distributions_config > 1
         start_time = time.time()
+        if self._result_tree is None:
+            self.prepare_tree()
 
         if self.experiment.config.run_adapters_concurrently:
             # Create a ThreadPoolExecutor
@@ -133,15 +278,18 @@ class Scenario:
                 result_data = adapter.run_scenario(self)  # type: ignore
                 self.set_results(result_data)
 
-        self.result_tree.recursive_apply(
-            Scenario._propagate_results_upwards,  # type: ignore
-            experiment=self.experiment,
-            depth_first=True,
-            scenario_name=self.name,
-        )
-
-        self._has_run = True
         self._execution_time = time.time() - start_time
+
+    def run(
+        self, results_as_dict: bool = True
+    ) -> Union[BasicTreeNode[ScenarioResultNodeData], dict]:
+        self.run_adapters()
+        Scenario.propagate_results([self])
+        return self.get_results(results_as_dict)
+
+    def get_results(
+        self, results_as_dict: bool = True
+    ) -> Union[BasicTreeNode[ScenarioResultNodeData], dict]:
         return (
             self.result_to_dict(include_extras=True)
             if results_as_dict
@@ -159,8 +307,15 @@ class Scenario:
         self._execution_time = float("NaN")
 
     def set_results(self, result_data: dict[str, Any]):
+        # node name: result node (the first one, like find_subnode_by_name)
+        result_nodes: dict[str, BasicTreeNode[ScenarioResultNodeData]] = {}
+        nodes = [self.result_tree]
+        while nodes:
+            result_node = nodes.pop()
+            result_nodes.setdefault(result_node.name, result_node)
+            nodes.extend(reversed(result_node.children))
         for node_name, node_result in result_data.items():
-            node = self.result_tree.find_subnode_by_name(node_name)
+            node = result_nodes.get(node_name)
             if not node:
                 if self.config.exclude_defaults:
                     logger.warning(
@@ -172,8 +327,8 @@ class Scenario:
                     logger.error(f"Node '{node_name}' not found in result tree")
                 continue
             node.data.results = node_result
-            node.data.extras = self.experiment.get_node_module(node).result_extras(
-                node.name, self.name
+            node.data.extras = self.experiment.get_node_module(node_name).result_extras(
+                node_name, self.name
             )
         if self.config.exclude_defaults:
             for leave in self.result_tree.iter_leaves():
@@ -382,12 +537,7 @@ class Scenario:
             cancel_parents_of=set(),
         )
 
-        result_tree.recursive_apply(
-            Scenario._propagate_results_upwards,  # type: ignore
-            experiment=self.experiment,
-            depth_first=True,
-            scenario_name=self.name,
-        )
+        Scenario._propagate_results_upwards({self.name: result_tree}, self.experiment)
 
         return result_tree
 
@@ -1,12 +1,13 @@
 import re
 from csv import DictReader
 from pathlib import Path
-from typing import Any, TYPE_CHECKING, Callable, Optional, Iterator, cast
+from typing import Any, TYPE_CHECKING, Callable, Optional, Iterator, Union, cast
 
 from enbios import PathLike
 from enbios.generic.flatten_dict.flatten_dict import unflatten
 from enbios.base.models import (
     ExperimentHierarchyNodeData,
+    HierarchyStructuralNodeData,
     HierarchyNodeReference,
     EnbiosValidationException,
     TechTreeNodeData,
@@ -22,13 +23,35 @@ from enbios.generic.tree.basic_tree import BasicTreeNode
 logger = get_logger(__name__)
 
 
+def hierarchy_to_tech_tree(
+    hierarchy: Union[
+        ExperimentHierarchyNodeData, HierarchyStructuralNodeData, HierarchyNodeReference
+    ],
+) -> BasicTreeNode[TechTreeNodeData]:
+    """
+    Create a tree from a validated hierarchy, without dumping and validating it again.
+    """
+    if isinstance(hierarchy, HierarchyStructuralNodeData):
+        return BasicTreeNode(
+            hierarchy.name,
+            data=TechTreeNodeData.model_construct(
+                adapter=hierarchy.adapter, aggregator=None, config=hierarchy.config
+            ),
+        )
+    return BasicTreeNode(
+        hierarchy.name,
+        [hierarchy_to_tech_tree(child) for child in hierarchy.children or []],
+        data=TechTreeNodeData.model_construct(
+            adapter=None, aggregator=hierarchy.aggregator, config=hierarchy.config
+        ),
+    )
+
+
 def validate_experiment_hierarchy(
     hierarchy: ExperimentHierarchyNodeData,
 ) -> BasicTreeNode[TechTreeNodeData]:
     # todo allow no output only when there are scenarios...
-    tech_tree: BasicTreeNode[TechTreeNodeData] = BasicTreeNode.from_dict(
-        hierarchy.model_dump(), dataclass=TechTreeNodeData
-    )
+    tech_tree = hierarchy_to_tech_tree(hierarchy)
 
     def validate_node_data(node: BasicTreeNode[TechTreeNodeData]) -> Any:
         good_leaf = node.is_leaf and node.data.adapter is not None
@@ -51,9 +74,7 @@ def validate_experiment_reference_hierarchy(
     original_experiment_hierarchy: BasicTreeNode[TechTreeNodeData],
     get_node_aggregator_fcn: Callable,
 ) -> BasicTreeNode[TechTreeNodeData]:
-    tech_tree: BasicTreeNode[TechTreeNodeData] = BasicTreeNode.from_dict(
-        hierarchy.model_dump(), dataclass=TechTreeNodeData
-    )
+    tech_tree = hierarchy_to_tech_tree(hierarchy)
 
     def validate_node_data(node: BasicTreeNode[TechTreeNodeData]) -> Any:
         if node.is_leaf:
@@ -94,7 +115,7 @@ def recursive_resolve_outputs(
     if any(child.id in cancel_parts_of for child in node.children):
         cancel_parts_of.add(node.id)
 
-    aggregator = cast(EnbiosAggregator, experiment.get_node_module(node.name))
+    aggregator = cast(EnbiosAggregator, experiment.get_node_module(node))
     node_output, output_aggregation = aggregator.aggregate_node_output(
         node, kwargs.get("scenario_name")
     )
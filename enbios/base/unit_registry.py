@@ -1,29 +1,83 @@
+import threading
+from typing import Any, Optional
+
 from pint import UnitRegistry
 
 from enbios.generic.files import DataPath
 
-ureg = UnitRegistry()
-file_loaded = False
+_ureg: Optional[UnitRegistry] = None
+# modification time and size of the units file, when it was loaded into the registry
+_units_file_stamp: Optional[tuple[int, int]] = None
+_lock = threading.RLock()
 
 
 def get_pint_units_file_path() -> DataPath:
     return DataPath("ecoinvent_pint_unit_match.txt")
 
 
+def get_pint_cache_path() -> DataPath:
+    """
+    Folder of the pint disk cache (parsed definitions), which makes creating the registry
+    fast. Cached files are named by the content of their definition files, so changes of
+    the units file are picked up.
+    """
+    return DataPath("pint_cache")
+
+
+def _create_registry() -> UnitRegistry:
+    cache_path = get_pint_cache_path()
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return UnitRegistry()
+    return UnitRegistry(cache_folder=cache_path)
+
+
+def get_ureg() -> UnitRegistry:
+    """
+    The unit registry of enbios, with the units of 'ecoinvent_pint_unit_match.txt'.
+    It is created on first use.
+    """
+    if _ureg is None:
+        register_units()
+    assert _ureg is not None
+    return _ureg
+
+
 def register_units():
-    global file_loaded
-    if file_loaded:
-        return
-
-    ecoinvent_units_file_path = get_pint_units_file_path()
-
-    if not ecoinvent_units_file_path.exists():
-        print(
-            f"Creating 'ecoinvent_pint_unit_match' file at: "
-            f"{ecoinvent_units_file_path.as_posix()}"
-        )
-        ecoinvent_units_file_path.touch()
-        ecoinvent_units_file_path.write_text("unspecificEcoinventUnit = []\n")
-
-    ureg.load_definitions(ecoinvent_units_file_path)
-    file_loaded = True
+    """
+    Load the units of 'ecoinvent_pint_unit_match.txt' (which is created, if it does not
+    exist) into the registry. When the file changed since it was loaded, a new registry
+    is created and the cached unit conversions are cleared.
+    """
+    global _ureg, _units_file_stamp
+    with _lock:
+        ecoinvent_units_file_path = get_pint_units_file_path()
+
+        if not ecoinvent_units_file_path.exists():
+            print(
+                f"Creating 'ecoinvent_pint_unit_match' file at: "
+                f"{ecoinvent_units_file_path.as_posix()}"
+            )
+            ecoinvent_units_file_path.touch()
+            ecoinvent_units_file_path.write_text("unspecificEcoinventUnit = []\n")
+
+        file_stat = ecoinvent_units_file_path.stat()
+        file_stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+        if _ureg is not None and _units_file_stamp == file_stamp:
+            return
+        if _ureg is not None:
+            from enbios.generic.unit_util import clear_unit_caches
+
+            clear_unit_caches()
+        registry = _create_registry()
+        registry.load_definitions(ecoinvent_units_file_path)
+        _ureg = registry
+        _units_file_stamp = file_stamp
+
+
+def __getattr__(name: str) -> Any:
+    # the registry is created lazily, on the first access of 'ureg'
+    if name == "ureg":
+        return get_ureg()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -101,8 +101,8 @@ def validate_scenarios(
 
     for index, scenario_data in enumerate(experiment_scenarios):
         scenario = validate_scenario(scenario_data, experiment)
+        # the result tree is prepared, when the scenario is used (Scenario.result_tree)
         scenarios.append(scenario)
-        scenario.prepare_tree()
     return scenarios
 
 
@@ -121,8 +121,7 @@ def validate_scenario(
         # outputs: dict[str, float] = {}
 
         for node_name_, node_output in nodes.items():
-            node_ = experiment.get_node(node_name_)
-            node_module = experiment.get_node_module(node_)
+            node_module = experiment.get_node_module(node_name_)
             node_module.validate_scenario_node(
                 node_name_, str(scenario_.name), node_output
             )
@@ -147,7 +146,6 @@ def validate_scenario(
         name=scenario_data.name,
         # structural_nodes_outputs=scenario_nodes_outputs,
         config=scenario_data.config,
-        result_tree=experiment.base_result_tree.copy(),
     )
 
 
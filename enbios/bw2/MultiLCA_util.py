@@ -1,15 +1,16 @@
 import logging
 from abc import ABC
-from typing import Optional, Callable, Any, Sequence
+from typing import Optional, Any, Sequence, Collection
 
 import numpy as np
 from bw2calc import LCA
 from bw2calc.multi_lca import InventoryMatrices
 from bw2data import get_activity
 from bw2data.backends import Activity, ActivityDataset
+from scipy.sparse import csr_matrix
 
-from enbios.bw2.bw_models import BWCalculationSetup
-from enbios.bw2.util import split_inventory
+from enbios.bw2.bw_models import BWCalculationSetup, CharacterizationFunction
+from enbios.bw2.nonlinear_characterization import NonLinearCharacterization
 
 
 class BaseStackedMultiLCA(ABC):
@@ -17,12 +18,22 @@ class BaseStackedMultiLCA(ABC):
         self,
         calc_setup: BWCalculationSetup,
         results_structure: np.ndarray,
-        subset_labels: Optional[set[str]] = None,
+        subset_labels: Optional[Collection[str]] = None,
         activity_label_key: Optional[str] = None,
         use_distributions: bool = False,
         method_activity_func_maps: dict[
-            tuple[str, ...], dict[int, Callable[[float], float]]
+            tuple[str, ...], dict[int, CharacterizationFunction]
         ] = {},
+        activity_regions: Optional[dict[int, Sequence[str]]] = None,
+        subset_label_map: Optional[dict[str, list[int]]] = None,
+        region_matrix: Optional[csr_matrix] = None,
+        region_matrix_key: Optional[tuple[dict[int, int], tuple[str, ...]]] = None,
+        nonlinear_characterizations: Optional[
+            dict[tuple[str, ...], NonLinearCharacterization]
+        ] = None,
+        seed: Optional[int] = None,
+        contribution_top_n: Optional[int] = None,
+        contribution_by: str = "process",
     ):
         self.func_units = calc_setup.inv
         self.methods = calc_setup.ia
@@ -32,6 +43,7 @@ class BaseStackedMultiLCA(ABC):
             demand=self.all,
             method=self.methods[0],
             use_distributions=use_distributions,
+            seed_override=seed,
         )
         self.logger = logging.getLogger(__name__)
         self.results = results_structure
@@ -40,31 +52,125 @@ class BaseStackedMultiLCA(ABC):
         self.method_matrices = []
         self.supply_arrays: list = []
         self.inventory = None
+        # nonlinear characterizations (by biosphere row) can be reused by following lcas
+        self.nonlinear_characterizations: dict[
+            tuple[str, ...], NonLinearCharacterization
+        ] = {}
+        biosphere_size = self.lca.biosphere_matrix.shape[0]
 
         for method in self.methods:
-            self.lca.switch_method(method)
             if self.has_nonlinear_functions and method in method_activity_func_maps:
-                method_characterization = method_activity_func_maps[method]
+                method_characterization = (nonlinear_characterizations or {}).get(method)
+                if (
+                    method_characterization is None
+                    or not method_characterization.matches(
+                        self.lca.dicts.biosphere, biosphere_size
+                    )
+                ):
+                    method_characterization = (
+                        NonLinearCharacterization.from_activity_functions(
+                            method_activity_func_maps[method],
+                            self.lca.dicts.biosphere,
+                            biosphere_size,
+                        )
+                    )
+                self.nonlinear_characterizations[method] = method_characterization
                 self.method_matrices.append(method_characterization)
                 self.non_linear_methods_flags.append(True)
             else:
-                self.method_matrices.append(self.lca.characterization_matrix)
+                self.lca.switch_method(method)
+                # the matrix of the current method would be resampled by next_sample
+                self.method_matrices.append(
+                    self.lca.characterization_matrix.copy()
+                    if use_distributions
+                    else self.lca.characterization_matrix
+                )
                 self.non_linear_methods_flags.append(False)
 
+        self.linear_cols = [
+            col
+            for col, non_linear in enumerate(self.non_linear_methods_flags)
+            if not non_linear
+        ]
+        # summed characterization factors of all linear methods (methods x biosphere flows)
+        self.linear_cfs = csr_matrix(
+            np.vstack(
+                [
+                    np.asarray(self.method_matrices[col].sum(0)).ravel()
+                    for col in self.linear_cols
+                ]
+            )
+            if self.linear_cols
+            else np.zeros((0, biosphere_size))
+        )
+        # top contributors of each functional unit and method (of the first calculation)
+        self.contribution_top_n = contribution_top_n
+        self.contribution_by = contribution_by
+        self.calc_contributions = bool(contribution_top_n)
+        self.contribution_indices: Optional[np.ndarray] = None
+        self.contribution_values: Optional[np.ndarray] = None
+        self._process_cfs: Optional[np.ndarray] = None
+        if contribution_top_n:
+            contribution_shape = (
+                len(self.func_units),
+                len(self.methods),
+                contribution_top_n,
+            )
+            self.contribution_indices = np.full(contribution_shape, -1)
+            self.contribution_values = np.zeros(contribution_shape)
+
+        self.calc_subsets_results = False
         if subset_labels:
-            self.subset_labels = subset_labels
+            # sorted, so the regions (result columns) are the same in every process
+            self.subset_labels: list[str] = sorted(subset_labels)
             self.calc_subsets_results = True
             assert activity_label_key is not None
-            self.subset_label_map: dict[str, list[int]] = self.resolve_subsets(
-                activity_label_key
+            if subset_label_map is None:
+                subset_label_map = self.resolve_subsets(
+                    activity_label_key, activity_regions
+                )
+            self.subset_label_map: dict[str, list[int]] = subset_label_map
+            # the region matrix can be reused, as long as the activity index and the
+            # regions are the same
+            self.region_matrix_key: tuple[dict[int, int], tuple[str, ...]] = (
+                dict(self.lca.dicts.activity),
+                tuple(self.subset_labels),
             )
+            if region_matrix is None or region_matrix_key != self.region_matrix_key:
+                region_matrix = self.build_region_matrix()
+            self.region_matrix: csr_matrix = region_matrix
+        self.calculate()
+
+    def calculate(self):
+        self.supply_arrays = []
+        if self.calc_subsets_results:
             self.subset_mainloop()
         else:
             self.main_loop()
 
+    def next_sample(self, results_structure: np.ndarray) -> np.ndarray:
+        """
+        Draw the next sample of the technosphere and biosphere distributions and calculate
+        the results again. The matrices, index mappings and characterization matrices of
+        the lca are reused.
+        :param results_structure: empty array for the results
+        :return: the results of the sample
+        """
+        # without these, next() would recalculate the last demand
+        for attribute in ("inventory", "characterized_inventory"):
+            if hasattr(self.lca, attribute):
+                delattr(self.lca, attribute)
+        next(self.lca)
+        self.calc_contributions = False
+        self.results = results_structure
+        self.calculate()
+        return self.results
+
     def main_loop(self):
         for row, func_unit in enumerate(self.func_units):
             self.prep_demand(row, func_unit)
+            if self.calc_contributions:
+                self.calculate_contributions(row)
 
             for col, cf_matrix in enumerate(self.method_matrices):
                 # logger.debug(f"Method {col}/{len(self.method_matrices)}")
@@ -75,23 +181,99 @@ class BaseStackedMultiLCA(ABC):
         self.inventory = InventoryMatrices(self.lca.biosphere_matrix, self.supply_arrays)
 
     def subset_mainloop(self):
+        linear_cols = self.linear_cols
+        linear_cfs = self.linear_cfs
         for row, func_unit in enumerate(self.func_units):
             self.prep_demand(row, func_unit)
-            for col, cf_matrix in enumerate(self.method_matrices):
-                self.lca.characterization_matrix = cf_matrix
-
-                for loc_idx, subset in enumerate(self.subset_labels):
-                    activity_ids = self.subset_label_map[subset]
-                    # todo, this is a bw_utils method split_inventory
+            if self.calc_contributions:
+                self.calculate_contributions(row)
+            # biosphere flows x regions
+            regional_inventory = self.lca.inventory @ self.region_matrix
+            if linear_cols:
+                self.results[row, linear_cols] = (
+                    linear_cfs @ regional_inventory
+                ).toarray()
+            for col, non_linear in enumerate(self.non_linear_methods_flags):
+                if not non_linear:
+                    continue
+                self.lca.characterization_matrix = self.method_matrices[col]
+                for loc_idx in range(len(self.subset_labels)):
                     regional_characterized_inventory = self.lcia_calculation(
-                        self.non_linear_methods_flags[col],
-                        split_inventory(self.lca, activity_ids),
+                        True, regional_inventory[:, [loc_idx]]
                     )
                     self.results[
                         row, col, loc_idx
                     ] = regional_characterized_inventory.sum()
         self.inventory = InventoryMatrices(self.lca.biosphere_matrix, self.supply_arrays)
 
+    def calculate_contributions(self, row: int):
+        """
+        Top contributors (processes or biosphere flows) to the results of all methods for
+        the current demand, by absolute value. Contributors with no impact are left
+        out (index -1). Non-linear methods have no process contributions.
+        :param row: functional unit index
+        """
+        assert self.contribution_top_n
+        assert self.contribution_indices is not None
+        assert self.contribution_values is not None
+        supply = self.lca.supply_array
+        if self.contribution_by == "process":
+            if self._process_cfs is None:
+                # characterized biosphere flows per unit of each process (methods x processes)
+                self._process_cfs = (
+                    self.linear_cfs @ self.lca.biosphere_matrix
+                ).toarray()
+            contributions = np.zeros((len(self.methods), len(supply)))
+            contributions[self.linear_cols] = self._process_cfs * supply
+        else:
+            summed_inventory = self.lca.biosphere_matrix @ supply
+            contributions = np.zeros((len(self.methods), len(summed_inventory)))
+            contributions[self.linear_cols] = self.linear_cfs.multiply(
+                summed_inventory
+            ).toarray()
+            for col, non_linear in enumerate(self.non_linear_methods_flags):
+                if non_linear:
+                    contributions[col] = self.method_matrices[col].characterize(
+                        summed_inventory
+                    )
+        top_n = min(self.contribution_top_n, contributions.shape[1])
+        abs_contributions = np.abs(contributions)
+        if top_n < contributions.shape[1]:
+            top = np.argpartition(-abs_contributions, top_n - 1, axis=1)[:, :top_n]
+        else:
+            top = np.tile(np.arange(top_n), (len(self.methods), 1))
+        order = np.take_along_axis(
+            top,
+            np.argsort(-np.take_along_axis(abs_contributions, top, axis=1), axis=1),
+            axis=1,
+        )
+        self.contribution_indices[row, :, :top_n] = order
+        self.contribution_values[row, :, :top_n] = np.take_along_axis(
+            contributions, order, axis=1
+        )
+        # no contributors (also all of non-linear methods, for process contributions)
+        self.contribution_indices[row][self.contribution_values[row] == 0] = -1
+
+    def build_region_matrix(self) -> csr_matrix:
+        """
+        Sparse matrix (activities x regions), which maps each activity of the lca matrices to
+        the selected regions it is part of. Activities that are not in the lca matrices are
+        ignored.
+        :return: region matrix
+        """
+        rows: list[int] = []
+        cols: list[int] = []
+        for col, region in enumerate(self.subset_labels):
+            for activity_id in self.subset_label_map.get(region, []):
+                row = self.lca.dicts.activity.get(activity_id)
+                if row is not None:
+                    rows.append(row)
+                    cols.append(col)
+        return csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(self.lca.dicts.activity), len(self.subset_labels)),
+        )
+
     def prep_demand(self, row: int, func_unit: dict[Activity, float]):
         self.logger.debug(f"Demand {row}/{len(self.func_units)}")
         fu_spec, fu_demand = list(func_unit.items())[0]
@@ -116,42 +298,47 @@ class BaseStackedMultiLCA(ABC):
         if inventory is None:
             inventory = self.lca.inventory
         if non_linear:
-            summed_inventory = inventory.sum(1)
-            # initiate cf array with 0 functions
-            func_array = [lambda v: 0 for _ in range(self.lca.biosphere_matrix.shape[0])]
-            # assign the proper function to the cf array
-            for activity_id, matrix_idx in self.lca.dicts.biosphere.items():
-                if activity_id in self.lca.characterization_matrix:
-                    func_array[
-                        self.lca.dicts.biosphere[activity_id]
-                    ] = self.lca.characterization_matrix[activity_id]
-            result = np.array([])
-            for summed_row, function in zip(summed_inventory, func_array):
-                result = np.append(result, function(summed_row))
+            summed_inventory = np.asarray(inventory.sum(1)).ravel()
             # TODO characterized_inventory should actually be m*n (m:num bioflows, n:processes)
             # here it is (1*n)
             # but we dont calc that, cuz not using the summed_inventory would probably take much longer
-            self.lca.characterized_inventory = result
+            self.lca.characterized_inventory = (
+                self.lca.characterization_matrix.characterize(summed_inventory)
+            )
         else:
             self.lca.characterized_inventory = (
                 self.lca.characterization_matrix * inventory
             )
         return self.lca.characterized_inventory
 
-    def resolve_subsets(self, activity_label_key: str):
+    def resolve_subsets(
+        self,
+        activity_label_key: str,
+        activity_regions: Optional[dict[int, Sequence[str]]] = None,
+    ):
+        """
+        Map each region to the ids of the activities that are located in it.
+        :param activity_label_key: data key of the activities, that holds the region tuple
+        :param activity_regions: activity-id to region tuple. If given, the database is not
+        read at all
+        :return: region -> activity ids
+        """
+        if activity_regions is None:
+            activity_regions = {
+                a.id: a.data.get(activity_label_key)
+                for a in ActivityDataset.select(ActivityDataset).where(
+                    ActivityDataset.type == "process"
+                )
+            }
         # final location -> id
         base_loc_map: dict[str, list[int]] = {}
         # all other indices to last locs
         loc_tree: list[dict] = []
-        for a in ActivityDataset.select(ActivityDataset).where(
-            ActivityDataset.type == "process"
-        ):
-            # if a.type == "process":
-            loc: Sequence[str] = a.data.get(activity_label_key)
+        for activity_id, loc in activity_regions.items():
             if not isinstance(loc, tuple) and not isinstance(loc, list):
                 continue
             final_loc = loc[-1]
-            base_loc_map.setdefault(final_loc, []).append(a.id)
+            base_loc_map.setdefault(final_loc, []).append(activity_id)
             # make tree list at least as long as length
             for idx, rest in enumerate(loc[:-1]):
                 if len(loc_tree) <= idx:
@@ -1,5 +1,12 @@
+import hashlib
+import json
 import math
+import multiprocessing
+import re
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from logging import getLogger
+from pathlib import Path
 from typing import Optional, Any, Sequence, Callable
 
 import bw2data as bd
@@ -8,16 +15,16 @@ from bw2calc.dictionary_manager import ReversibleRemappableDictionary
 from bw2data import Method as Bw2Method
 from bw2data.backends import Activity, ActivityDataset
 from numpy import ndarray
-from pint import Quantity, UndefinedUnitError
-from pint.facets.plain import PlainQuantity
+from pint import UndefinedUnitError
 from pydantic.json_schema import GenerateJsonSchema, JsonSchemaValue
 from pydantic_core import core_schema, PydanticOmit
+from scipy.sparse import csr_matrix
 
 from enbios.base.adapters_aggregators.adapter import EnbiosAdapter
 from enbios.base.adapters_aggregators.node_module import T
 from enbios.base.scenario import Scenario
-from enbios.base.unit_registry import ureg
 from enbios.bw2.MultiLCA_util import BaseStackedMultiLCA
+from enbios.bw2.lca_store import LCAObjectStore
 from enbios.bw2.bw_models import (
     ExperimentMethodPrepData,
     BWAdapterConfig,
@@ -26,10 +33,15 @@ from enbios.bw2.bw_models import (
     BWActivityData,
     NonLinearMethodConfig,
     BWCalculationSetup,
+    CharacterizationFunction,
+    PolynomialFunction,
 )
+from enbios.bw2.nonlinear_characterization import NonLinearCharacterization
 from enbios.bw2.util import bw_unit_fix, get_activity
+from enbios.generic.unit_util import convert_magnitude, unit_conversion
 from enbios.generic.util import load_module, get_module_functions
-from enbios.base.models import NodeOutput, ResultValue
+from enbios.base.models import NodeOutput, ResultValue, ResultStatistics
+from enbios.generic.online_statistics import OnlineStatistics
 
 logger = getLogger(__file__)
 
@@ -83,6 +95,75 @@ def _bw_activity_search(config: BrightwayActivityConfig) -> Activity:
     return bw_activity
 
 
+def samples_file_name(scenario_name: str) -> str:
+    """
+    File name for the samples of a scenario. Characters, that are not safe in file names,
+    are replaced and a hash of the scenario name is added in that case, so that
+    different scenarios do not share a file.
+    :param scenario_name: name of the scenario
+    :return: file name ('.npy')
+    """
+    safe_name = re.sub(r"[^\w\-. ]", "_", scenario_name).strip(" .")
+    if safe_name != scenario_name:
+        name_hash = hashlib.sha1(scenario_name.encode("utf-8")).hexdigest()[:8]
+        safe_name = f"{safe_name}_{name_hash}"
+    return f"{safe_name}.npy"
+
+
+# lca arguments (shared by all scenarios) of a MonteCarlo worker process
+_monte_carlo_lca_arguments: dict[str, Any] = {}
+
+
+def _close_bw_connections() -> None:
+    """
+    Close the sqlite connections of bw2data, so that forked processes do not share them.
+    They are opened again with the next query.
+    """
+    bd.projects.db.db.close()
+    for _, substitutable_db in bd.config.sqlite3_databases:
+        substitutable_db.db.close()
+
+
+def _init_monte_carlo_worker(bw_project: str, lca_arguments: dict[str, Any]) -> None:
+    # opens the databases of the project (with new connections)
+    bd.projects.set_current(bw_project)
+    _monte_carlo_lca_arguments.clear()
+    _monte_carlo_lca_arguments.update(lca_arguments)
+
+
+def _run_monte_carlo_worker(
+    calc_setup_name: str,
+    inventory_keys: list[dict[Any, float]],
+    methods: list[tuple[str, ...]],
+    results_structure: ndarray,
+    num_samples: int,
+    seed: int,
+) -> list[ndarray]:
+    """
+    Calculate a chunk of MonteCarlo samples with an own lca in a worker process
+    :param calc_setup_name: name of the calculation setup
+    :param inventory_keys: inventory of the calculation setup (with activity keys)
+    :param methods: methods of the calculation setup
+    :param results_structure: empty results of one sample
+    :param num_samples: number of samples
+    :param seed: seed of the lca distributions
+    :return: results of the samples
+    """
+    _lca = BaseStackedMultiLCA(
+        **_monte_carlo_lca_arguments,
+        calc_setup=BWCalculationSetup.from_inventory_keys(
+            calc_setup_name, inventory_keys, methods
+        ),
+        results_structure=results_structure,
+        use_distributions=True,
+        seed=seed,
+    )
+    results: list[ndarray] = [_lca.results]
+    for _ in range(1, num_samples):
+        results.append(_lca.next_sample(np.zeros_like(_lca.results)))
+    return results
+
+
 class BrightwayAdapter(EnbiosAdapter):
     @staticmethod
     def name() -> str:
@@ -97,12 +178,39 @@ class BrightwayAdapter(EnbiosAdapter):
             str, BWCalculationSetup
         ] = {}  # scenario_alias to BWCalculationSetup
         self.raw_results: dict[str, list[ndarray]] = {}  # scenario_alias to results
-        self.lca_objects: dict[
-            str, list[BaseStackedMultiLCA]
-        ] = {}  # scenario_alias to lca objects
+        # scenario_alias to lca objects
+        self.lca_objects: LCAObjectStore = LCAObjectStore()
         self.all_regions_set: bool = (
             False  # as part of first run_scenario, go through set_node_regions
         )
+        # activity-id to region tuple, when regionalization runs in memory
+        self.activity_regions: dict[int, tuple[str, ...]] = {}
+        # region to activity ids and the sparse (activities x regions) matrix.
+        # both are created with the first lca and reused for all following ones
+        self.region_activity_map: Optional[dict[str, list[int]]] = None
+        self.region_matrix: Optional[csr_matrix] = None
+        # activity index and regions, the region matrix was built for
+        self.region_matrix_key: Optional[tuple[dict[int, int], tuple[str, ...]]] = None
+        # non-linear methods: biosphere activity id to function, prepared once. And the
+        # characterizations by biosphere row, created with the first lca and reused
+        self.nonlinear_method_maps: Optional[
+            dict[tuple[str, ...], dict[int, CharacterizationFunction]]
+        ] = None
+        self.nonlinear_characterizations: dict[
+            tuple[str, ...], NonLinearCharacterization
+        ] = {}
+        # scenario_alias to node to method to top contributors (contribution_analysis)
+        self.contributions: dict[str, dict[str, dict[str, list[dict[str, Any]]]]] = {}
+        # scenario_alias to the file of its samples (mc_statistics.samples_dir)
+        self.samples_files: dict[str, Path] = {}
+        # worker processes of parallel MonteCarlo runs, reused for all scenarios
+        self._mc_executor: Optional[ProcessPoolExecutor] = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # worker processes are not pickled
+        state = self.__dict__.copy()
+        state["_mc_executor"] = None
+        return state
 
     def validate_definition(self, definition: T):
         pass
@@ -119,12 +227,21 @@ class BrightwayAdapter(EnbiosAdapter):
 
     def validate_config(self, config: Optional[dict[str, Any]]):
         self.config = BWAdapterConfig.model_validate(config)
+        self.lca_objects = LCAObjectStore(
+            self.config.lca_store.max_bytes, self.config.lca_store.lightweight
+        )
         if self.config.use_k_bw_distributions < 1:
             raise ValueError(
                 f"config.use_k_bw_distributions must be greater than 0, "
                 f"but is {self.config.use_k_bw_distributions}"
             )
 
+        if self.config.mc_workers < 1:
+            raise ValueError(
+                f"config.mc_workers must be greater than 0, "
+                f"but is {self.config.mc_workers}"
+            )
+
         if self.config.bw_project not in bd.projects:
             raise ValueError(f"Project {self.config.bw_project} not found")
         else:
@@ -168,14 +285,13 @@ class BrightwayAdapter(EnbiosAdapter):
         :return:
         """
         try:
-            target_quantity: Quantity = (
-                ureg.parse_expression(
-                    bw_unit_fix(target_output.unit), case_sensitive=False
-                )
-                * target_output.magnitude
-            )
             bw_activity_unit = self.activityMap[node_name].bw_activity["unit"]
-            return target_quantity.to(bw_unit_fix(bw_activity_unit)).magnitude
+            return convert_magnitude(
+                target_output.magnitude,
+                bw_unit_fix(target_output.unit),
+                bw_unit_fix(bw_activity_unit),
+                case_sensitive=False,
+            )
         except UndefinedUnitError as err:
             logger.error(
                 f"Cannot parse output unit '{target_output.unit}'- "
@@ -197,13 +313,20 @@ class BrightwayAdapter(EnbiosAdapter):
         )
         if default_out := parsed_config.default_output:
             unit = bw_unit_fix(default_out.unit)
-            base_q: Quantity = ureg.parse_expression(unit) * default_out.magnitude
-            conv_q: PlainQuantity = base_q.to(bw_unit)
-            self.activityMap[node_name].default_output.from_quantity(conv_q)
+            default_output = self.activityMap[node_name].default_output
+            default_output.magnitude = convert_magnitude(
+                default_out.magnitude, unit, bw_unit
+            )
+            default_output.unit = unit_conversion(unit, bw_unit).unit
         if self.config.simple_regionalization.run_regionalization:
             if "enb_location" in node_config:
-                bw_activity["enb_location"] = node_config["enb_location"]
-                bw_activity.save()
+                if self.config.simple_regionalization.in_memory:
+                    self.activity_regions[bw_activity.id] = tuple(
+                        node_config["enb_location"]
+                    )
+                else:
+                    bw_activity["enb_location"] = node_config["enb_location"]
+                    bw_activity.save()
         # todo, selective methods?
         # if parsed_config.methods:
         #     for m in parsed_config.methods:
@@ -226,15 +349,12 @@ class BrightwayAdapter(EnbiosAdapter):
         """
         target_output_: NodeOutput = NodeOutput.model_validate(scenario_node_data)
         try:
-            target_quantity: Quantity = (
-                ureg.parse_expression(bw_unit_fix(target_output_.unit))
-                * target_output_.magnitude
-            )
+            unit = bw_unit_fix(target_output_.unit)
             bw_activity_unit = self.get_node_output_unit(node_name)
-            scaled_quantity: PlainQuantity = target_quantity.to(
-                bw_unit_fix(bw_activity_unit)
+            target_output_.magnitude = convert_magnitude(
+                target_output_.magnitude, unit, bw_activity_unit
             )
-            target_output_.from_quantity(scaled_quantity)
+            target_output_.unit = unit_conversion(unit, bw_activity_unit).unit
             self.activityMap[node_name].scenario_outputs[scenario_name] = target_output_
             #
         except UndefinedUnitError as err:
@@ -281,110 +401,380 @@ class BrightwayAdapter(EnbiosAdapter):
 
         methods = [m.id for m in self.methods.values()]
         calculation_setup = BWCalculationSetup(scenario.name, inventory, methods)
-        calculation_setup.register()
+        if self.config.register_calculation_setups:
+            calculation_setup.register()
         self.scenario_calc_setups[scenario.name] = calculation_setup
         if (
             self.config.simple_regionalization.run_regionalization
             and not self.all_regions_set
         ):
-            # memorize nodes from the tree in order to not delete their location
-            if self.config.simple_regionalization.clear_all_other_node_regions:
-                keep_locations_of_activities = [
-                    a.bw_activity["code"] for a in self.activityMap.values()
-                ]
-
-                range_length = 1000
-                activities_to_reset = list(
-                    ActivityDataset.select().where(
-                        ActivityDataset.code.not_in(keep_locations_of_activities)
-                    )
+            if self.config.simple_regionalization.in_memory:
+                self.prepare_memory_regions()
+            else:
+                self.write_database_regions()
+            self.all_regions_set = True
+
+    def prepare_memory_regions(self):
+        """
+        Collect the regions of all activities in 'activity_regions', without writing anything
+        into the brightway database. Regions of the hierarchy nodes and 'set_node_regions'
+        take precedence over the 'enb_location' values stored in the database.
+        """
+        regio_config = self.config.simple_regionalization
+        query = ActivityDataset.select(ActivityDataset).where(
+            ActivityDataset.type == "process"
+        )
+        if regio_config.clear_all_other_node_regions:
+            # only the nodes from the tree keep their stored location
+            query = query.where(
+                ActivityDataset.code.in_(
+                    [a.bw_activity["code"] for a in self.activityMap.values()]
                 )
+            )
+        for a in query:
+            loc = a.data.get("enb_location")
+            if isinstance(loc, tuple) or isinstance(loc, list):
+                self.activity_regions.setdefault(a.id, tuple(loc))
+
+        activity_codes: list[str] = list(regio_config.set_node_regions.keys())
+        activities = list(
+            ActivityDataset.select(ActivityDataset.id, ActivityDataset.code).where(
+                ActivityDataset.code.in_(activity_codes)
+            )
+        )
+        if len(activities) != len(activity_codes):
+            missing = set(activity_codes) - set(a.code for a in activities)
+            logger.warning(
+                f"Some activities specified in 'set_node_regions' are not found: {missing}"
+            )
+        for a in activities:
+            self.activity_regions[a.id] = tuple(regio_config.set_node_regions[a.code])
 
-                for range_start in range(
-                    math.ceil(len(activities_to_reset) / range_length)
-                ):
-                    # noinspection PyUnresolvedReferences
-                    # noinspection PyProtectedMember
-                    with ActivityDataset._meta.database.atomic():
-                        for a in activities_to_reset[
-                            range_start * range_length : (range_start + 1) * range_length
-                        ]:
-                            a.data["enb_location"] = None
-                            a.save()
-
-            # set additional specified locations. 'set_node_regions' field
-            activity_codes: list[str] = list(
-                self.config.simple_regionalization.set_node_regions.keys()
+    def write_database_regions(self):
+        """
+        Write the regions ('enb_location') of the hierarchy nodes and 'set_node_regions'
+        into the brightway database.
+        """
+        # memorize nodes from the tree in order to not delete their location
+        if self.config.simple_regionalization.clear_all_other_node_regions:
+            keep_locations_of_activities = [
+                a.bw_activity["code"] for a in self.activityMap.values()
+            ]
+
+            range_length = 1000
+            activities_to_reset = list(
+                ActivityDataset.select().where(
+                    ActivityDataset.code.not_in(keep_locations_of_activities)
+                )
             )
-            # this approach is much faster than individual updates
-            # noinspection PyUnresolvedReferences
-            # noinspection PyProtectedMember
-            with ActivityDataset._meta.database.atomic():
-                activities_to_reset = list(
-                    ActivityDataset.select().where(
-                        ActivityDataset.code.in_(activity_codes)
-                    )
+
+            for range_start in range(math.ceil(len(activities_to_reset) / range_length)):
+                # noinspection PyUnresolvedReferences
+                # noinspection PyProtectedMember
+                with ActivityDataset._meta.database.atomic():
+                    for a in activities_to_reset[
+                        range_start * range_length : (range_start + 1) * range_length
+                    ]:
+                        a.data["enb_location"] = None
+                        a.save()
+
+        # set additional specified locations. 'set_node_regions' field
+        activity_codes: list[str] = list(
+            self.config.simple_regionalization.set_node_regions.keys()
+        )
+        # this approach is much faster than individual updates
+        # noinspection PyUnresolvedReferences
+        # noinspection PyProtectedMember
+        with ActivityDataset._meta.database.atomic():
+            activities_to_reset = list(
+                ActivityDataset.select().where(ActivityDataset.code.in_(activity_codes))
+            )
+            # validate all activities are present
+            if len(activities_to_reset) != len(activity_codes):
+                missing = set(activity_codes) - set(a.code for a in activities_to_reset)
+                logger.warning(
+                    f"Some activities specified in 'set_node_regions' are not found: {missing}"
                 )
-                # validate all activities are present
-                if len(activities_to_reset) != len(activity_codes):
-                    missing = set(activity_codes) - set(
-                        a.code for a in activities_to_reset
-                    )
-                    logger.warning(
-                        f"Some activities specified in 'set_node_regions' are not found: {missing}"
-                    )
-                for a in activities_to_reset:
-                    a.data["enb_location"] = tuple(
-                        self.config.simple_regionalization.set_node_regions[a.code]
-                    )
-                    a.save()  # This updates each user in the database
+            for a in activities_to_reset:
+                a.data["enb_location"] = tuple(
+                    self.config.simple_regionalization.set_node_regions[a.code]
+                )
+                a.save()  # This updates each user in the database
 
     def run_scenario(self, scenario: Scenario) -> dict[str, dict[str, ResultValue]]:
         self.prepare_scenario(scenario)
         use_distributions = self.config.use_k_bw_distributions > 1
-        raw_results: list[ndarray] = []
-        self.lca_objects[scenario.name] = []
         run_regionalization = self.config.simple_regionalization.run_regionalization
         # non-linear methods
-        method_activity_func_maps: Optional[
-            dict[tuple[str, ...], dict[int, Callable[[float], float]]]
-        ] = None
-        if self.config.nonlinear_characterization:
-            method_activity_func_maps = self.prepare_nonlinear_methods()
-        for i in range(self.config.use_k_bw_distributions):
-            if self.config.use_k_bw_distributions > 1:
-                self.get_logger().info(
-                    f"Brightway adapter: Run distribution {i + 1}/{self.config.use_k_bw_distributions}"
-                )
-            calc_setup = self.scenario_calc_setups[scenario.name]
-            result_structure = np.zeros((len(calc_setup.inv), len(calc_setup.ia)))
-            subset_labels: Optional[set[str]] = None
-            activity_label_key: Optional[str] = None
-            if run_regionalization:
-                subset_labels = self.config.simple_regionalization.select_regions
-                result_structure = np.zeros(
-                    (len(calc_setup.inv), len(calc_setup.ia), len(subset_labels))
-                )
-                activity_label_key = "enb_location"
-
-            _lca = BaseStackedMultiLCA(
-                self.scenario_calc_setups[scenario.name],
-                result_structure,
-                subset_labels,
-                activity_label_key,
-                use_distributions=use_distributions,
-                method_activity_func_maps=method_activity_func_maps,
+        if self.config.nonlinear_characterization and self.nonlinear_method_maps is None:
+            self.nonlinear_method_maps = self.prepare_nonlinear_methods()
+        calc_setup = self.scenario_calc_setups[scenario.name]
+        raw_results: list[ndarray] = []
+        statistics: Optional[OnlineStatistics] = None
+        samples: Optional[ndarray] = None
+        consume_sample: Callable[[ndarray], None] = raw_results.append
+        if use_distributions and self.config.mc_statistics:
+            statistics, samples = self._prepare_statistics(scenario.name, calc_setup)
+            consume_sample = self._statistics_consumer(statistics, samples)
+
+        _lca = self._run_samples(calc_setup, consume_sample)
+        self.lca_objects[scenario.name] = [_lca] if self.config.store_lca_object else []
+        if self.config.contribution_analysis:
+            self.contributions[scenario.name] = self._collect_contributions(
+                _lca, scenario
             )
-            raw_results.append(_lca.results)
-            if self.config.store_lca_object:
-                self.lca_objects[scenario.name].append(_lca)
 
         if self.config.store_raw_results:
-            self.raw_results[scenario.name] = raw_results
+            self.raw_results[scenario.name] = (
+                list(samples) if samples is not None else raw_results
+            )
 
         return self._assign_results2nodes(
-            raw_results, scenario, use_distributions, run_regionalization
+            raw_results,
+            scenario,
+            use_distributions,
+            run_regionalization,
+            statistics,
+            samples,
+        )
+
+    def _run_samples(
+        self, calc_setup: BWCalculationSetup, consume_sample: Callable[[ndarray], None]
+    ) -> BaseStackedMultiLCA:
+        """
+        Calculate the results of a calculation setup. With distributions, the lca is
+        reused for all samples or the samples are calculated in multiple processes
+        :param calc_setup: calculation setup of a scenario
+        :param consume_sample: called with the results of each sample, in order
+        :return: the lca (of this process)
+        """
+        use_distributions = self.config.use_k_bw_distributions > 1
+        num_processes = min(self.config.mc_workers, self.config.use_k_bw_distributions)
+        if num_processes > 1:
+            return self._run_parallel_monte_carlo(
+                calc_setup, num_processes, consume_sample
+            )
+        if use_distributions:
+            self.get_logger().info(
+                f"Brightway adapter: Run distribution 1/{self.config.use_k_bw_distributions}"
+            )
+        _lca = self._create_lca(calc_setup, use_distributions, self.config.mc_seed)
+        consume_sample(_lca.results)
+        # MonteCarlo: the lca (matrices, indices, characterization) is reused
+        for i in range(1, self.config.use_k_bw_distributions):
+            self.get_logger().info(
+                f"Brightway adapter: Run distribution {i + 1}/{self.config.use_k_bw_distributions}"
+            )
+            consume_sample(_lca.next_sample(np.zeros_like(_lca.results)))
+        return _lca
+
+    def _run_parallel_monte_carlo(
+        self,
+        calc_setup: BWCalculationSetup,
+        num_processes: int,
+        consume_sample: Callable[[ndarray], None],
+    ) -> BaseStackedMultiLCA:
+        """
+        Split the MonteCarlo samples into chunks, one per process. The first chunk is
+        calculated in this process, the others in a process pool. Each process has its own
+        lca with a seed, derived from 'mc_seed'. The results are merged in the order of the
+        chunks, so they are the same for the same seed and number of workers.
+        :param calc_setup: calculation setup of a scenario
+        :param num_processes: number of processes (including this one)
+        :param consume_sample: called with the results of each sample, in order
+        :return: the lca of this process
+        """
+        num_samples = self.config.use_k_bw_distributions
+        chunk_sizes = [
+            len(chunk) for chunk in np.array_split(np.arange(num_samples), num_processes)
+        ]
+        seeds = [
+            int(seed_sequence.generate_state(1)[0])
+            for seed_sequence in np.random.SeedSequence(self.config.mc_seed).spawn(
+                num_processes
+            )
+        ]
+        self.get_logger().info(
+            f"Brightway adapter: Run {num_samples} distributions in {num_processes} processes"
         )
+        # the lca of this process is created first, so the workers get its region matrix
+        # and non-linear characterizations
+        _lca = self._create_lca(calc_setup, True, seeds[0])
+        executor = self._monte_carlo_executor(num_processes - 1, calc_setup)
+        futures = [
+            executor.submit(
+                _run_monte_carlo_worker,
+                calc_setup.name,
+                calc_setup.inventory_keys(),
+                calc_setup.ia,
+                self._result_structure(calc_setup),
+                chunk_size,
+                seed,
+            )
+            for chunk_size, seed in zip(chunk_sizes[1:], seeds[1:])
+        ]
+        consume_sample(_lca.results)
+        for _ in range(1, chunk_sizes[0]):
+            consume_sample(_lca.next_sample(np.zeros_like(_lca.results)))
+        for future in futures:
+            for sample in future.result():
+                consume_sample(sample)
+        return _lca
+
+    def _monte_carlo_executor(
+        self, num_workers: int, calc_setup: BWCalculationSetup
+    ) -> ProcessPoolExecutor:
+        """
+        The process pool for the MonteCarlo samples, which is created with the first
+        parallel run and reused for all following scenarios. The workers get the lca
+        arguments, that are the same for all scenarios (the calculation setup is passed
+        with each chunk).
+        :param num_workers: number of worker processes
+        :param calc_setup: calculation setup of the first scenario
+        :return: process pool
+        """
+        if self._mc_executor is None:
+            lca_arguments = self._lca_arguments(calc_setup)
+            del lca_arguments["calc_setup"]
+            del lca_arguments["results_structure"]
+            # contributions are only taken from the first sample
+            lca_arguments["contribution_top_n"] = None
+            # forked workers inherit the arguments (non-linear functions might not be
+            # picklable), but must not share the database connections of this process
+            mp_context = None
+            if "fork" in multiprocessing.get_all_start_methods():
+                mp_context = multiprocessing.get_context("fork")
+                _close_bw_connections()
+            self._mc_executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=mp_context,
+                initializer=_init_monte_carlo_worker,
+                initargs=(self.config.bw_project, lca_arguments),
+            )
+            weakref.finalize(self, self._mc_executor.shutdown)
+        return self._mc_executor
+
+    @staticmethod
+    def _statistics_consumer(
+        statistics: OnlineStatistics, samples: Optional[ndarray]
+    ) -> Callable[[ndarray], None]:
+        def consume_sample(sample: ndarray):
+            if samples is not None:
+                samples[statistics.count] = sample
+            statistics.update(sample)
+
+        return consume_sample
+
+    def _prepare_statistics(
+        self, scenario_name: str, calc_setup: BWCalculationSetup
+    ) -> tuple[OnlineStatistics, Optional[ndarray]]:
+        """
+        Create the streaming statistics of a scenario and, if configured, the array for
+        all samples (in memory or memory mapped in 'samples_dir')
+        :param scenario_name: name of the scenario
+        :param calc_setup: calculation setup of the scenario
+        :return: statistics and samples array (samples x result structure)
+        """
+        config = self.config.mc_statistics
+        assert config is not None
+        result_shape = self._result_structure(calc_setup).shape
+        statistics = OnlineStatistics(result_shape, config.quantiles)
+        samples_shape = (self.config.use_k_bw_distributions,) + result_shape
+        samples: Optional[ndarray] = None
+        if config.samples_dir:
+            samples_dir = Path(config.samples_dir)
+            samples_dir.mkdir(parents=True, exist_ok=True)
+            samples_file = samples_dir / samples_file_name(scenario_name)
+            samples = np.lib.format.open_memmap(
+                samples_file, mode="w+", shape=samples_shape
+            )
+            self.samples_files[scenario_name] = samples_file
+            # scenario name to file name
+            (samples_dir / "samples.json").write_text(
+                json.dumps(
+                    {name: file.name for name, file in self.samples_files.items()},
+                    ensure_ascii=False,
+                    indent=2,
+                ),
+                encoding="utf-8",
+            )
+        elif config.store_samples:
+            samples = np.zeros(samples_shape)
+        return statistics, samples
+
+    def _result_structure(self, calc_setup: BWCalculationSetup) -> ndarray:
+        if self.config.simple_regionalization.run_regionalization:
+            return np.zeros(
+                (
+                    len(calc_setup.inv),
+                    len(calc_setup.ia),
+                    len(self.config.simple_regionalization.select_regions),
+                )
+            )
+        return np.zeros((len(calc_setup.inv), len(calc_setup.ia)))
+
+    def _lca_arguments(self, calc_setup: BWCalculationSetup) -> dict[str, Any]:
+        """
+        Arguments for the lca of a calculation setup, including the regionalization and
+        non-linear characterization data of previous lcas
+        :param calc_setup: calculation setup of a scenario
+        :return: keyword arguments for BaseStackedMultiLCA
+        """
+        run_regionalization = self.config.simple_regionalization.run_regionalization
+        contribution_analysis = self.config.contribution_analysis
+        return {
+            "calc_setup": calc_setup,
+            "results_structure": self._result_structure(calc_setup),
+            "subset_labels": (
+                self.config.simple_regionalization.select_regions
+                if run_regionalization
+                else None
+            ),
+            "activity_label_key": "enb_location" if run_regionalization else None,
+            "method_activity_func_maps": self.nonlinear_method_maps,
+            "activity_regions": (
+                self.activity_regions
+                if self.config.simple_regionalization.in_memory
+                else None
+            ),
+            "subset_label_map": self.region_activity_map,
+            "region_matrix": self.region_matrix,
+            "region_matrix_key": self.region_matrix_key,
+            "nonlinear_characterizations": self.nonlinear_characterizations,
+            "contribution_top_n": (
+                contribution_analysis.top_n if contribution_analysis else None
+            ),
+            "contribution_by": (
+                contribution_analysis.by if contribution_analysis else "process"
+            ),
+        }
+
+    def _create_lca(
+        self,
+        calc_setup: BWCalculationSetup,
+        use_distributions: bool,
+        seed: Optional[int] = None,
+    ) -> BaseStackedMultiLCA:
+        """
+        Create the lca of a calculation setup (which also calculates the first results)
+        and keep the regionalization and non-linear characterization matrices for the
+        following lcas.
+        :param calc_setup: calculation setup of a scenario
+        :param use_distributions: if the lca should use distributions
+        :param seed: seed for the distributions
+        :return: the lca object
+        """
+        _lca = BaseStackedMultiLCA(
+            **self._lca_arguments(calc_setup),
+            use_distributions=use_distributions,
+            seed=seed,
+        )
+        self.nonlinear_characterizations = _lca.nonlinear_characterizations
+        if self.config.simple_regionalization.run_regionalization:
+            self.region_activity_map = _lca.subset_label_map
+            self.region_matrix = _lca.region_matrix
+            self.region_matrix_key = _lca.region_matrix_key
+        return _lca
 
     def _assign_results2nodes(
         self,
@@ -392,7 +782,31 @@ class BrightwayAdapter(EnbiosAdapter):
         scenario: Scenario,
         use_distributions: bool,
         has_regionalization: bool,
+        statistics: Optional[OnlineStatistics] = None,
+        samples: Optional[ndarray] = None,
     ):
+        # result key, unit and index (method or method, region) in the result structure
+        result_keys: list[tuple[str, str, tuple[int, ...]]] = []
+        for m_idx, (method_name, method_data) in enumerate(self.methods.items()):
+            if has_regionalization:
+                # regions are sorted, like the columns of the lca (BaseStackedMultiLCA)
+                for region_idx, region in enumerate(
+                    sorted(self.config.simple_regionalization.select_regions)
+                ):
+                    result_keys.append(
+                        (
+                            f"{method_name}.{region}",
+                            method_data.bw_method_unit,
+                            (m_idx, region_idx),
+                        )
+                    )
+            else:
+                result_keys.append((method_name, method_data.bw_method_unit, (m_idx,)))
+        all_statistics = statistics.result_statistics() if statistics else []
+        store_samples = bool(
+            self.config.mc_statistics and self.config.mc_statistics.store_samples
+        )
+
         result_data: dict[str, Any] = {}
         for act_idx, act_alias in enumerate(self.activityMap.keys()):
             if (
@@ -401,42 +815,82 @@ class BrightwayAdapter(EnbiosAdapter):
             ):
                 continue
             result_data[act_alias] = {}
-            result_field = "multi_magnitude" if use_distributions else "magnitude"
-            for m_idx, method in enumerate(self.methods.items()):
-                method_name, method_data = method
-                if has_regionalization:
-                    for region_idx, region in enumerate(
-                        self.config.simple_regionalization.select_regions
-                    ):
-                        method_result = ResultValue.model_validate(
-                            {"unit": method_data.bw_method_unit}
-                        )
-                        method_res_values = [
-                            res[act_idx, m_idx, region_idx] for res in raw_results
-                        ]
-                        setattr(
-                            method_result,
-                            result_field,
-                            (
-                                method_res_values
-                                if use_distributions
-                                else method_res_values[0]
-                            ),
-                        )
-                        result_data[act_alias][f"{method_name}.{region}"] = method_result
-                else:
-                    method_result = ResultValue.model_validate(
-                        {"unit": method_data.bw_method_unit}
-                    )
-                    method_res_values = [res[act_idx, m_idx] for res in raw_results]
-                    setattr(
-                        method_result,
-                        result_field,
-                        method_res_values if use_distributions else method_res_values[0],
+            for result_key, unit, index in result_keys:
+                res_idx = (act_idx,) + index
+                method_result = ResultValue.model_validate({"unit": unit})
+                if statistics:
+                    node_statistics = all_statistics[
+                        int(np.ravel_multi_index(res_idx, statistics.shape))
+                    ]
+                    method_result.magnitude = node_statistics["mean"]
+                    method_result.statistics = ResultStatistics.model_validate(
+                        node_statistics
                     )
-                    result_data[act_alias][method_name] = method_result
+                    if samples is not None:
+                        method_result._samples = samples[(slice(None),) + res_idx]
+                        if store_samples:
+                            method_result.multi_magnitude = (
+                                method_result._samples.tolist()
+                            )
+                elif use_distributions:
+                    method_result.multi_magnitude = [res[res_idx] for res in raw_results]
+                else:
+                    method_result.magnitude = raw_results[0][res_idx]
+                result_data[act_alias][result_key] = method_result
         return result_data
 
+    def _collect_contributions(
+        self, _lca: BaseStackedMultiLCA, scenario: Scenario
+    ) -> dict[str, dict[str, list[dict[str, Any]]]]:
+        """
+        Map the top contributors of the lca (matrix indices) to the processes or
+        biosphere flows.
+        :param _lca: lca object, calculated with contribution analysis
+        :param scenario: scenario
+        :return: node to method to contributors (code, name, amount)
+        """
+        assert self.config.contribution_analysis
+        indices, values = _lca.contribution_indices, _lca.contribution_values
+        assert indices is not None and values is not None
+        index_ids = (
+            _lca.lca.dicts.activity.reversed
+            if self.config.contribution_analysis.by == "process"
+            else _lca.lca.dicts.biosphere.reversed
+        )
+        ids = {index_ids[int(idx)] for idx in np.unique(indices) if idx >= 0}
+        activities = {
+            a.id: a
+            for a in ActivityDataset.select(
+                ActivityDataset.id, ActivityDataset.code, ActivityDataset.name
+            ).where(ActivityDataset.id.in_(list(ids)))
+        }
+        contributions: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        # rows of the functional units (calculation setup inventory)
+        row = 0
+        for act_alias in self.activityMap.keys():
+            if (
+                scenario.name not in self.activityMap[act_alias].scenario_outputs
+                and scenario.config.exclude_defaults
+            ):
+                continue
+            contributions[act_alias] = {}
+            for m_idx, method_name in enumerate(self.methods.keys()):
+                contributors = []
+                for idx, amount in zip(indices[row, m_idx], values[row, m_idx]):
+                    if idx < 0:
+                        continue
+                    activity = activities[index_ids[int(idx)]]
+                    contributors.append(
+                        {
+                            "code": activity.code,
+                            "name": activity.name,
+                            "amount": float(amount),
+                        }
+                    )
+                contributions[act_alias][method_name] = contributors
+            row += 1
+        return contributions
+
     def prepare_nonlinear_methods(self):
         # create dummy LCA to get the biosphere_matrix and prep_lca.dicts.biosphere
         # prep_lca = self.prepare_lca_for_nonlinear(calc_setup)
@@ -452,9 +906,9 @@ class BrightwayAdapter(EnbiosAdapter):
 
     def prepare_nonlinear_method(
         self, method_name: str, method_config: NonLinearMethodConfig
-    ) -> dict[int, Callable[[float], float]]:
+    ) -> dict[int, CharacterizationFunction]:
         result_func_map: dict[
-            int, Callable[[float], float]
+            int, CharacterizationFunction
         ] = {}  # [None] * prep_lca.biosphere_matrix.shape[0]
         if method_name not in self.methods:
             raise ValueError(
@@ -486,7 +940,11 @@ class BrightwayAdapter(EnbiosAdapter):
             )
             for method_key, cf in bw_method_data:
                 activity_id = bw_cf_activity_key2ids[tuple(method_key)]
-                result_func_map[activity_id] = lambda v, cf_=cf: v * cf_
+                amount = cf["amount"] if isinstance(cf, dict) else cf
+                # linear, but evaluated together with all other polynomials
+                result_func_map[activity_id] = PolynomialFunction(
+                    coefficients=[0.0, amount]
+                )
         return result_func_map
 
     @staticmethod
@@ -524,4 +982,10 @@ class BrightwayAdapter(EnbiosAdapter):
         )
 
     def result_extras(self, node_name: str, scenario_name: str) -> dict:
-        return {"bw_activity_code": self.activityMap[node_name].bw_activity["code"]}
+        extras: dict[str, Any] = {
+            "bw_activity_code": self.activityMap[node_name].bw_activity["code"]
+        }
+        contributions = self.contributions.get(scenario_name, {}).get(node_name)
+        if contributions is not None:
+            extras["contributions"] = contributions
+        return extras
@@ -1,9 +1,17 @@
 from dataclasses import dataclass
-from typing import Any, Optional, Callable, Sequence
+from typing import Any, Optional, Callable, Sequence, Union, Literal
 
 import bw2data
+import numpy as np
 from bw2data.backends import Activity
-from pydantic import BaseModel, ConfigDict, Field, model_validator, RootModel
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    model_validator,
+    RootModel,
+    field_validator,
+)
 
 from enbios.generic.enbios2_logging import get_logger
 from enbios.base.models import NodeOutput
@@ -24,6 +32,11 @@ class RegionalizationConfig(BaseModel):
     clear_all_other_node_regions: Optional[bool] = Field(
         False, description="Delete all regions not in 'hierarchy' and 'set_node_regions'"
     )
+    in_memory: bool = Field(
+        False,
+        description="Keep the activity regions in the adapter, "
+        "instead of writing 'enb_location' into the brightway database",
+    )
 
     @model_validator(mode="before")
     def validate(data: Any):
@@ -35,11 +48,63 @@ class RegionalizationConfig(BaseModel):
         return data
 
 
+class PiecewiseLinearFunction(BaseModel):
+    """
+    Characterization function given by a table of breakpoints, which is linearly interpolated.
+    Values outside the table take the value of the first/last breakpoint (like numpy.interp).
+    """
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    x: list[float] = Field(
+        ..., description="increasing inventory values of the breakpoints"
+    )
+    y: list[float] = Field(..., description="characterized values of the breakpoints")
+
+    @model_validator(mode="after")
+    def validate_table(self) -> "PiecewiseLinearFunction":
+        if len(self.x) != len(self.y) or len(self.x) < 2:
+            raise ValueError(
+                "Piecewise linear function needs at least 2 breakpoints "
+                "and 'x' and 'y' of the same length"
+            )
+        if any(b <= a for a, b in zip(self.x, self.x[1:])):
+            raise ValueError("'x' of piecewise linear function must be increasing")
+        return self
+
+    def __call__(self, v: float) -> float:
+        return float(np.interp(v, self.x, self.y))
+
+
+class PolynomialFunction(BaseModel):
+    """
+    Characterization function given by polynomial coefficients, in increasing order
+    (c0 + c1 * v + c2 * v^2 ...)
+    """
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    coefficients: list[float] = Field(..., min_length=1)
+
+    def __call__(self, v: float) -> float:
+        return float(np.polynomial.polynomial.polyval(v, self.coefficients))
+
+
+# numpy ufuncs (e.g. numpy.sqrt) are also evaluated on all flows at once
+CharacterizationFunction = Union[
+    PiecewiseLinearFunction, PolynomialFunction, Callable[[float], float]
+]
+
+
 class NonLinearMethodConfig(BaseModel):
     model_config = ConfigDict(extra="forbid", validate_assignment=True, strict=True)
     name: str = Field(None, description="bw method tuple name")
     # bw_id: tuple[str, ...] = Field(None, description="bw method tuple name")
-    functions: dict[tuple[str, str], Callable[[float], float]] = Field(None, exclude=True)
+    functions: dict[tuple[str, str], CharacterizationFunction] = Field(
+        None,
+        exclude=True,
+        description="biosphere flow key to characterization function. "
+        "Piecewise linear functions, polynomials and numpy ufuncs are vectorized, "
+        "other callables are called per flow",
+    )
     module_path_function_name: tuple[str, str] = Field(
         None,
         description="path to a module and a function name. "
@@ -94,6 +159,54 @@ class NonLinearCharacterizationConfig(BaseModel):
         return data
 
 
+class MonteCarloStatisticsConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid", validate_assignment=True, strict=True)
+    quantiles: list[float] = Field(
+        [0.05, 0.5, 0.95], description="Quantiles to estimate (between 0 and 1)"
+    )
+    store_samples: bool = Field(
+        False, description="Also store all samples in 'multi_magnitude'"
+    )
+    samples_dir: Optional[str] = Field(
+        None,
+        description="Directory to write the samples of each scenario to "
+        "('<scenario>.npy', see 'samples.json' for the file of each scenario). The samples are memory mapped and used to calculate the "
+        "statistics of aggregated nodes",
+    )
+
+    @field_validator("quantiles")
+    @classmethod
+    def validate_quantiles(cls, quantiles: list[float]) -> list[float]:
+        if any(not 0 < q < 1 for q in quantiles):
+            raise ValueError(f"Quantiles must be between 0 and 1, got {quantiles}")
+        return quantiles
+
+
+class LCAStoreConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid", validate_assignment=True, strict=True)
+    max_bytes: Optional[int] = Field(
+        None,
+        description="Byte budget of the stored lca objects. When it is exceeded, the "
+        "objects of the least recently used scenarios are dropped",
+    )
+    lightweight: bool = Field(
+        False,
+        description="Only keep the results and the supply vectors (sparse) of the lca "
+        "objects. Technosphere, biosphere and characterization matrices are shared by "
+        "all stored scenarios",
+    )
+
+
+class ContributionAnalysisConfig(BaseModel):
+    model_config = ConfigDict(extra="forbid", validate_assignment=True, strict=True)
+    top_n: int = Field(5, gt=0, description="Number of top contributors to keep")
+    by: Literal["process", "bioflow"] = Field(
+        "process",
+        description="Contributions of processes (supply chain) or of biosphere flows. "
+        "Non-linear methods only have biosphere flow contributions",
+    )
+
+
 class BWAdapterConfig(BaseModel):
     model_config = ConfigDict(extra="forbid", validate_assignment=True, strict=True)
     bw_project: str
@@ -101,6 +214,19 @@ class BWAdapterConfig(BaseModel):
     use_k_bw_distributions: int = Field(
         1, description="Number of samples to use for MonteCarlo"
     )
+    mc_seed: Optional[int] = Field(
+        None, description="Seed for the MonteCarlo samples, for reproducible results"
+    )
+    mc_workers: int = Field(
+        1,
+        description="Number of processes for the MonteCarlo samples. "
+        "The results depend on the seed and the number of processes",
+    )
+    mc_statistics: Optional[MonteCarloStatisticsConfig] = Field(
+        None,
+        description="Keep streaming statistics (mean, variance, min, max, quantiles) "
+        "of the MonteCarlo samples, instead of all samples",
+    )
     store_raw_results: bool = Field(
         False,
         description="If the numpy matrix of brightway should be stored in the adapter. "
@@ -111,6 +237,21 @@ class BWAdapterConfig(BaseModel):
         description="If the LCA object should be stored. "
         "Will be stored in `lca_objects[scenario.name]`",
     )
+    lca_store: LCAStoreConfig = Field(
+        default_factory=LCAStoreConfig,
+        description="Memory bounds of the stored lca objects (`store_lca_object`)",
+    )
+    contribution_analysis: Optional[ContributionAnalysisConfig] = Field(
+        None,
+        description="Top contributors of each activity and method. Added to the "
+        "result extras ('contributions') of the nodes",
+    )
+    register_calculation_setups: bool = Field(
+        True,
+        description="Register the calculation setups of the scenarios in "
+        "'bw2data.calculation_setups'. Otherwise, they are only kept in the adapter "
+        "(`scenario_calc_setups`)",
+    )
     simple_regionalization: RegionalizationConfig = Field(
         description="Generate regionalized LCA", default_factory=RegionalizationConfig  # type: ignore
     )
@@ -169,5 +310,47 @@ class BWCalculationSetup:
     inv: list[dict[Activity, float]]
     ia: list[tuple[str, ...]]
 
+    def inventory_keys(self) -> list[dict[Any, float]]:
+        """
+        The inventory with the keys of the activities, instead of the activity objects.
+        """
+        return [
+            {
+                (activity.key if isinstance(activity, Activity) else activity): amount
+                for activity, amount in func_unit.items()
+            }
+            for func_unit in self.inv
+        ]
+
+    @staticmethod
+    def from_inventory_keys(
+        name: str, inventory_keys: list[dict[Any, float]], ia: list[tuple[str, ...]]
+    ) -> "BWCalculationSetup":
+        """
+        Create a setup from an inventory with activity keys (see inventory_keys).
+        """
+        return BWCalculationSetup(
+            name,
+            [
+                {
+                    (
+                        bw2data.get_activity(activity)
+                        if isinstance(activity, tuple)
+                        else activity
+                    ): amount
+                    for activity, amount in func_unit.items()
+                }
+                for func_unit in inventory_keys
+            ],
+            ia,
+        )
+
     def register(self):
-        bw2data.calculation_setups[self.name] = {"inv": self.inv, "ia": self.ia}
+        """
+        Register the setup in bw2data.calculation_setups. Activities are stored by their
+        key, instead of serializing the whole activity objects.
+        """
+        bw2data.calculation_setups[self.name] = {
+            "inv": self.inventory_keys(),
+            "ia": self.ia,
+        }
@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags, issparse, spmatrix
+
+from enbios.bw2.MultiLCA_util import BaseStackedMultiLCA
+from enbios.generic.enbios2_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def matrix_nbytes(matrix: Any) -> int:
+    """
+    Bytes of a dense or sparse matrix (0 for anything else)
+    """
+    if issparse(matrix):
+        return sum(
+            getattr(matrix, attr).nbytes
+            for attr in ("data", "indices", "indptr", "row", "col")
+            if hasattr(matrix, attr)
+        )
+    return int(getattr(matrix, "nbytes", 0))
+
+
+def lca_nbytes(lca: Union[BaseStackedMultiLCA, "RetainedLCA", Any]) -> int:
+    """
+    Estimated bytes of the arrays and matrices held by a stored lca object
+    """
+    if isinstance(lca, RetainedLCA):
+        return lca.nbytes
+    if isinstance(lca, BaseStackedMultiLCA):
+        matrices = [
+            lca.results,
+            getattr(lca.lca, "technosphere_matrix", None),
+            getattr(lca.lca, "biosphere_matrix", None),
+            *lca.method_matrices,
+            *lca.supply_arrays,
+        ]
+        return sum(matrix_nbytes(matrix) for matrix in matrices)
+    return matrix_nbytes(lca)
+
+
+@dataclass
+class SharedLCAMatrices:
+    """
+    Technosphere, biosphere and characterization matrices (with their index mappings),
+    shared by all retained lca objects, that were calculated with the same matrices.
+    """
+
+    technosphere_matrix: spmatrix
+    biosphere_matrix: spmatrix
+    activity_dict: Any
+    biosphere_dict: Any
+    method_matrices: dict[tuple[str, ...], Any] = field(default_factory=dict)
+
+    def matches(self, lca: BaseStackedMultiLCA) -> bool:
+        """
+        Check if the lca uses the same technosphere and biosphere matrices
+        """
+        for shared, other in [
+            (self.technosphere_matrix, lca.lca.technosphere_matrix),
+            (self.biosphere_matrix, lca.lca.biosphere_matrix),
+        ]:
+            if shared is other:
+                continue
+            if shared.shape != other.shape or shared.nnz != other.nnz:
+                return False
+            if (shared != other).nnz:
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            matrix_nbytes(matrix)
+            for matrix in [
+                self.technosphere_matrix,
+                self.biosphere_matrix,
+                *self.method_matrices.values(),
+            ]
+        )
+
+
+class RetainedLCA:
+    """
+    Lightweight form of a BaseStackedMultiLCA. It keeps only the results and the supply
+    vectors (sparse, one row per functional unit). The matrices are shared with other
+    retained lca objects.
+    """
+
+    def __init__(
+        self,
+        results: np.ndarray,
+        supply_vectors: csr_matrix,
+        func_units: list[dict],
+        methods: list[tuple[str, ...]],
+        matrices: SharedLCAMatrices,
+    ):
+        self.results = results
+        self.supply_vectors = supply_vectors
+        self.func_units = func_units
+        self.methods = methods
+        self.matrices = matrices
+
+    @classmethod
+    def from_lca(
+        cls,
+        lca: BaseStackedMultiLCA,
+        shared_matrices: Optional[list[SharedLCAMatrices]] = None,
+    ) -> "RetainedLCA":
+        """
+        Create the retained form of an lca.
+        :param lca: lca object
+        :param shared_matrices: matrices of other retained lcas. If none of them matches
+        the matrices of this lca, a new one is appended.
+        :return: retained lca
+        """
+        if shared_matrices is None:
+            shared_matrices = []
+        matrices = next((m for m in shared_matrices if m.matches(lca)), None)
+        if matrices is None:
+            matrices = SharedLCAMatrices(
+                lca.lca.technosphere_matrix,
+                lca.lca.biosphere_matrix,
+                lca.lca.dicts.activity,
+                lca.lca.dicts.biosphere,
+            )
+            shared_matrices.append(matrices)
+        for method, method_matrix in zip(lca.methods, lca.method_matrices):
+            matrices.method_matrices.setdefault(method, method_matrix)
+        supply_vectors = csr_matrix(
+            np.vstack(lca.supply_arrays)
+            if lca.supply_arrays
+            else np.zeros((0, lca.lca.technosphere_matrix.shape[0]))
+        )
+        return cls(lca.results, supply_vectors, lca.func_units, lca.methods, matrices)
+
+    def supply_array(self, row: int) -> np.ndarray:
+        """
+        Supply array of a functional unit
+        """
+        return self.supply_vectors[row].toarray().ravel()
+
+    def inventory(self, row: int) -> csr_matrix:
+        """
+        Life cycle inventory (biosphere flows x activities) of a functional unit
+        """
+        return csr_matrix(self.matrices.biosphere_matrix @ diags(self.supply_array(row)))
+
+    def characterized_inventory(self, row: int, method: tuple[str, ...]) -> Any:
+        """
+        Characterized inventory of a functional unit, for contribution analysis.
+        Non-linear methods only give the characterized value per biosphere flow
+        """
+        method_matrix = self.matrices.method_matrices[method]
+        inventory = self.inventory(row)
+        if hasattr(method_matrix, "characterize"):
+            return method_matrix.characterize(np.asarray(inventory.sum(1)).ravel())
+        return method_matrix @ inventory
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of the results and supply vectors (without the shared matrices)
+        """
+        return matrix_nbytes(self.results) + matrix_nbytes(self.supply_vectors)
+
+
+StoredLCA = Union[BaseStackedMultiLCA, RetainedLCA]
+
+
+class LCAObjectStore(MutableMapping):
+    """
+    Stored lca objects of the scenarios (scenario name -> list of lca objects).
+    With a byte budget, the least recently used scenarios are dropped, when the budget
+    is exceeded. The most recently stored scenario is always kept.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, lightweight: bool = False):
+        """
+        :param max_bytes: byte budget of all stored objects (None: unlimited)
+        :param lightweight: store the lca objects in their retained form
+        """
+        self.max_bytes = max_bytes
+        self.lightweight = lightweight
+        self.shared_matrices: list[SharedLCAMatrices] = []
+        self._objects: OrderedDict[str, list[StoredLCA]] = OrderedDict()
+        self._nbytes: dict[str, int] = {}
+
+    def __getitem__(self, scenario_name: str) -> list[StoredLCA]:
+        objects = self._objects[scenario_name]
+        self._objects.move_to_end(scenario_name)
+        return objects
+
+    def __setitem__(self, scenario_name: str, objects: list[StoredLCA]):
+        if self.lightweight:
+            objects = [
+                RetainedLCA.from_lca(obj, self.shared_matrices)
+                if isinstance(obj, BaseStackedMultiLCA)
+                else obj
+                for obj in objects
+            ]
+        self._objects[scenario_name] = objects
+        self._objects.move_to_end(scenario_name)
+        self._nbytes[scenario_name] = sum(lca_nbytes(obj) for obj in objects)
+        self._evict()
+
+    def __delitem__(self, scenario_name: str):
+        del self._objects[scenario_name]
+        del self._nbytes[scenario_name]
+        # drop shared matrices, that are not used anymore
+        used_matrices = {
+            id(obj.matrices)
+            for objects in self._objects.values()
+            for obj in objects
+            if isinstance(obj, RetainedLCA)
+        }
+        self.shared_matrices = [
+            matrices for matrices in self.shared_matrices if id(matrices) in used_matrices
+        ]
+
+    def __contains__(self, scenario_name: object) -> bool:
+        # without __getitem__, which would mark the scenario as used
+        return scenario_name in self._objects
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._objects)
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of all stored objects (without shared matrices)
+        """
+        return sum(self._nbytes.values())
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self.nbytes > self.max_bytes and len(self._objects) > 1:
+            scenario_name = next(iter(self._objects))
+            logger.debug(f"Dropping stored lca objects of scenario '{scenario_name}'")
+            del self[scenario_name]
+        if self.nbytes > self.max_bytes:
+            logger.warning(
+                f"Stored lca objects of scenario '{next(iter(self._objects))}' exceed the "
+                f"byte budget of {self.max_bytes}"
+            )
@@ -0,0 +1,131 @@
+from collections.abc import Mapping
+from typing import Callable, Optional
+
+import numpy as np
+
+from enbios.bw2.bw_models import (
+    CharacterizationFunction,
+    PiecewiseLinearFunction,
+    PolynomialFunction,
+)
+
+
+class NonLinearCharacterization:
+    """
+    Characterization of a non-linear method. The functions are assigned to rows of the
+    biosphere matrix and grouped by their type, so that polynomials, piecewise linear
+    functions and numpy ufuncs are evaluated on the whole summed inventory at once.
+    Other callables are called for each of their flows. Flows without function are
+    characterized with 0.
+    """
+
+    def __init__(self, row_functions: Mapping[int, CharacterizationFunction], size: int):
+        """
+        :param row_functions: biosphere matrix row to characterization function
+        :param size: number of rows of the biosphere matrix
+        """
+        self.size = size
+        # activity ids and their biosphere rows (-1 if not in the matrix). Only set, when
+        # created from activity functions. Used to check if it can be reused by another lca
+        self.activity_ids: Optional[np.ndarray] = None
+        self.activity_rows: Optional[np.ndarray] = None
+        polynomials: dict[int, PolynomialFunction] = {}
+        # grouped by the identity of the table/ufunc
+        piecewise: dict[int, tuple[PiecewiseLinearFunction, list[int]]] = {}
+        ufuncs: dict[int, tuple[np.ufunc, list[int]]] = {}
+        self.callables: list[tuple[int, Callable[[float], float]]] = []
+        for row, func in row_functions.items():
+            if isinstance(func, PolynomialFunction):
+                polynomials[row] = func
+            elif isinstance(func, PiecewiseLinearFunction):
+                piecewise.setdefault(id(func), (func, []))[1].append(row)
+            elif isinstance(func, np.ufunc):
+                ufuncs.setdefault(id(func), (func, []))[1].append(row)
+            else:
+                self.callables.append((row, func))
+
+        self.polynomial_rows = np.array(list(polynomials.keys()), dtype=int)
+        # coefficients in increasing order, padded with zeros (rows x max degree + 1)
+        degree = max((len(p.coefficients) for p in polynomials.values()), default=0)
+        self.polynomial_coefficients = np.zeros((len(polynomials), degree))
+        for idx, polynomial in enumerate(polynomials.values()):
+            self.polynomial_coefficients[
+                idx, : len(polynomial.coefficients)
+            ] = polynomial.coefficients
+        self.piecewise: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = [
+            (np.array(rows, dtype=int), np.array(table.x), np.array(table.y))
+            for table, rows in piecewise.values()
+        ]
+        self.ufuncs: list[tuple[np.ndarray, np.ufunc]] = [
+            (np.array(rows, dtype=int), ufunc) for ufunc, rows in ufuncs.values()
+        ]
+
+    @classmethod
+    def from_activity_functions(
+        cls,
+        activity_functions: Mapping[int, CharacterizationFunction],
+        biosphere_dict: Mapping[int, int],
+        size: int,
+    ) -> "NonLinearCharacterization":
+        """
+        Create the characterization from functions, that are assigned to activity ids.
+        Activities that are not in the biosphere matrix are ignored.
+        :param activity_functions: biosphere activity id to characterization function
+        :param biosphere_dict: activity id to biosphere matrix row (lca.dicts.biosphere)
+        :param size: number of rows of the biosphere matrix
+        """
+        activity_ids = list(activity_functions.keys())
+        activity_rows = [
+            biosphere_dict.get(activity_id, -1) for activity_id in activity_ids
+        ]
+        characterization = cls(
+            {
+                row: activity_functions[activity_id]
+                for activity_id, row in zip(activity_ids, activity_rows)
+                if row != -1
+            },
+            size,
+        )
+        characterization.activity_ids = np.array(activity_ids, dtype=int)
+        characterization.activity_rows = np.array(activity_rows, dtype=int)
+        return characterization
+
+    def matches(self, biosphere_dict: Mapping[int, int], size: int) -> bool:
+        """
+        Check if the characterization can be used for an lca with the given biosphere
+        index, without creating it again
+        :param biosphere_dict: activity id to biosphere matrix row (lca.dicts.biosphere)
+        :param size: number of rows of the biosphere matrix
+        :return: if all activities are on the same rows
+        """
+        if self.activity_ids is None or self.activity_rows is None or size != self.size:
+            return False
+        return all(
+            biosphere_dict.get(activity_id, -1) == row
+            for activity_id, row in zip(
+                self.activity_ids.tolist(), self.activity_rows.tolist()
+            )
+        )
+
+    def characterize(self, summed_inventory: np.ndarray) -> np.ndarray:
+        """
+        Characterize the summed inventory (one value per biosphere flow)
+        :param summed_inventory: array of the length of the biosphere matrix rows
+        :return: characterized value for each biosphere flow
+        """
+        summed_inventory = np.asarray(summed_inventory, dtype=float).ravel()
+        result = np.zeros(self.size)
+        if len(self.polynomial_rows):
+            values = summed_inventory[self.polynomial_rows]
+            # horner scheme for all polynomials at once
+            poly_result = self.polynomial_coefficients[:, -1].copy()
+            for col in range(self.polynomial_coefficients.shape[1] - 2, -1, -1):
+                poly_result = poly_result * values + self.polynomial_coefficients[:, col]
+            result[self.polynomial_rows] = poly_result
+        for rows, x, y in self.piecewise:
+            result[rows] = np.interp(summed_inventory[rows], x, y)
+        for rows, ufunc in self.ufuncs:
+            result[rows] = ufunc(summed_inventory[rows])
+        for row, func in self.callables:
+            result[row] = func(summed_inventory[row])
+        return result
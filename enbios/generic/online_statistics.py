@@ -0,0 +1,204 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+# number of markers of the P² quantile estimation
+_P2_MARKERS = 5
+
+
+class OnlineStatistics:
+    """
+    Streaming statistics (count, mean, variance, min, max and quantiles) of arrays of
+    any shape. Each call of update adds one sample for all elements at once.
+    Mean and variance are calculated with Welford's algorithm, quantiles are estimated
+    with the P² algorithm (Jain & Chlamtac, 1985), so the samples themselves are not kept.
+    """
+
+    def __init__(self, shape: Sequence[int], quantiles: Sequence[float] = ()):
+        """
+        :param shape: shape of the samples
+        :param quantiles: quantiles to estimate (each between 0 and 1, exclusive)
+        """
+        if any(not 0 < q < 1 for q in quantiles):
+            raise ValueError(f"Quantiles must be between 0 and 1, got {quantiles}")
+        self.shape = tuple(shape)
+        self.quantiles = list(quantiles)
+        self.count = 0
+        self.mean = np.zeros(self.shape)
+        self._m2 = np.zeros(self.shape)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+        # first samples, until the P² markers can be initialized
+        self._initial_samples: list[np.ndarray] = []
+        # marker heights and positions: (quantiles, markers, *shape)
+        self._heights: Optional[np.ndarray] = None
+        self._positions: Optional[np.ndarray] = None
+        # P² desired marker positions and their increments per sample
+        self._marker_shape = (1, _P2_MARKERS) + (1,) * len(self.shape)
+        marker_shape = self._marker_shape
+        p = np.array(self.quantiles).reshape((-1, 1) + (1,) * len(self.shape))
+        self._desired_positions = (
+            np.array([1, 1, 1, 3, 5]).reshape(marker_shape)
+            + np.array([0, 2, 4, 2, 0]).reshape(marker_shape) * p
+        )
+        self._desired_increments = (
+            np.array([0, 0, 0, 1, 2]).reshape(marker_shape)
+            + np.array([0, 1, 2, 1, 0]).reshape(marker_shape) * p
+        ) / 2
+
+    def update(self, sample: np.ndarray):
+        """
+        Add one sample
+        :param sample: array of the shape of the statistics
+        """
+        sample = np.asarray(sample, dtype=float)
+        if sample.shape != self.shape:
+            raise ValueError(f"Sample shape {sample.shape} does not match {self.shape}")
+        self.count += 1
+        delta = sample - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (sample - self.mean)
+        np.minimum(self.min, sample, out=self.min)
+        np.maximum(self.max, sample, out=self.max)
+        if not self.quantiles:
+            return
+        if self._heights is None:
+            self._initial_samples.append(sample.copy())
+            if len(self._initial_samples) == _P2_MARKERS:
+                heights = np.sort(np.stack(self._initial_samples), axis=0)
+                self._heights = np.repeat(heights[None], len(self.quantiles), axis=0)
+                self._positions = np.broadcast_to(
+                    np.arange(1, _P2_MARKERS + 1, dtype=float).reshape(
+                        self._marker_shape
+                    ),
+                    self._heights.shape,
+                ).copy()
+                self._initial_samples = []
+        else:
+            self._update_markers(sample)
+
+    def _update_markers(self, sample: np.ndarray):
+        q, n = self._heights, self._positions
+        assert q is not None and n is not None
+        q[:, 0] = np.minimum(q[:, 0], sample)
+        q[:, -1] = np.maximum(q[:, -1], sample)
+        # cell of the sample, 0-3
+        cell = (q[:, 1:-1] <= sample).sum(axis=1)
+        marker_index = np.arange(_P2_MARKERS).reshape(self._marker_shape)
+        n += marker_index > cell[:, None]
+        self._desired_positions = self._desired_positions + self._desired_increments
+        for i in range(1, _P2_MARKERS - 1):
+            d = self._desired_positions[:, i] - n[:, i]
+            up = (d >= 1) & (n[:, i + 1] - n[:, i] > 1)
+            down = (d <= -1) & (n[:, i - 1] - n[:, i] < -1)
+            move = up | down
+            if not move.any():
+                continue
+            step = np.where(up, 1.0, -1.0)
+            parabolic = q[:, i] + step / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + step)
+                * (q[:, i + 1] - q[:, i])
+                / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - step)
+                * (q[:, i] - q[:, i - 1])
+                / (n[:, i] - n[:, i - 1])
+            )
+            linear = np.where(
+                up,
+                q[:, i] + (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i]),
+                q[:, i] - (q[:, i - 1] - q[:, i]) / (n[:, i - 1] - n[:, i]),
+            )
+            new_height = np.where(
+                (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1]), parabolic, linear
+            )
+            q[:, i] = np.where(move, new_height, q[:, i])
+            n[:, i] += np.where(move, step, 0)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """
+        Sample variance (ddof=1)
+        """
+        if self.count < 2:
+            return np.zeros(self.shape)
+        return self._m2 / (self.count - 1)
+
+    def quantile_values(self) -> np.ndarray:
+        """
+        Quantile estimations. Exact, while there are less than 5 samples.
+        :return: array (quantiles, *shape)
+        """
+        if self._heights is not None:
+            return self._heights[:, 2].copy()
+        if not self._initial_samples:
+            return np.full((len(self.quantiles),) + self.shape, np.nan)
+        return np.quantile(np.stack(self._initial_samples), self.quantiles, axis=0)
+
+    def result_statistics(self) -> list[dict]:
+        """
+        Statistics of each element, in C order of the shape. Can be used to create
+        'ResultStatistics'
+        :return: list of dicts with count, mean, variance, min, max and quantiles
+        """
+        return _statistics_dicts(
+            self.count,
+            self.mean,
+            self.variance,
+            self.min,
+            self.max,
+            self.quantiles,
+            self.quantile_values(),
+        )
+
+
+def sample_statistics(samples: np.ndarray, quantiles: Sequence[float] = ()) -> list[dict]:
+    """
+    Statistics of all samples at once (samples on the first axis). Quantiles are exact.
+    :param samples: array (samples, *shape)
+    :param quantiles: quantiles to calculate
+    :return: statistics of each element, like OnlineStatistics.result_statistics
+    """
+    samples = np.asarray(samples, dtype=float)
+    shape = samples.shape[1:]
+    count = samples.shape[0]
+    return _statistics_dicts(
+        count,
+        samples.mean(axis=0),
+        samples.var(axis=0, ddof=1) if count > 1 else np.zeros(shape),
+        samples.min(axis=0),
+        samples.max(axis=0),
+        list(quantiles),
+        (
+            np.quantile(samples, list(quantiles), axis=0)
+            if quantiles
+            else np.zeros((0,) + shape)
+        ),
+    )
+
+
+def _statistics_dicts(
+    count: int,
+    mean: np.ndarray,
+    variance: np.ndarray,
+    min_: np.ndarray,
+    max_: np.ndarray,
+    quantiles: list[float],
+    quantile_values: np.ndarray,
+) -> list[dict]:
+    quantile_values = quantile_values.reshape(len(quantiles), -1)
+    return [
+        {
+            "count": count,
+            "mean": float(mean_),
+            "variance": float(variance_),
+            "min": float(min__),
+            "max": float(max__),
+            "quantiles": {
+                str(q): float(quantile_values[q_idx, idx])
+                for q_idx, q in enumerate(quantiles)
+            },
+        }
+        for idx, (mean_, variance_, min__, max__) in enumerate(
+            zip(mean.ravel(), variance.ravel(), min_.ravel(), max_.ravel())
+        )
+    ]
@@ -1,54 +1,75 @@
-from typing import Optional
+from typing import Optional, Hashable
 
-from enbios.base.unit_registry import ureg
-from enbios.base.models import NodeOutput, output_merge_type, LabeledQuantity
+import numpy as np
+from pint import DimensionalityError
+
+from enbios.base.models import NodeOutput, output_merge_type
+from enbios.generic.unit_util import (
+    unit_conversion,
+    unit_dimensionality,
+    convert_magnitude,
+)
 
 
 def merge_outputs(nodes_outputs: list[list[NodeOutput]]) -> output_merge_type:
     """
     merges the outputs of multiple nodes into a single list of outputs and gives back the indices of assignment
+    Outputs are grouped by their label, outputs without label by the dimensionality of their unit.
+    Each merged output has the unit of the first output of its group.
     :param nodes_outputs:
     :return:
         the merged outputs and the indices of assignment (with the original structure of nodes_outputs)
     """
-    final_node_outputs: list[LabeledQuantity] = []
+    groups: dict[Hashable, int] = {}
+    # label, unit of the merged outputs
+    final_labels: list[Optional[str]] = []
+    final_units: list[str] = []
+    # group, magnitude and conversion factor of all outputs
+    output_groups: list[int] = []
+    magnitudes: list[float] = []
+    factors: list[float] = []
     nodes_outputs_assignments: list[list[int]] = []
 
-    def find_node_output_index(given_output: NodeOutput) -> Optional[int]:
-        for idx, labeled_q in enumerate(final_node_outputs):
-            if given_output.label:
-                if labeled_q.label == given_output.label:
-                    return idx
-            elif not labeled_q.label and labeled_q.quantity.is_compatible_with(
-                given_output.unit
-            ):
-                return idx
-        return None
-
     for node_outputs in nodes_outputs:
         node_outputs_assignment = []
         for output in node_outputs:
-            assign_to: Optional[int] = find_node_output_index(output)
-            if assign_to is not None:
-                final_node_outputs[assign_to].quantity += (
-                    ureg(output.unit) * output.magnitude
-                )
-                node_outputs_assignment.append(assign_to)
+            group_key: Hashable = (
+                ("label", output.label)
+                if output.label
+                else ("unit", unit_dimensionality(output.unit))
+            )
+            group = groups.get(group_key)
+            if group is None:
+                group = groups[group_key] = len(final_units)
+                final_labels.append(output.label)
+                # pint formatted unit
+                final_units.append(unit_conversion(output.unit, output.unit).unit)
+            conversion = unit_conversion(output.unit, final_units[group])
+            if not conversion.compatible:
+                raise DimensionalityError(output.unit, final_units[group])
+            output_groups.append(group)
+            if conversion.multiplicative:
+                magnitudes.append(output.magnitude)
+                factors.append(conversion.factor)
             else:
-                final_node_outputs.append(
-                    LabeledQuantity(
-                        quantity=ureg.parse_expression(output.unit) * output.magnitude,
-                        label=output.label,
-                    )
+                # units with an offset are converted by pint
+                magnitudes.append(
+                    convert_magnitude(output.magnitude, output.unit, final_units[group])
                 )
-                node_outputs_assignment.append(len(final_node_outputs) - 1)
+                factors.append(1.0)
+            node_outputs_assignment.append(group)
         nodes_outputs_assignments.append(node_outputs_assignment)
 
+    summed_magnitudes = np.bincount(
+        np.array(output_groups, dtype=int),
+        weights=np.array(magnitudes) * np.array(factors),
+        minlength=len(final_units),
+    )
     node_outputs = [
-        NodeOutput(
-            unit=str(n.quantity.units), magnitude=n.quantity.magnitude, label=n.label
+        NodeOutput(unit=unit, magnitude=magnitude, label=label)
+        for label, unit, magnitude in zip(
+            final_labels, final_units, summed_magnitudes.tolist()
         )
-        for n in final_node_outputs
     ]
 
     return node_outputs, nodes_outputs_assignments
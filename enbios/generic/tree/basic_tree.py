@@ -62,12 +62,18 @@ class BasicTreeNode(Generic[T]):
         self._name: str = name
         self.children: list[BasicTreeNode[T]] = []
         if children:
-            for child in children:
-                if isinstance(child, dict):
-                    child = BasicTreeNode.from_dict(
-                        child, dataclass=dataclass, data_factory=data_factory
+            self.add_children(
+                [
+                    (
+                        BasicTreeNode.from_dict(
+                            child, dataclass=dataclass, data_factory=data_factory
+                        )
+                        if isinstance(child, dict)
+                        else child
                     )
-                self.add_child(child)
+                    for child in children
+                ]
+            )
         self.parent: Optional[BasicTreeNode[T]] = None
         self.temp_data: dict[str, Any] = temp_data if temp_data else {}
         self._id: bytes = self.generate_id()
@@ -157,11 +163,21 @@ class BasicTreeNode(Generic[T]):
     def add_children(self, nodes: list["BasicTreeNode"]):
         """
         Add multiple child nodes to this node.
+        Does the same checks as add_child, but collects the child names only once.
         :param nodes:
         :return:
         """
+        child_names = set(self.get_child_names())
         for node in nodes:
-            self.add_child(node)
+            if not isinstance(node, BasicTreeNode):
+                raise ValueError(f"Node {node} is of wrong type {type(node)}")
+            if node is self or node.name in child_names:
+                raise ValueError(f"Node {node} is already a child of {self}")
+            if node.parent:
+                raise ValueError(f"Node {node} already has a parent")
+            self.children.append(node)
+            node.parent = self
+            child_names.add(node.name)
 
     def remove_child(self, node: Union["BasicTreeNode[T]", int, str]) -> "BasicTreeNode":
         """
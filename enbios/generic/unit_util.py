@@ -1,9 +1,93 @@
-from pint import Quantity
+import math
+from functools import lru_cache
+from typing import NamedTuple
 
-from enbios.base.unit_registry import ureg
+from pint import Quantity, DimensionalityError
+from pint.util import UnitsContainer
+
+from enbios.base.unit_registry import get_ureg
 from enbios.base.models import NodeOutput
 
 
+class UnitConversion(NamedTuple):
+    compatible: bool
+    # magnitude in the target unit of 1 source unit (nan, if not compatible)
+    factor: float
+    # the target unit, as formatted by pint
+    unit: str
+    # False for units with an offset (e.g. degC), which cannot be converted with a factor
+    # (factor is nan). Their magnitudes are converted by pint
+    multiplicative: bool = True
+
+
+@lru_cache(maxsize=None)
+def unit_conversion(
+    source_unit: str, target_unit: str, case_sensitive: bool = True
+) -> UnitConversion:
+    """
+    Conversion from a source unit to a target unit. The conversions are cached, so each
+    pair of unit strings is only parsed and converted once by pint.
+    Parsing errors (UndefinedUnitError) are raised, and not cached.
+    Conversions with an offset (e.g. degC to K) have no factor (see UnitConversion).
+    :param source_unit: unit to convert from
+    :param target_unit: unit to convert to
+    :param case_sensitive: parse the source unit case-sensitive
+    :return: compatibility flag, factor and the target unit
+    """
+    source = get_ureg().parse_expression(source_unit, case_sensitive=case_sensitive)
+    if not source.is_compatible_with(target_unit):
+        return UnitConversion(False, math.nan, target_unit)
+    converted = source.to(target_unit)
+    if get_ureg().Quantity(0, source.units).to(target_unit).magnitude != 0:
+        return UnitConversion(True, math.nan, str(converted.units), False)
+    return UnitConversion(True, float(converted.magnitude), str(converted.units))
+
+
+@lru_cache(maxsize=None)
+def unit_dimensionality(unit: str) -> UnitsContainer:
+    """
+    Dimensionality of a unit (cached). Units with the same dimensionality are compatible
+    :param unit: unit string
+    :return: dimensionality
+    """
+    return get_ureg().parse_expression(unit).dimensionality
+
+
+def clear_unit_caches():
+    """
+    Clear the cached conversions and dimensionalities (when the unit registry changes)
+    """
+    unit_conversion.cache_clear()
+    unit_dimensionality.cache_clear()
+
+
+def convert_magnitude(
+    magnitude: float, source_unit: str, target_unit: str, case_sensitive: bool = True
+) -> float:
+    """
+    Convert a magnitude from the source unit to the target unit (with the cached
+    conversions). The magnitude is multiplied with the conversion factor, which can
+    differ from the conversion of pint in the last digit. Units with an offset (e.g. degC)
+    are converted by pint.
+    :param magnitude: magnitude in the source unit
+    :param source_unit: unit to convert from
+    :param target_unit: unit to convert to
+    :param case_sensitive: parse the source unit case-sensitive
+    :return: magnitude in the target unit
+    """
+    conversion = unit_conversion(source_unit, target_unit, case_sensitive)
+    if not conversion.compatible:
+        raise DimensionalityError(source_unit, target_unit)
+    if not conversion.multiplicative:
+        ureg = get_ureg()
+        source = ureg.Quantity(
+            magnitude,
+            ureg.parse_units(source_unit, as_delta=False, case_sensitive=case_sensitive),
+        )
+        return float(source.to(target_unit).magnitude)
+    return magnitude * conversion.factor
+
+
 def compact_all_to(quantities: list[Quantity], use_min: bool = True) -> list[Quantity]:
     """
     Convert all quantities to the same unit, and return the compacted values
@@ -17,7 +101,7 @@ def compact_all_to(quantities: list[Quantity], use_min: bool = True) -> list[Qua
 
 
 def unit_match(unit1: str, unit2: str) -> bool:
-    return ureg(unit1).is_compatible_with(unit2)
+    return unit_conversion(unit1, unit2).compatible
 
 
 def get_output_in_unit(output: NodeOutput, target_unit: str) -> float:
@@ -27,13 +111,9 @@ def get_output_in_unit(output: NodeOutput, target_unit: str) -> float:
     :param target_unit:
     :return:
     """
-    conversion_quant = (ureg.parse_expression(output.unit) * output.magnitude).to(
-        target_unit
-    )
+    magnitude = convert_magnitude(output.magnitude, output.unit, target_unit)
     # experiment to avoid something like 1ML converted to 1000000.00000001
-    if (
-        ureg.parse_expression(output.unit) / ureg(target_unit)
-    ).to_base_units().magnitude > 1e6:
-        return round(conversion_quant.magnitude, 0)
+    if unit_conversion(output.unit, target_unit).factor > 1e6:
+        return round(magnitude, 0)
     else:
-        return conversion_quant.magnitude
+        return magnitude
@@ -0,0 +1,126 @@
+"""
+Benchmark of the config validation of a large experiment (matrix adapter, one root, 500
+groups with 99 nodes each = 50001 nodes).
+Reports the time of the validation steps of Experiment() and compares the resolving of
+the input files and the creation of the hierarchy tree with the old way (dumping the
+validated models and validating them again). Both ways of creating the tree use the
+current BasicTreeNode.add_children.
+run: python benchmark_config_validation.py [num_groups] [num_group_nodes]
+"""
+
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable
+
+import numpy as np
+
+import enbios.base.experiment as experiment_module
+from enbios.base.experiment import Experiment
+from enbios.base.experiment_io import resolve_input_files
+from enbios.base.models import ExperimentDataResolved, TechTreeNodeData
+from enbios.base.pydantic_experiment_validation import validate_experiment_data
+from enbios.base.tree_operations import hierarchy_to_tech_tree
+from enbios.generic.tree.basic_tree import BasicTreeNode
+
+TIMED_STEPS = [
+    "validate_experiment_data",
+    "resolve_input_files",
+    "validate_experiment_hierarchy",
+    "validate_scenarios",
+]
+
+
+def experiment_data(directory: Path, num_groups: int, num_group_nodes: int) -> dict:
+    np.save(directory / "matrix.npy", np.array([[1.0], [2.0]]))
+    (directory / "index.csv").write_text("id,unit\npv,kWh\nwind,kWh\n")
+    return {
+        "adapters": [
+            {
+                "adapter_name": "matrix-adapter",
+                "config": {
+                    "matrix_file": directory / "matrix.npy",
+                    "index_file": directory / "index.csv",
+                },
+                "methods": {"co2": {"column": 0, "unit": "kg"}},
+            }
+        ],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "sum",
+            "children": [
+                {
+                    "name": f"group_{group}",
+                    "aggregator": "sum",
+                    "children": [
+                        {
+                            "name": f"node_{group}_{index}",
+                            "adapter": "matrix",
+                            "config": {"id": "pv" if index % 2 else "wind"},
+                        }
+                        for index in range(num_group_nodes)
+                    ],
+                }
+                for group in range(num_groups)
+            ],
+        },
+    }
+
+
+def timed(function: Callable, *args) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def time_experiment_steps(data: dict) -> dict[str, float]:
+    # replace the steps in the experiment module by timed versions
+    timings: dict[str, float] = {}
+    originals = {name: getattr(experiment_module, name) for name in TIMED_STEPS}
+
+    def timed_step(name: str) -> Callable:
+        def step(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return originals[name](*args, **kwargs)
+            finally:
+                timings[name] = time.perf_counter() - start
+
+        return step
+
+    try:
+        for name in TIMED_STEPS:
+            setattr(experiment_module, name, timed_step(name))
+        _, timings["Experiment()"] = timed(Experiment, data)
+    finally:
+        for name, function in originals.items():
+            setattr(experiment_module, name, function)
+    return timings
+
+
+def main(num_groups: int = 500, num_group_nodes: int = 99):
+    with TemporaryDirectory() as directory:
+        data = experiment_data(Path(directory), num_groups, num_group_nodes)
+        print(f"nodes: {1 + num_groups * (1 + num_group_nodes)}")
+        for name, duration in time_experiment_steps(data).items():
+            print(f"{name}: {duration:.3f}s")
+
+        raw_data = validate_experiment_data(data)
+        _, old_resolve = timed(
+            lambda: ExperimentDataResolved.model_validate(raw_data.model_dump())
+        )
+        resolved, new_resolve = timed(resolve_input_files, raw_data)
+        print(f"resolve input files: old {old_resolve:.3f}s, new {new_resolve:.3f}s")
+
+        _, old_tree = timed(
+            lambda: BasicTreeNode.from_dict(
+                resolved.hierarchy.model_dump(), dataclass=TechTreeNodeData
+            )
+        )
+        _, new_tree = timed(hierarchy_to_tech_tree, resolved.hierarchy)
+        print(f"hierarchy tree: old {old_tree:.3f}s, new {new_tree:.3f}s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -1,12 +1,20 @@
 import csv
 import json
+import sqlite3
 import traceback
 from pathlib import Path
-from typing import cast
+from typing import Any, Optional, cast
 
 import pytest
 
 from enbios.base.adapters_aggregators.builtin.assignment_adapter import AssignmentAdapter
+from enbios.base.adapters_aggregators.builtin.assignment_source import (
+    AssignmentStore,
+    ParquetAssignmentSource,
+    SQLiteAssignmentSource,
+    open_assignment_source,
+)
+from enbios.base.adapters_aggregators.builtin.assignment_table import read_assignment_table
 from enbios.base.experiment import Experiment
 from enbios.const import BASE_TEST_DATA_PATH
 
@@ -21,14 +29,51 @@ def assignment_adapter_test_files_names():
         yield file.stem
 
 
-def run_test_with_file(adapter_csv_file: Path):
+def csv_to_sqlite(csv_file: Path, sqlite_file: Path):
+    rows = list(csv.reader(csv_file.open()))
+    headers = [h.strip() for h in rows[0]]
+    connection = sqlite3.connect(sqlite_file)
+    connection.execute(f"CREATE TABLE assignments ({', '.join(headers)})")
+    connection.executemany(
+        f"INSERT INTO assignments VALUES ({', '.join('?' * len(headers))})",
+        [[cell or None for cell in row] + [None] * (len(headers) - len(row))
+         for row in rows[1:] if row])
+    connection.commit()
+    connection.close()
+
+
+def csv_to_parquet(csv_file: Path, parquet_file: Path, pad_scenario_rows: bool = False):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = [row for row in csv.reader(csv_file.open()) if row]
+    headers = [h.strip() for h in rows[0]]
+    rows = [row + [""] * (len(headers) - len(row)) for row in rows[1:]]
+    if pad_scenario_rows:
+        node_idx, scenario_idx = headers.index("node_name"), headers.index("scenario")
+        for row in rows:
+            if row[scenario_idx]:
+                row[node_idx] = f" {row[node_idx]} "
+                row[scenario_idx] = f"{row[scenario_idx]} "
+    table = pa.table({h: [row[idx] or None for row in rows] for idx, h in enumerate(headers)},
+                     schema=pa.schema([(h, pa.string()) for h in headers]))
+    # small row groups, so some are skipped
+    pq.write_table(table, parquet_file, row_group_size=2)
+
+
+def run_test_with_file(adapter_csv_file: Path, columnar_csv: bool = False,
+                       source_file: Optional[Path] = None):
+    config: dict[str, Any] = {
+        "source_csv_file": adapter_csv_file,
+        "columnar_csv": columnar_csv
+    }
+    if source_file:
+        config = {"source": {"path": source_file, "max_cached_scenarios": 1}}
     data = {
         "adapters": [
             {
                 "adapter_name": "assignment-adapter",
-                "config": {
-                    "source_csv_file": adapter_csv_file
-                },
+                "config": config,
                 "methods": {
                     "co2": "kg"
                 }
@@ -72,11 +117,34 @@ def run_test_with_file(adapter_csv_file: Path):
     if adapter_csv_file.stem.endswith("_x"):
         with pytest.raises(Exception):
             try:
-                AssignmentAdapter().read_nodes_from_csv(adapter_csv_file)
+                if source_file:
+                    AssignmentStore(open_assignment_source(source_file), {"co2": "kg"}).validate()
+                elif columnar_csv:
+                    read_assignment_table(adapter_csv_file, {"co2": "kg"})
+                else:
+                    AssignmentAdapter().read_nodes_from_csv(adapter_csv_file)
                 Experiment(data)
             except Exception as err:
                 traceback.print_exc()
                 raise err
+    elif columnar_csv or source_file:
+        exp = Experiment(data)
+        adapter = cast(AssignmentAdapter, exp.get_adapter_by_name("assignment-adapter"))
+        assert not adapter.nodes
+        # outputs like the nodes of the row-wise reader
+        row_adapter = AssignmentAdapter()
+        row_adapter.methods = {"co2": "kg"}
+        nodes = row_adapter.read_nodes_from_csv(adapter_csv_file)
+        row_adapter.nodes = nodes
+        for node_name in nodes:
+            for scenario in exp.scenario_names:
+                assert adapter.get_node_output(node_name, scenario) == (
+                    row_adapter.get_node_output(node_name, scenario))
+        results = exp.run()
+        results_comparison_file = Path(
+            BASE_TEST_DATA_PATH / f"assignment_adapter/results/{adapter_csv_file.stem}.json")
+        result_comparison_data = json.load(results_comparison_file.open())
+        assert results == result_comparison_data
     else:
         exp = Experiment(data)
         nodes = cast(AssignmentAdapter, exp.get_adapter_by_name("assignment-adapter")).nodes
@@ -99,5 +167,58 @@ def test_assignment_adapter_csv(adapter_csv_file: Path):
     run_test_with_file(adapter_csv_file)
 
 
+@pytest.mark.parametrize('adapter_csv_file', argvalues=assignment_adapter_test_files(),
+                         ids=assignment_adapter_test_files_names())
+def test_assignment_adapter_columnar_csv(adapter_csv_file: Path):
+    run_test_with_file(adapter_csv_file, columnar_csv=True)
+
+
+@pytest.mark.parametrize('adapter_csv_file', argvalues=assignment_adapter_test_files(),
+                         ids=assignment_adapter_test_files_names())
+def test_assignment_adapter_sqlite_source(adapter_csv_file: Path, tmp_path: Path):
+    sqlite_file = tmp_path / f"{adapter_csv_file.stem}.sqlite"
+    csv_to_sqlite(adapter_csv_file, sqlite_file)
+    run_test_with_file(adapter_csv_file, source_file=sqlite_file)
+
+
+def test_assignment_adapter_sqlite_source_padded_values(tmp_path: Path):
+    adapter_csv_file = BASE_TEST_DATA_PATH / "assignment_adapter/inputs/assignment6.csv"
+    sqlite_file = tmp_path / "assignment6.sqlite"
+    csv_to_sqlite(adapter_csv_file, sqlite_file)
+    connection = sqlite3.connect(sqlite_file)
+    connection.execute("UPDATE assignments SET node_name = ' ' || node_name || ' ', "
+                       "scenario = scenario || ' ' WHERE scenario IS NOT NULL")
+    connection.commit()
+    connection.close()
+    source = SQLiteAssignmentSource(sqlite_file)
+    assert source.scenario_names() == ["sc1", "sc2"]
+    assert len(source.first_rows().column("node_name")) == 2
+    assert source.rows_without_scenario() == []
+    assert len(source.scenario_rows("sc1").column("node_name")) == 1
+    run_test_with_file(adapter_csv_file, source_file=sqlite_file)
+
+
+@pytest.mark.parametrize('adapter_csv_file', argvalues=assignment_adapter_test_files(),
+                         ids=assignment_adapter_test_files_names())
+def test_assignment_adapter_parquet_source(adapter_csv_file: Path, tmp_path: Path):
+    pytest.importorskip("pyarrow")
+    parquet_file = tmp_path / f"{adapter_csv_file.stem}.parquet"
+    csv_to_parquet(adapter_csv_file, parquet_file)
+    run_test_with_file(adapter_csv_file, source_file=parquet_file)
+
+
+def test_assignment_adapter_parquet_source_padded_values(tmp_path: Path):
+    pytest.importorskip("pyarrow")
+    adapter_csv_file = BASE_TEST_DATA_PATH / "assignment_adapter/inputs/assignment6.csv"
+    parquet_file = tmp_path / "assignment6.parquet"
+    csv_to_parquet(adapter_csv_file, parquet_file, pad_scenario_rows=True)
+    source = ParquetAssignmentSource(parquet_file)
+    assert source.scenario_names() == ["sc1", "sc2"]
+    assert len(source.first_rows().column("node_name")) == 2
+    assert source.rows_without_scenario() == []
+    assert len(source.scenario_rows("sc1").column("node_name")) == 1
+    run_test_with_file(adapter_csv_file, source_file=parquet_file)
+
+
 def test_assignment_adapter_with_csv():
     run_test_with_file(BASE_TEST_DATA_PATH / "assignment_adapter/inputs/assignment1.csv")
@@ -0,0 +1,51 @@
+import numpy as np
+
+from enbios.base.adapters_aggregators.builtin.assignment_adapter import (
+    AssignmentNode,
+    AssignmentNodeScenarioData,
+)
+from enbios.base.adapters_aggregators.builtin.assignment_impacts import AssignmentImpacts
+from enbios.base.models import ResultValue
+
+
+def _nodes() -> dict[str, AssignmentNode]:
+    node_a = AssignmentNode(
+        node_name="a",
+        outputs=[{"unit": "kg"}],
+        default_impacts={"co2": ResultValue(unit="kg", magnitude=1)},
+    )
+    node_b = AssignmentNode(
+        node_name="b",
+        outputs=[{"unit": "kg"}],
+        default_impacts={
+            "co2": ResultValue(unit="g", magnitude=2),
+            "water": ResultValue(unit="l", magnitude=5, multi_magnitude=[4, 6]),
+        },
+    )
+    # without outputs (no node validation context needed)
+    node_a.scenario_data["s1"] = AssignmentNodeScenarioData.model_construct(
+        impacts={"co2": ResultValue(unit="kg", magnitude=3)}
+    )
+    return {"a": node_a, "b": node_b}
+
+
+def test_assignment_impacts():
+    impacts = AssignmentImpacts.from_nodes(_nodes(), ["co2", "water"])
+    magnitudes, units = impacts.scenario_arrays("s1")
+    assert magnitudes[:, 0].tolist() == [3, 2]
+    assert units[0, 1] == -1
+    # default row, for unknown scenarios
+    assert impacts.scenario_arrays("s2")[0][0, 0] == 1
+    all_magnitudes, _ = impacts.all_scenario_arrays()
+    assert all_magnitudes.shape == (1, 2, 2)
+    assert np.isnan(impacts.default_magnitudes[0, 1])
+
+
+def test_assignment_impacts_results():
+    impacts = AssignmentImpacts.from_nodes(_nodes(), ["co2", "water"])
+    results = impacts.results("s1")
+    assert results["a"] == {"co2": ResultValue(unit="kg", magnitude=3)}
+    assert results["b"]["co2"] == ResultValue(unit="g", magnitude=2)
+    # impacts with multiple magnitudes are kept as they are
+    assert results["b"]["water"].multi_magnitude == [4, 6]
+    assert results["b"]["water"] is not _nodes()["b"].default_impacts["water"]
@@ -1,9 +1,28 @@
 import json
 from pathlib import Path
 
+import numpy as np
 import pytest
+from pint import DimensionalityError
 
 from enbios import Experiment
+from enbios.base.experiment_io import resolve_input_files
+from enbios.base.models import TechTreeNodeData
+from enbios.base.pydantic_experiment_validation import validate_experiment_data
+from enbios.base.tree_operations import hierarchy_to_tech_tree
+from enbios.base.validation import validate_scenarios
+from enbios.const import BASE_TEST_DATA_PATH
+from enbios.generic.tree.basic_tree import BasicTreeNode
+from test.enbios.test_matrix_adapter import MATRIX, experiment_data
+
+
+def matrix_experiment_data(tmp_path: Path) -> dict:
+    # experiment with the matrix-adapter, that needs no brightway project
+    matrix_file = tmp_path / "matrix.npy"
+    np.save(matrix_file, MATRIX)
+    index_file = tmp_path / "index.csv"
+    index_file.write_text("id,unit\npv,kWh\nwind,kWh\nsteel,kg\n")
+    return experiment_data(matrix_file, index_file)
 
 
 def test_fail_get_structural_node(basic_experiment):
@@ -71,3 +90,151 @@ def test_env_vars(experiment_setup, tempfolder: Path):
     json.dump(experiment_setup["scenario"], file_path.open("w", encoding="utf-8"))
     os.environ["CONFIG_FILE"] = file_path.absolute().as_posix()
     exp = Experiment()
+
+
+def test_aggregate_scenarios_level(tmp_path: Path):
+    data = matrix_experiment_data(tmp_path)
+    children = data["hierarchy"]["children"]
+    data["hierarchy"]["children"] = [
+        {"name": "energy", "aggregator": "sum", "children": children[:2]},
+        {"name": "materials", "aggregator": "sum", "children": children[2:]},
+    ]
+    single_results = {
+        scenario_name: Experiment(data).run_scenario(scenario_name)
+        for scenario_name in ["default_outputs", "scenario_outputs"]
+    }
+    exp = Experiment(data)
+    aggregator = exp.get_node_module("root")
+    levels: list[dict[str, list[str]]] = []
+    aggregate_scenarios_level = aggregator.aggregate_scenarios_level
+
+    def record_level(scenario_nodes):
+        levels.append(
+            {name: [node.name for node in nodes] for name, nodes in scenario_nodes.items()}
+        )
+        return aggregate_scenarios_level(scenario_nodes)
+
+    aggregator.aggregate_scenarios_level = record_level
+    results = exp.run()
+    # all scenarios are aggregated together, level by level
+    assert levels == [
+        {
+            "default_outputs": ["energy", "materials"],
+            "scenario_outputs": ["energy", "materials"],
+        },
+        {"default_outputs": ["root"], "scenario_outputs": ["root"]},
+    ]
+    assert results == single_results
+    scenario_results = results["scenario_outputs"]
+    assert scenario_results["children"][0]["results"]["co2"]["magnitude"] == 2006
+    assert scenario_results["results"]["co2"]["magnitude"] == 2010
+
+
+def test_node_modules(tmp_path: Path):
+    exp = Experiment(matrix_experiment_data(tmp_path))
+    adapter = exp.get_adapter_by_name("matrix-adapter")
+    assert exp.node_modules == {
+        "root": exp.get_node_module("root"),
+        "pv": adapter,
+        "turbines": adapter,
+        "steel": adapter,
+    }
+    assert exp.get_node_module(exp.get_node("pv")) is adapter
+    # nodes outside the hierarchy are resolved by their adapter/aggregator
+    other_root = BasicTreeNode(
+        "root", data=TechTreeNodeData(name="root", adapter="matrix", config={"id": "pv"})
+    )
+    assert exp.get_node_module(other_root) is adapter
+    with pytest.raises(TypeError):
+        exp.node_modules["pv"] = adapter  # type: ignore
+    with pytest.raises(ValueError):
+        exp.get_node_module("coal")
+
+
+def test_lazy_scenario_preparation(tmp_path: Path):
+    data = matrix_experiment_data(tmp_path)
+    data["config"] = {"run_scenarios": ["scenario_outputs"]}
+    exp = Experiment(data)
+    assert all(scenario._result_tree is None for scenario in exp.scenarios)
+    exp.run()
+    default_scenario, selected_scenario = exp.scenarios
+    assert default_scenario._result_tree is None
+    assert selected_scenario.result_tree.data.results["co2"].magnitude == 2010
+    # exporting prepares the tree
+    assert default_scenario.result_to_dict()["children"][0]["output"] == [
+        {"unit": "kilowatt_hour", "magnitude": 2000, "label": None}
+    ]
+    assert default_scenario._result_tree is not None
+
+
+def test_lazy_scenario_preparation_errors():
+    # outputs with the same label, whose units cannot be merged
+    exp = Experiment({
+        "adapters": [{"adapter_name": "assignment-adapter", "methods": {"co2": "kg"}}],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "sum",
+            "children": [
+                {
+                    "name": node_name,
+                    "adapter": "assign",
+                    "config": {
+                        "outputs": [{"unit": unit, "label": "output"}],
+                        "default_outputs": [{"magnitude": 1}],
+                    },
+                }
+                for node_name, unit in [("n1", "kWh"), ("n2", "kg")]
+            ],
+        },
+    })
+    with pytest.raises(DimensionalityError):
+        exp.run()
+    with pytest.raises(DimensionalityError):
+        exp.scenarios[0].result_to_dict()
+
+
+def test_stateful_aggregator_scenarios():
+    module_path = BASE_TEST_DATA_PATH.parent.parent / "demos/data"
+    module_path /= "threshold_aggregator_scenarios.py"
+    thresholds = {"root": {"method_thresholds": [{"method": "co2", "threshold": 4}]}}
+    exp = Experiment({
+        "adapters": [{"adapter_name": "assignment-adapter", "methods": {"co2": "kg"}}],
+        "aggregators": [{"module_path": module_path}],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "scenario-threshold",
+            "children": [{
+                "name": "n1",
+                "adapter": "assign",
+                "config": {
+                    "outputs": [{"unit": "kWh"}],
+                    "default_outputs": [{"magnitude": 1}],
+                },
+            }],
+        },
+        "scenarios": [
+            {"name": scenario_name,
+             "nodes": {**thresholds,
+                       "n1": {"impacts": {"co2": {"unit": "kg", "magnitude": magnitude}}}}}
+            for scenario_name, magnitude in [("low", 1), ("high", 10)]
+        ],
+    })
+    results = exp.run()
+    # the extras of each scenario are read, before the next scenario is aggregated
+    assert results["low"]["threshold_results"] == {"co2": False}
+    assert results["high"]["threshold_results"] == {"co2": True}
+
+
+def test_resolved_data_without_revalidation(tmp_path: Path):
+    data = validate_experiment_data(matrix_experiment_data(tmp_path))
+    data.scenarios[0].name = None  # type: ignore
+    resolved = resolve_input_files(data)
+    # the validated hierarchy is used, without dumping and validating it again
+    assert resolved.hierarchy is data.hierarchy
+    assert hierarchy_to_tech_tree(resolved.hierarchy).children[0].data.config is (
+        data.hierarchy.children[0].config)  # type: ignore
+    # the scenarios are copied, since their names are set during the validation
+    validate_scenarios(resolved.scenarios, Experiment.DEFAULT_SCENARIO_NAME,
+                       Experiment(matrix_experiment_data(tmp_path)))
+    assert resolved.scenarios[0].name == "Scenario 0"  # type: ignore
+    assert data.scenarios[0].name is None  # type: ignore
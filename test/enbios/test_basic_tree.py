@@ -116,6 +116,13 @@ def test_node_add_children():
     parent_node = BasicTreeNode("parent")
     children = [BasicTreeNode("child"), BasicTreeNode("child2")]
     parent_node.add_children(children)
+    assert parent_node.get_child_names() == ["child", "child2"]
+    assert all(child.parent == parent_node for child in children)
+
+    with pytest.raises(ValueError):
+        parent_node.add_children([BasicTreeNode("child3"), BasicTreeNode("child")])
+    with pytest.raises(ValueError):
+        BasicTreeNode("parent", [{"name": "child"}, {"name": "child"}])
 
 
 def test_remove_child():
@@ -13,7 +13,7 @@ from pint import UndefinedUnitError
 from bw_tools import mermaid_diagram
 from bw_tools.network_build import build_network
 from enbios.base.experiment import Experiment
-from enbios.bw2.brightway_experiment_adapter import BrightwayAdapter
+from enbios.bw2.brightway_experiment_adapter import BrightwayAdapter, samples_file_name
 from enbios.const import BASE_TEST_DATA_PATH
 from test.enbios.conftest import experiment_setup
 
@@ -147,6 +147,39 @@ def test_run_store_data(experiment_setup):
     result = exp.run()
 
 
+def test_run_store_lightweight_lca_objects(experiment_setup):
+    config = experiment_setup["scenario"]["adapters"][0]["config"]
+    config["store_lca_object"] = True
+    config["lca_store"] = {"lightweight": True}
+    experiment_setup["scenario"]["scenarios"] = [{"name": "s1"}, {"name": "s2"}]
+    exp = Experiment(experiment_setup["scenario"])
+    exp.run()
+    lca_objects = exp.get_adapter_by_name("brightway-adapter").lca_objects
+    retained = lca_objects["s1"][0]
+    # both scenarios use the same matrices
+    assert retained.matrices is lca_objects["s2"][0].matrices
+    method = retained.methods[0]
+    assert math.isclose(
+        retained.characterized_inventory(0, method).sum(), retained.results[0, 0]
+    )
+
+
+def test_run_contribution_analysis(experiment_setup):
+    config = experiment_setup["scenario"]["adapters"][0]["config"]
+    config["contribution_analysis"] = {"top_n": 3, "by": "bioflow"}
+    exp = Experiment(experiment_setup["scenario"])
+    exp.run()
+    node_name = experiment_setup["scenario"]["hierarchy"]["children"][0]["name"]
+    node = exp.scenarios[0].result_tree.find_subnode_by_name(node_name)
+    adapter = exp.get_adapter_by_name("brightway-adapter")
+    extras = adapter.result_extras(node_name, exp.scenarios[0].name)
+    for method_name in node.data.results:
+        contributors = extras["contributions"][method_name]
+        assert 0 < len(contributors) <= 3
+        amounts = [abs(c["amount"]) for c in contributors]
+        assert amounts == sorted(amounts, reverse=True)
+
+
 def test_run_exclude_defaults(experiment_setup):
     experiment_setup["scenario"]["hierarchy"]["children"].append({
         "name": "2nd",
@@ -175,6 +208,74 @@ def test_run_use_distribution(experiment_setup, default_bw_method_name):
     assert all(v != 0.0 for v in result["default scenario"]["results"][default_bw_method_name]["multi_magnitude"])
 
 
+def test_run_use_distribution_seed(experiment_setup, default_bw_method_name):
+    config = experiment_setup["scenario"]["adapters"][0]["config"]
+    config["use_k_bw_distributions"] = 3
+    config["mc_seed"] = 42
+    config["store_lca_object"] = True
+    exp = Experiment(experiment_setup["scenario"])
+    result = exp.run()
+    samples = result["default scenario"]["results"][default_bw_method_name]["multi_magnitude"]
+    assert len(samples) == 3
+    # the samples are drawn from a single lca object
+    bw_adapter = exp.get_adapter_by_name("brightway-adapter")
+    assert len(bw_adapter.lca_objects["default scenario"]) == 1
+    result2 = Experiment(experiment_setup["scenario"]).run()
+    assert result2["default scenario"]["results"][default_bw_method_name]["multi_magnitude"] == samples
+
+
+def test_run_use_distribution_workers(experiment_setup, default_bw_method_name):
+    config = experiment_setup["scenario"]["adapters"][0]["config"]
+    config["use_k_bw_distributions"] = 3
+    config["mc_seed"] = 42
+    config["mc_workers"] = 2
+    exp = Experiment(experiment_setup["scenario"])
+    result = exp.run()
+    samples = result["default scenario"]["results"][default_bw_method_name]["multi_magnitude"]
+    assert len(samples) == 3
+    # the worker processes are reused
+    bw_adapter = exp.get_adapter_by_name("brightway-adapter")
+    executor = bw_adapter._mc_executor
+    assert executor is not None
+    assert exp.run()["default scenario"]["results"][default_bw_method_name][
+               "multi_magnitude"] == samples
+    assert bw_adapter._mc_executor is executor
+    result2 = Experiment(experiment_setup["scenario"]).run()
+    assert result2["default scenario"]["results"][default_bw_method_name]["multi_magnitude"] == samples
+
+
+def test_run_use_distribution_statistics(experiment_setup, default_bw_method_name, tmp_path):
+    config = experiment_setup["scenario"]["adapters"][0]["config"]
+    config["use_k_bw_distributions"] = 10
+    config["mc_seed"] = 42
+    config["mc_statistics"] = {"quantiles": [0.1, 0.9], "samples_dir": str(tmp_path)}
+    result = Experiment(experiment_setup["scenario"]).run()
+    method_result = result["default scenario"]["results"][default_bw_method_name]
+    assert "multi_magnitude" not in method_result
+    assert method_result["statistics"]["count"] == 10
+    assert method_result["magnitude"] == method_result["statistics"]["mean"]
+    assert set(method_result["statistics"]["quantiles"].keys()) == {"0.1", "0.9"}
+    assert (tmp_path / "default scenario.npy").exists()
+    assert json.loads((tmp_path / "samples.json").read_text(encoding="utf-8")) == {
+        "default scenario": "default scenario.npy"}
+
+
+def test_samples_file_name():
+    assert samples_file_name("default scenario") == "default scenario.npy"
+    assert samples_file_name("a/b").startswith("a_b_")
+    assert samples_file_name("a/b") != samples_file_name("a:b")
+    assert "/" not in samples_file_name("../x")
+
+
+def test_run_in_memory_calculation_setups(experiment_setup):
+    experiment_setup["scenario"]["adapters"][0]["config"]["register_calculation_setups"] = False
+    experiment_setup["scenario"]["scenarios"] = [{"name": "in_memory_setup"}]
+    exp = Experiment(experiment_setup["scenario"])
+    exp.run()
+    assert "in_memory_setup" not in bw2data.calculation_setups
+    assert "in_memory_setup" in exp.get_adapter_by_name("brightway-adapter").scenario_calc_setups
+
+
 def regionalization_setup(experiment_setup: dict):
     # experiment_setup["scenario"]["hierarchy"]["children"][0]["config"]["enb_location"] = ("ES", "cat")
     experiment_setup["scenario"]["hierarchy"]["children"] = [
@@ -331,6 +432,62 @@ def test_regionlized_clear_locations(
     assert 2 == len([a for a in db if a.get("enb_location") != None])
 
 
+def test_regionalized_in_memory(
+        test_network_project_db_name: tuple[str, str], bw_adapter_config: dict, create_test_network):
+    project_name, db_name = test_network_project_db_name
+    db = bw2data.Database(db_name)
+
+    bw_adapter_config["config"]["bw_project"] = project_name
+
+    method_id = ('IPCC',)
+    ipcc = bw2data.Method(method_id)
+    ipcc.write([
+        (db.get("co2").key, {'amount': 1})
+    ])
+    ipcc.metadata = ipcc.metadata | {"unit": "kg CO2-Eq"}
+
+    activity_locations_data = json.load(
+        (BASE_TEST_DATA_PATH / "test_networks/activity_locations.json").open(encoding="utf-8"))
+
+    bw_adapter_config["methods"] = {"ipcc": ("IPCC",)}
+    bw_adapter_config["config"]["simple_regionalization"] = {
+        "run_regionalization": True,
+        "set_node_regions": activity_locations_data[0],
+        "select_regions": ["CAT", "ES", "ARA", "EU"],
+        "in_memory": True
+    }
+    exp_config = {
+        "adapters": [
+            bw_adapter_config
+        ],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "sum",
+            "children": [
+                {
+                    "name": "product",
+                    "config": {
+                        "code": "product",
+                    },
+                    "adapter": "bw"
+                }
+            ]
+        }
+    }
+    exp = Experiment(exp_config)
+    res = exp.run()
+    # nothing is written into the database
+    assert 0 == len([a for a in db if a.get("enb_location") is not None])
+    expected_results = {'ipcc.CAT': 110, 'ipcc.ES': 330, 'ipcc.ARA': 220, 'ipcc.EU': 330}
+    for ipcc_loc, result in res["default scenario"]["results"].items():
+        assert expected_results[ipcc_loc] == pytest.approx(result["magnitude"], abs=1e-10)
+    # activities x regions, reused for all following scenarios
+    bw_adapter: BrightwayAdapter = cast(BrightwayAdapter, exp.adapters[0])
+    assert bw_adapter.region_matrix.shape[1] == 4
+    # the matrix is reused for the same activity index and the (sorted) regions
+    assert bw_adapter.region_matrix_key[1] == ("ARA", "CAT", "ES", "EU")
+
+
 def test_nonlinear_methods1(experiment_setup: dict,
                             default_bw_method_name: str,
                             default_method_tuple: tuple[str, ...]):
@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import pytest
+
+from enbios.base.adapters_aggregators.builtin.assignment_adapter import AssignmentAdapter
+from enbios.base.adapters_aggregators.cached_adapter import CachedAdapter, ResultCache
+from enbios.base.experiment import Experiment
+
+
+def experiment_data(cache_dir: Path, sc2_magnitude: float = 2) -> dict:
+    return {
+        "adapters": [
+            {
+                "adapter_name": "assignment-adapter",
+                "methods": {"co2": "kg"},
+                "cache": {"dir": cache_dir},
+            }
+        ],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "sum",
+            "children": [
+                {
+                    "name": "n1",
+                    "adapter": "assign",
+                    "config": {
+                        "outputs": [{"unit": "kWh"}],
+                        "default_outputs": [{"magnitude": 1}],
+                        "default_impacts": {"co2": {"unit": "kg", "magnitude": 5}},
+                    },
+                }
+            ],
+        },
+        "scenarios": [
+            {"name": "sc1", "nodes": {"n1": {"outputs": [{"magnitude": 1}]}}},
+            {
+                "name": "sc2",
+                "nodes": {
+                    "n1": {
+                        "outputs": [{"magnitude": sc2_magnitude}],
+                        "impacts": {"co2": {"unit": "kg", "magnitude": 3}},
+                    }
+                },
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def run_counter(monkeypatch) -> list[str]:
+    runs: list[str] = []
+    run_scenario = AssignmentAdapter.run_scenario
+
+    def counting_run_scenario(self, scenario):
+        runs.append(scenario.name)
+        return run_scenario(self, scenario)
+
+    monkeypatch.setattr(AssignmentAdapter, "run_scenario", counting_run_scenario)
+    return runs
+
+
+def test_cached_adapter(tmp_path: Path, run_counter: list[str]):
+    exp = Experiment(experiment_data(tmp_path))
+    adapter = exp.get_adapter_by_name("assignment-adapter")
+    assert isinstance(adapter, CachedAdapter)
+    assert adapter.node_indicator() == "assign"
+    results = exp.run()
+    assert run_counter == ["sc1", "sc2"]
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
+
+    # unchanged inputs are served from the cache
+    assert Experiment(experiment_data(tmp_path)).run() == results
+    assert run_counter == ["sc1", "sc2"]
+
+    # only the changed scenario runs again
+    changed_results = Experiment(experiment_data(tmp_path, sc2_magnitude=4)).run()
+    assert run_counter == ["sc1", "sc2", "sc2"]
+    assert changed_results["sc1"] == results["sc1"]
+    assert changed_results["sc2"] != results["sc2"]
+
+
+def test_cached_adapter_module_file(tmp_path: Path, run_counter: list[str]):
+    module_file = tmp_path / "cached_custom_adapter.py"
+    module_file.write_text(
+        "from enbios.base.adapters_aggregators.builtin.assignment_adapter import "
+        "AssignmentAdapter\n\n\n"
+        "class CustomAdapter(AssignmentAdapter):\n"
+        "    pass\n"
+    )
+
+    def module_experiment_data() -> dict:
+        data = experiment_data(tmp_path / "cache")
+        del data["adapters"][0]["adapter_name"]
+        data["adapters"][0]["module_path"] = module_file
+        return data
+
+    Experiment(module_experiment_data()).run()
+    Experiment(module_experiment_data()).run()
+    assert run_counter == ["sc1", "sc2"]
+
+    # a changed module file invalidates the cached results
+    module_file.write_text(module_file.read_text() + "# changed\n")
+    Experiment(module_experiment_data()).run()
+    assert run_counter == ["sc1", "sc2", "sc1", "sc2"]
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = ResultCache(tmp_path)
+    cache.set("a", b"x" * 1000)
+    entry_bytes = (tmp_path / "a.pkl").stat().st_size
+    cache.max_bytes = 2 * entry_bytes
+    cache.set("b", b"y" * 1000)
+    # 'a' is used more recently than 'b'
+    assert cache.get("a") == b"x" * 1000
+    cache.set("c", b"z" * 1000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
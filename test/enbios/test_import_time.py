@@ -0,0 +1,53 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["bw2data", "bw2calc", "bw2io"]
+
+
+def _import_in_subprocess(statement: str) -> dict:
+    """
+    Run an import statement in a fresh interpreter
+    :return: import time (seconds) and which heavy modules got imported
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "duration = time.perf_counter() - start\n"
+        f"print(json.dumps({{'time': duration, 'modules': [m for m in {HEAVY_MODULES} "
+        "if m in sys.modules]}))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "statement, max_time",
+    [
+        ("import enbios", 1),
+        ("from enbios import Experiment", 5),
+        (
+            "from enbios.base.adapters_aggregators.builtin import BUILTIN_ADAPTERS\n"
+            "BUILTIN_ADAPTERS['assignment-adapter']",
+            5,
+        ),
+    ],
+)
+def test_import_time(statement: str, max_time: float):
+    result = _import_in_subprocess(statement)
+    assert result["modules"] == [], f"{statement!r} imports {result['modules']}"
+    assert result["time"] < max_time, f"{statement!r} takes {result['time']:.3f}s"
+
+
+def test_lazy_builtin_registry():
+    result = _import_in_subprocess(
+        "from enbios.base.adapters_aggregators.builtin import BUILTIN_ADAPTERS\n"
+        "assert 'brightway-adapter' in BUILTIN_ADAPTERS\n"
+        "BUILTIN_ADAPTERS['brightway-adapter']"
+    )
+    assert "bw2data" in result["modules"]
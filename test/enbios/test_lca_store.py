@@ -0,0 +1,70 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from enbios.bw2.lca_store import LCAObjectStore, RetainedLCA, SharedLCAMatrices
+
+
+def test_lca_store_lru():
+    store = LCAObjectStore(max_bytes=200)
+    store["s1"] = [np.zeros(10)]
+    store["s2"] = [np.zeros(10)]
+    assert store.nbytes == 160
+    # s1 is used, so s2 is the least recently used
+    assert len(store["s1"]) == 1
+    store["s3"] = [np.zeros(6)]
+    assert list(store.keys()) == ["s1", "s3"]
+    # checking for a scenario does not use it
+    assert "s1" in store
+    store["s4"] = [np.zeros(10)]
+    assert list(store.keys()) == ["s3", "s4"]
+
+
+def test_lca_store_keeps_newest():
+    store = LCAObjectStore(max_bytes=50)
+    store["s1"] = [np.zeros(2)]
+    store["s2"] = [np.zeros(10)]
+    assert list(store.keys()) == ["s2"]
+
+
+def test_lca_store_unlimited():
+    store = LCAObjectStore()
+    for i in range(5):
+        store[f"s{i}"] = [np.zeros(100)]
+    assert len(store) == 5
+    del store["s0"]
+    assert "s0" not in store
+
+
+def _retained_lca(matrices: SharedLCAMatrices, supply: list[float]) -> RetainedLCA:
+    return RetainedLCA(
+        np.zeros((1, 1)), csr_matrix([supply]), [{"a": 1}], [("m",)], matrices
+    )
+
+
+def test_lca_store_retained_lca():
+    matrices = SharedLCAMatrices(
+        technosphere_matrix=csr_matrix(np.eye(2)),
+        biosphere_matrix=csr_matrix([[1.0, 2.0], [0.0, 3.0]]),
+        activity_dict={1: 0, 2: 1},
+        biosphere_dict={10: 0, 11: 1},
+        method_matrices={("m",): csr_matrix(np.diag([1.0, 10.0]))},
+    )
+    retained = _retained_lca(matrices, [1.0, 2.0])
+    assert np.array_equal(retained.supply_array(0), [1, 2])
+    assert np.array_equal(retained.inventory(0).toarray(), [[1, 4], [0, 6]])
+    assert np.array_equal(
+        retained.characterized_inventory(0, ("m",)).toarray(), [[1, 4], [0, 60]]
+    )
+
+    # the shared matrices are not part of the budget
+    store = LCAObjectStore(max_bytes=retained.nbytes * 2)
+    store.shared_matrices.append(matrices)
+    store["s1"] = [retained]
+    store["s2"] = [_retained_lca(matrices, [0.0, 1.0])]
+    assert store.nbytes == retained.nbytes + store["s2"][0].nbytes
+    assert store.shared_matrices == [matrices]
+    # matrices, which no stored lca uses anymore, are dropped
+    del store["s1"]
+    assert store.shared_matrices == [matrices]
+    del store["s2"]
+    assert store.shared_matrices == []
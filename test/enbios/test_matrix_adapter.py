@@ -0,0 +1,106 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from enbios.base.adapters_aggregators.builtin.matrix_adapter import (
+    MatrixAdapter,
+    memmap_npz_array,
+)
+from enbios.base.experiment import Experiment
+from enbios.base.models import EnbiosValidationException
+
+# impacts per unit output: 3 technologies x 2 methods
+MATRIX = np.array([[1.0, 10.0], [2.0, 20.0], [4.0, 40.0]])
+
+
+@pytest.fixture
+def index_file(tmp_path: Path) -> Path:
+    path = tmp_path / "index.csv"
+    path.write_text("id,unit\npv,kWh\nwind,kWh\nsteel,kg\n")
+    return path
+
+
+def experiment_data(matrix_file: Path, index_file: Path) -> dict:
+    return {
+        "adapters": [
+            {
+                "adapter_name": "matrix-adapter",
+                "config": {"matrix_file": matrix_file, "index_file": index_file},
+                "methods": {
+                    "co2": {"column": 0, "unit": "kg"},
+                    "water": {"column": 1, "unit": "l"},
+                },
+            }
+        ],
+        "hierarchy": {
+            "name": "root",
+            "aggregator": "sum",
+            "children": [
+                {
+                    "name": "pv",
+                    "adapter": "matrix",
+                    "config": {"default_output": {"unit": "MWh", "magnitude": 2}},
+                },
+                {"name": "turbines", "adapter": "matrix", "config": {"id": "wind"}},
+                {"name": "steel", "adapter": "matrix"},
+            ],
+        },
+        "scenarios": [
+            {"name": "default_outputs", "nodes": {}},
+            {
+                "name": "scenario_outputs",
+                "nodes": {"turbines": {"unit": "kWh", "magnitude": 3}},
+            },
+        ],
+    }
+
+
+@pytest.mark.parametrize("file_type", ["npy", "npz"])
+def test_matrix_adapter(tmp_path: Path, index_file: Path, file_type: str):
+    matrix_file = tmp_path / f"matrix.{file_type}"
+    if file_type == "npy":
+        np.save(matrix_file, MATRIX)
+    else:
+        np.savez(matrix_file, impacts=MATRIX)
+    exp = Experiment(experiment_data(matrix_file, index_file))
+    adapter = exp.get_adapter_by_name("matrix-adapter")
+    assert isinstance(adapter.matrix, np.memmap)
+    results = exp.run()
+    default_results = results["default_outputs"]["children"]
+    assert default_results[0]["results"]["co2"]["magnitude"] == 2000
+    assert default_results[1]["results"]["water"]["magnitude"] == 20
+    assert default_results[2]["results"]["co2"] == {"unit": "kg", "magnitude": 4}
+    scenario_results = results["scenario_outputs"]["children"]
+    assert scenario_results[1]["results"]["co2"]["magnitude"] == 6
+    assert results["scenario_outputs"]["results"]["co2"]["magnitude"] == 2010
+
+
+def test_matrix_adapter_unknown_node(tmp_path: Path, index_file: Path):
+    matrix_file = tmp_path / "matrix.npy"
+    np.save(matrix_file, MATRIX)
+    data = experiment_data(matrix_file, index_file)
+    data["hierarchy"]["children"][2]["config"] = {"id": "coal"}
+    with pytest.raises(EnbiosValidationException):
+        Experiment(data)
+
+
+def test_memmap_npz(tmp_path: Path):
+    matrix_file = tmp_path / "matrix.npz"
+    np.savez(matrix_file, other=np.arange(5), impacts=np.asfortranarray(MATRIX))
+    assert np.array_equal(memmap_npz_array(matrix_file, "impacts"), MATRIX)
+    np.savez_compressed(matrix_file, impacts=MATRIX)
+    with pytest.raises(EnbiosValidationException):
+        memmap_npz_array(matrix_file, "impacts")
+
+
+def test_pickled_adapter_maps_matrix_again(tmp_path: Path, index_file: Path):
+    matrix_file = tmp_path / "matrix.npy"
+    np.save(matrix_file, MATRIX)
+    exp = Experiment(experiment_data(matrix_file, index_file))
+    adapter = exp.get_adapter_by_name("matrix-adapter")
+    assert isinstance(adapter, MatrixAdapter)
+    unpickled = pickle.loads(pickle.dumps(adapter))
+    assert unpickled._matrix is None
+    assert np.array_equal(unpickled.matrix, MATRIX)
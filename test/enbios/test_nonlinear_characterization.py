@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from enbios.bw2.bw_models import PiecewiseLinearFunction, PolynomialFunction
+from enbios.bw2.nonlinear_characterization import NonLinearCharacterization
+
+
+def test_polynomial_and_piecewise():
+    table = PiecewiseLinearFunction(x=[0, 10], y=[0, 100])
+    characterization = NonLinearCharacterization(
+        {
+            0: PolynomialFunction(coefficients=[0, 2]),
+            1: PolynomialFunction(coefficients=[1, 0, 1]),
+            2: table,
+            3: table,
+        },
+        5,
+    )
+    result = characterization.characterize(np.array([3.0, 2.0, 5.0, 20.0, 7.0]))
+    assert result.tolist() == [6.0, 5.0, 50.0, 100.0, 0.0]
+
+
+def test_ufunc_and_callable():
+    characterization = NonLinearCharacterization({0: np.sqrt, 2: lambda v: v * 3}, 3)
+    result = characterization.characterize(np.array([[4.0], [1.0], [2.0]]))
+    assert result.tolist() == [2.0, 0.0, 6.0]
+
+
+def test_from_activity_functions():
+    # activity id -> biosphere row. activity 30 is not part of the biosphere matrix
+    characterization = NonLinearCharacterization.from_activity_functions(
+        {10: PolynomialFunction(coefficients=[0, 1]), 30: np.sqrt}, {10: 1, 20: 0}, 2
+    )
+    assert characterization.characterize(np.array([5.0, 4.0])).tolist() == [0.0, 4.0]
+
+
+def test_invalid_piecewise():
+    with pytest.raises(ValueError):
+        PiecewiseLinearFunction(x=[0, 0], y=[1, 2])
+    with pytest.raises(ValueError):
+        PiecewiseLinearFunction(x=[0, 1, 2], y=[1, 2])
+
+
+def test_matches_biosphere_index():
+    characterization = NonLinearCharacterization.from_activity_functions(
+        {10: np.sqrt, 30: np.sqrt}, {10: 1, 20: 0}, 2
+    )
+    assert characterization.matches({20: 0, 10: 1}, 2)
+    # different row, new flow with a function or different size
+    assert not characterization.matches({10: 0, 20: 1}, 2)
+    assert not characterization.matches({10: 1, 20: 0, 30: 2}, 3)
+    assert not characterization.matches({10: 1, 20: 0}, 3)
+    assert not NonLinearCharacterization({0: np.sqrt}, 1).matches({10: 0}, 1)
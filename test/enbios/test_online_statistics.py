@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+
+from enbios.base.adapters_aggregators.builtin.sum_aggregator import SumAggregator
+from enbios.base.models import ResultValue, ScenarioResultNodeData, ResultStatistics
+from enbios.generic.online_statistics import OnlineStatistics, sample_statistics
+from enbios.generic.tree.basic_tree import BasicTreeNode
+
+
+def test_online_statistics():
+    samples = np.random.default_rng(0).normal(10, 2, size=(2000, 3, 2))
+    statistics = OnlineStatistics((3, 2), [0.05, 0.5, 0.95])
+    for sample in samples:
+        statistics.update(sample)
+    assert statistics.count == 2000
+    assert np.allclose(statistics.mean, samples.mean(0))
+    assert np.allclose(statistics.variance, samples.var(0, ddof=1))
+    assert np.array_equal(statistics.min, samples.min(0))
+    assert np.array_equal(statistics.max, samples.max(0))
+    # P² estimation
+    assert np.allclose(
+        statistics.quantile_values(), np.quantile(samples, [0.05, 0.5, 0.95], 0), rtol=0.03
+    )
+    stats = statistics.result_statistics()
+    assert len(stats) == 6
+    assert list(stats[0]["quantiles"].keys()) == ["0.05", "0.5", "0.95"]
+
+
+def test_online_statistics_few_samples():
+    statistics = OnlineStatistics((1,), [0.5])
+    statistics.update(np.array([1.0]))
+    statistics.update(np.array([3.0]))
+    assert statistics.result_statistics()[0] == sample_statistics(
+        np.array([[1.0], [3.0]]), [0.5]
+    )[0]
+
+
+def test_online_statistics_invalid():
+    with pytest.raises(ValueError):
+        OnlineStatistics((1,), [1.0])
+    with pytest.raises(ValueError):
+        OnlineStatistics((2,)).update(np.array([1.0]))
+
+
+def _node(name: str, results: dict[str, ResultValue]) -> BasicTreeNode:
+    return BasicTreeNode(name, data=ScenarioResultNodeData(results=results))
+
+
+def _result(samples: np.ndarray, keep_samples: bool = True) -> ResultValue:
+    value = ResultValue(
+        unit="kg",
+        magnitude=float(samples.mean()),
+        statistics=ResultStatistics.model_validate(
+            sample_statistics(samples[:, None], [0.5])[0]
+        ),
+    )
+    if keep_samples:
+        value._samples = samples
+    return value
+
+
+def test_aggregate_statistics():
+    samples_a = np.array([1.0, 2.0, 3.0])
+    samples_b = np.array([3.0, 2.0, 4.0])
+    root = _node("root", {})
+    root.add_child(_node("a", {"m": _result(samples_a)}))
+    root.add_child(_node("b", {"m": _result(samples_b)}))
+    # constant child
+    root.add_child(_node("c", {"m": ResultValue(unit="kg", magnitude=1)}))
+    result = SumAggregator().aggregate_node_result(root, "s")
+    assert result["m"].statistics.mean == 6
+    assert result["m"].statistics.quantiles == {"0.5": 5.0}
+    assert result["m"].statistics.max == 8
+    assert np.array_equal(result["m"]._samples, [5.0, 5.0, 8.0])
+
+
+def test_aggregate_statistics_without_samples():
+    root = _node("root", {})
+    root.add_child(_node("a", {"m": _result(np.array([1.0, 2.0, 3.0]), False)}))
+    root.add_child(_node("b", {"m": _result(np.array([3.0, 2.0, 4.0]), False)}))
+    result = SumAggregator().aggregate_node_result(root, "s")
+    assert result["m"].statistics.mean == 5
+    assert result["m"].statistics.variance is None
+
+
+def test_aggregate_multi_magnitude_padding():
+    root = _node("root", {})
+    root.add_child(_node("a", {"m": ResultValue(unit="kg", magnitude=1, multi_magnitude=[1, 2])}))
+    root.add_child(_node("b", {"m": ResultValue(unit="kg", magnitude=2, multi_magnitude=[1, 2, 3]),
+                               "n": ResultValue(unit="l", magnitude=3)}))
+    root.add_child(_node("c", {"m": ResultValue(unit="kg", multi_magnitude=[1])}))
+    result = SumAggregator().aggregate_node_result(root, "s")
+    assert result["m"].magnitude == 3
+    assert result["m"].multi_magnitude == [3, 4, 3]
+    assert result["n"].model_dump() == {"unit": "l", "magnitude": 3, "multi_magnitude": []}
+    # children are not padded
+    assert root.children[0].data.results["m"].multi_magnitude == [1, 2]
+    assert root.children[2].data.results["m"].multi_magnitude == [1]
+
+
+def test_aggregate_level():
+    rng = np.random.default_rng(0)
+    nodes = []
+    for node_idx in range(3):
+        node = _node(f"n{node_idx}", {})
+        for child_idx in range(20):
+            node.add_child(_node(f"n{node_idx}_{child_idx}", {
+                "m": ResultValue(unit="kg", magnitude=float(rng.random()) * 1e6),
+                "n": ResultValue(unit="l", magnitude=float(rng.random()))}))
+        nodes.append(node)
+    # children with statistics are aggregated by node
+    nodes[1].add_child(_node("stats", {"m": _result(np.array([1.0, 2.0]))}))
+    nodes.append(_node("empty", {}))
+    nodes[-1].add_child(_node("empty_child", {}))
+    aggregator = SumAggregator()
+    level_results = aggregator.aggregate_scenarios_level({"a": nodes[:2], "b": nodes[2:]})
+    node_results = [aggregator.aggregate_node_result(node, "") for node in nodes]
+    for results, expected in zip(level_results["a"] + level_results["b"], node_results):
+        assert {k: v.model_dump() for k, v in results.items()} == {
+            k: v.model_dump() for k, v in expected.items()}
+    assert level_results["b"][1] == {}
+
+    class DoubleAggregator(SumAggregator):
+        def aggregate_node_result(self, node, scenario_name):
+            result = super().aggregate_node_result(node, scenario_name)
+            return {key: ResultValue(unit=value.unit, magnitude=value.magnitude * 2)
+                    for key, value in result.items()}
+
+    double_results = DoubleAggregator().aggregate_level(nodes[:1], "a")
+    assert double_results[0]["m"].magnitude == node_results[0]["m"].magnitude * 2
+
+    class CountAggregator(SumAggregator):
+        def aggregate_level(self, nodes, scenario_name):
+            return [{"count": ResultValue(unit="", magnitude=len(nodes))} for _ in nodes]
+
+    count_results = CountAggregator().aggregate_scenarios_level({"a": nodes[:2]})
+    assert count_results["a"][0]["count"].magnitude == 2
+
+    # nodes, which are aggregated by node, get the name of their scenario
+    scenario_names = []
+    aggregate_node_result = aggregator.aggregate_node_result
+
+    def record_scenario(node, scenario_name):
+        scenario_names.append(scenario_name)
+        return aggregate_node_result(node, scenario_name)
+
+    aggregator.aggregate_node_result = record_scenario
+    aggregator.aggregate_scenarios_level({"a": nodes[:1], "b": nodes[1:2]})
+    assert scenario_names == ["b"]
+
+
+def test_aggregate_sequential_sum():
+    magnitudes = [float(m) for m in np.random.default_rng(0).random(200) * 1e6]
+    root = _node("root", {})
+    for idx, magnitude in enumerate(magnitudes):
+        root.add_child(_node(f"c{idx}", {"m": ResultValue(unit="kg", magnitude=magnitude)}))
+    result = SumAggregator().aggregate_node_result(root, "s")
+    # same as the python sum (np.sum of a single column uses pairwise summation)
+    assert result["m"].magnitude == sum(magnitudes)
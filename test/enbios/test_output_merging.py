@@ -43,3 +43,13 @@ def test_simple_merge4():
     assert len(merge[0]) == 3
     assignment = merge[1]
     assert assignment == [[0, 1], [1], [1, 2, 0]]
+
+
+def test_merge_units():
+    merge = merge_outputs([
+        [NodeOutput(unit="kg", magnitude=1)],
+        [NodeOutput(unit="MJ", magnitude=2), NodeOutput(unit="t", magnitude=1)],
+        [NodeOutput(unit="kWh", magnitude=1)]
+    ])
+    assert [(o.unit, o.magnitude) for o in merge[0]] == [("kilogram", 1001), ("megajoule", 5.6)]
+    assert merge[1] == [[0], [1, 0], [1]]
@@ -0,0 +1,4 @@
+TEST_BW_PROJECT = "ecoinvent_391"
+BRIGHTWAY_ADAPTER_MODULE_PATH = ""
+BRIGHTWAY_ADAPTER_MODULE_NAME = "brightway-adapter"
+TEST_ECOINVENT_DB = "ecoinvent_391_cutoff"
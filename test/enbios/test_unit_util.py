@@ -0,0 +1,59 @@
+import pytest
+from pint import DimensionalityError, UndefinedUnitError
+
+from enbios.base import unit_registry
+from enbios.base.models import NodeOutput
+from enbios.generic.unit_util import (
+    unit_conversion,
+    convert_magnitude,
+    unit_match,
+    get_output_in_unit,
+)
+
+
+def test_unit_conversion():
+    conversion = unit_conversion("kWh", "MJ")
+    assert conversion.compatible
+    assert conversion.factor == pytest.approx(3.6)
+    assert conversion.unit == "megajoule"
+    assert unit_conversion("kWh", "MJ") is conversion
+    assert convert_magnitude(2, "kWh", "MJ") == pytest.approx(7.2)
+
+
+def test_unit_conversion_incompatible():
+    assert not unit_conversion("kg", "MJ").compatible
+    assert not unit_match("kg", "MJ")
+    with pytest.raises(DimensionalityError):
+        convert_magnitude(1, "kg", "MJ")
+    with pytest.raises(UndefinedUnitError):
+        unit_conversion("no_unit", "kg")
+
+
+def test_unit_conversion_offset():
+    conversion = unit_conversion("degC", "K")
+    assert conversion.compatible
+    assert not conversion.multiplicative
+    assert convert_magnitude(20, "degC", "K") == pytest.approx(293.15)
+    assert convert_magnitude(0, "K", "degC") == pytest.approx(-273.15)
+    assert convert_magnitude(20, "degC", "degC") == 20
+    assert unit_conversion("delta_degC", "K").multiplicative
+
+
+def test_get_output_in_unit():
+    assert get_output_in_unit(NodeOutput(unit="t", magnitude=2), "kg") == 2000
+    assert get_output_in_unit(NodeOutput(unit="ML", magnitude=1.2), "ml") == 1200000000
+
+
+def test_units_file_changes(tmp_path, monkeypatch):
+    units_file = tmp_path / "units.txt"
+    monkeypatch.setattr(unit_registry, "get_pint_units_file_path", lambda: units_file)
+    unit_registry.register_units()
+    assert units_file.exists()
+    registry = unit_registry.get_ureg()
+    with pytest.raises(UndefinedUnitError):
+        unit_conversion("no_unit_yet", "kg")
+    # a changed file creates a new registry
+    units_file.write_text("unspecificEcoinventUnit = []\nno_unit_yet = 2 * kg\n")
+    unit_registry.register_units()
+    assert unit_registry.get_ureg() is not registry
+    assert convert_magnitude(3, "no_unit_yet", "kg") == 6